@@ -0,0 +1,21 @@
+"""add (script_id, id) index for resource keyset pagination
+
+Revision ID: add_resource_keyset_index
+Revises: add_resource_query_indexes
+Create Date: 2024-04-10 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_resource_keyset_index'
+down_revision = 'add_resource_query_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index('ix_resources_script_id_id', 'resources', ['script_id', 'id'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_resources_script_id_id', table_name='resources')
@@ -0,0 +1,42 @@
+"""add stored needed_by_month bucket to resources
+
+Revision ID: add_resource_needed_by_month
+Revises: add_resource_unique_key
+Create Date: 2024-04-03 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_resource_needed_by_month'
+down_revision = 'add_resource_unique_key'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('resources', sa.Column('needed_by_month', sa.String(length=7), nullable=True))
+    op.create_index(op.f('ix_resources_needed_by_month'), 'resources', ['needed_by_month'], unique=False)
+
+    # 回填已有数据；在Python中格式化，避免依赖各数据库不同的日期函数
+    resources = sa.table(
+        'resources',
+        sa.column('id', sa.Integer),
+        sa.column('needed_by', sa.DateTime),
+        sa.column('needed_by_month', sa.String)
+    )
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(resources.c.id, resources.c.needed_by).where(resources.c.needed_by.isnot(None))
+    ).fetchall()
+    if rows:
+        bind.execute(
+            resources.update()
+            .where(resources.c.id == sa.bindparam('resource_id'))
+            .values(needed_by_month=sa.bindparam('month')),
+            [{'resource_id': row.id, 'month': row.needed_by.strftime('%Y-%m')} for row in rows]
+        )
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_resources_needed_by_month'), table_name='resources')
+    op.drop_column('resources', 'needed_by_month')
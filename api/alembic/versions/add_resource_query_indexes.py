@@ -0,0 +1,34 @@
+"""add composite and expression indexes on resources
+
+Revision ID: add_resource_query_indexes
+Revises: create_resource_data_versions
+Create Date: 2024-04-08 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_resource_query_indexes'
+down_revision = 'create_resource_data_versions'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index('ix_resources_script_status', 'resources', ['script_id', 'status'], unique=False)
+    op.create_index('ix_resources_script_priority', 'resources', ['script_id', 'priority'], unique=False)
+    op.create_index('ix_resources_script_needed_by_month', 'resources', ['script_id', 'needed_by_month'], unique=False)
+    op.create_index(
+        'ix_resources_script_overbudget',
+        'resources',
+        ['script_id', sa.text('(actual_budget - estimated_budget)')],
+        unique=False,
+        postgresql_where=sa.text('actual_budget > estimated_budget'),
+        sqlite_where=sa.text('actual_budget > estimated_budget')
+    )
+
+def downgrade() -> None:
+    op.drop_index('ix_resources_script_overbudget', table_name='resources')
+    op.drop_index('ix_resources_script_needed_by_month', table_name='resources')
+    op.drop_index('ix_resources_script_priority', table_name='resources')
+    op.drop_index('ix_resources_script_status', table_name='resources')
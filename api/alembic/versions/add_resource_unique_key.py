@@ -0,0 +1,105 @@
+"""add unique (script_id, type, name) key to resources
+
+Revision ID: add_resource_unique_key
+Revises: create_analysis_store
+Create Date: 2024-04-02 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_resource_unique_key'
+down_revision = 'create_analysis_store'
+branch_labels = None
+depends_on = None
+
+KEY_COLUMNS = ('script_id', 'type', 'name')
+# 合并时不参与冲突判断的列：主键、唯一键本身和时间戳
+SKIP_COLUMNS = {'id', *KEY_COLUMNS, 'created_at', 'updated_at'}
+# 取默认值的枚举列视为未填写，可被其他行的值覆盖
+COLUMN_DEFAULTS = {'status': 'PENDING', 'priority': 'MEDIUM'}
+# 最多在报错信息中列出的冲突组数
+MAX_REPORTED_CONFLICTS = 20
+
+
+def _merge_group(rows, columns):
+    """
+    合并一组重复资源到id最小的一行，返回(保留行的更新值, 冲突列)
+
+    每列取各行中唯一的已填写值；同一列出现不同的已填写值即为冲突
+    """
+    values = {}
+    conflicts = []
+    for column in columns:
+        filled = []
+        for row in rows:
+            value = row[column]
+            if value is None or value == COLUMN_DEFAULTS.get(column):
+                continue
+            if value not in filled:
+                filled.append(value)
+        if column == 'scene_number' and filled:
+            # 首次出现的场景取最早的一个
+            filled = [min(filled)]
+        if len(filled) > 1:
+            conflicts.append(column)
+        elif filled:
+            values[column] = filled[0]
+    values['created_at'] = min((row['created_at'] for row in rows if row['created_at']), default=None)
+    values['updated_at'] = max((row['updated_at'] for row in rows if row['updated_at']), default=None)
+    return values, conflicts
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    resources = sa.Table('resources', sa.MetaData(), autoload_with=bind)
+    columns = [column.name for column in resources.columns if column.name not in SKIP_COLUMNS]
+
+    # script_id为空的行不受唯一约束限制，不参与去重
+    duplicate_keys = bind.execute(
+        sa.select(*[resources.c[name] for name in KEY_COLUMNS])
+        .where(*[resources.c[name].isnot(None) for name in KEY_COLUMNS])
+        .group_by(*[resources.c[name] for name in KEY_COLUMNS])
+        .having(sa.func.count() > 1)
+    ).all()
+
+    merges = []
+    conflicts = []
+    for key in duplicate_keys:
+        rows = bind.execute(
+            sa.select(resources)
+            .where(*[resources.c[name] == value for name, value in zip(KEY_COLUMNS, key)])
+            .order_by(resources.c.id)
+        ).mappings().all()
+        values, conflicting = _merge_group(rows, columns)
+        ids = [row['id'] for row in rows]
+        if conflicting:
+            conflicts.append(f"{dict(zip(KEY_COLUMNS, key))} ids={ids} columns={conflicting}")
+        else:
+            merges.append((ids[0], ids[1:], values))
+
+    if conflicts:
+        # 存在用户填写的不同取值，无法自动合并，中止并列出需要人工处理的资源
+        report = "\n".join(conflicts[:MAX_REPORTED_CONFLICTS])
+        more = len(conflicts) - MAX_REPORTED_CONFLICTS
+        if more > 0:
+            report += f"\n... and {more} more"
+        raise RuntimeError(
+            "Duplicate resources with conflicting values must be resolved before adding "
+            f"uq_resources_script_type_name:\n{report}"
+        )
+
+    # 字段合并到id最小的一行后再删除其余重复行
+    for keep_id, drop_ids, values in merges:
+        bind.execute(resources.update().where(resources.c.id == keep_id).values(**values))
+        bind.execute(resources.delete().where(resources.c.id.in_(drop_ids)))
+
+    with op.batch_alter_table('resources') as batch_op:
+        batch_op.create_unique_constraint(
+            'uq_resources_script_type_name', ['script_id', 'type', 'name']
+        )
+
+def downgrade() -> None:
+    with op.batch_alter_table('resources') as batch_op:
+        batch_op.drop_constraint('uq_resources_script_type_name', type_='unique')
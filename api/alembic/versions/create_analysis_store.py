@@ -0,0 +1,73 @@
+"""create normalized analysis store tables
+
+Revision ID: create_analysis_store
+Revises: create_script_analyses
+Create Date: 2024-03-28 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'create_analysis_store'
+down_revision = 'create_script_analyses'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('analysis_sections',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('script_id', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('section', sa.String(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('data', sa.JSON(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['script_id'], ['scripts.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('script_id', 'source', 'section', name='uq_analysis_sections_script_source_section')
+    )
+    op.create_index(op.f('ix_analysis_sections_id'), 'analysis_sections', ['id'], unique=False)
+
+    op.create_table('analysis_summaries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('script_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('total_scenes', sa.Integer(), nullable=True),
+        sa.Column('estimated_duration', sa.Integer(), nullable=True),
+        sa.Column('avg_scene_intensity', sa.Float(), nullable=True),
+        sa.Column('high_intensity_scenes', sa.Integer(), nullable=True),
+        sa.Column('total_characters', sa.Integer(), nullable=True),
+        sa.Column('total_resources', sa.Integer(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['script_id'], ['scripts.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('script_id')
+    )
+    op.create_index(op.f('ix_analysis_summaries_id'), 'analysis_summaries', ['id'], unique=False)
+    op.create_index(op.f('ix_analysis_summaries_total_scenes'), 'analysis_summaries', ['total_scenes'], unique=False)
+    op.create_index(op.f('ix_analysis_summaries_avg_scene_intensity'), 'analysis_summaries', ['avg_scene_intensity'], unique=False)
+
+    op.create_table('analysis_characters',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('script_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('is_main', sa.Boolean(), nullable=False),
+        sa.Column('appearances', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['script_id'], ['scripts.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('script_id', 'name', name='uq_analysis_characters_script_name')
+    )
+    op.create_index(op.f('ix_analysis_characters_id'), 'analysis_characters', ['id'], unique=False)
+    op.create_index('ix_analysis_characters_name_main', 'analysis_characters', ['name', 'is_main'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_analysis_characters_name_main', table_name='analysis_characters')
+    op.drop_index(op.f('ix_analysis_characters_id'), table_name='analysis_characters')
+    op.drop_table('analysis_characters')
+    op.drop_index(op.f('ix_analysis_summaries_avg_scene_intensity'), table_name='analysis_summaries')
+    op.drop_index(op.f('ix_analysis_summaries_total_scenes'), table_name='analysis_summaries')
+    op.drop_index(op.f('ix_analysis_summaries_id'), table_name='analysis_summaries')
+    op.drop_table('analysis_summaries')
+    op.drop_index(op.f('ix_analysis_sections_id'), table_name='analysis_sections')
+    op.drop_table('analysis_sections')
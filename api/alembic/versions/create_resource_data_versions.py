@@ -0,0 +1,25 @@
+"""create resource_data_versions table
+
+Revision ID: create_resource_data_versions
+Revises: add_resource_needed_by_month
+Create Date: 2024-04-05 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'create_resource_data_versions'
+down_revision = 'add_resource_needed_by_month'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('resource_data_versions',
+        sa.Column('script_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('script_id')
+    )
+
+def downgrade() -> None:
+    op.drop_table('resource_data_versions')
@@ -0,0 +1,57 @@
+"""create incrementally maintained resource_summaries table
+
+Revision ID: create_resource_summaries
+Revises: add_resource_keyset_index
+Create Date: 2024-04-12 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'create_resource_summaries'
+down_revision = 'add_resource_keyset_index'
+branch_labels = None
+depends_on = None
+
+STATUSES = ('PENDING', 'CONFIRMED', 'IN_PREPARATION', 'READY', 'COMPLETED')
+PRIORITIES = ('LOW', 'MEDIUM', 'HIGH', 'URGENT')
+
+def upgrade() -> None:
+    op.create_table('resource_summaries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('script_id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('status', sa.Enum(*STATUSES, name='resourcestatus', native_enum=False), nullable=False),
+        sa.Column('priority', sa.Enum(*PRIORITIES, name='resourcepriority', native_enum=False), nullable=False),
+        sa.Column('needed_by_month', sa.String(length=7), nullable=False),
+        sa.Column('resource_count', sa.Integer(), nullable=False),
+        sa.Column('estimated_sum', sa.Float(), nullable=False),
+        sa.Column('estimated_count', sa.Integer(), nullable=False),
+        sa.Column('actual_sum', sa.Float(), nullable=False),
+        sa.Column('actual_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('script_id', 'type', 'status', 'priority', 'needed_by_month', name='uq_resource_summaries_key')
+    )
+    op.create_index(op.f('ix_resource_summaries_id'), 'resource_summaries', ['id'], unique=False)
+    op.create_index(op.f('ix_resource_summaries_script_id'), 'resource_summaries', ['script_id'], unique=False)
+
+    # 用现有资源回填汇总表
+    op.execute(
+        "INSERT INTO resource_summaries (script_id, type, status, priority, needed_by_month, "
+        "resource_count, estimated_sum, estimated_count, actual_sum, actual_count) "
+        "SELECT COALESCE(script_id, 0), COALESCE(type, ''), "
+        "CAST(COALESCE(status, 'PENDING') AS VARCHAR(14)), CAST(COALESCE(priority, 'MEDIUM') AS VARCHAR(6)), "
+        "COALESCE(needed_by_month, ''), COUNT(*), "
+        "COALESCE(SUM(estimated_budget), 0), COUNT(estimated_budget), "
+        "COALESCE(SUM(actual_budget), 0), COUNT(actual_budget) "
+        "FROM resources "
+        "GROUP BY COALESCE(script_id, 0), COALESCE(type, ''), "
+        "CAST(COALESCE(status, 'PENDING') AS VARCHAR(14)), CAST(COALESCE(priority, 'MEDIUM') AS VARCHAR(6)), "
+        "COALESCE(needed_by_month, '')"
+    )
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_resource_summaries_script_id'), table_name='resource_summaries')
+    op.drop_index(op.f('ix_resource_summaries_id'), table_name='resource_summaries')
+    op.drop_table('resource_summaries')
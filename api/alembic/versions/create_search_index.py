@@ -0,0 +1,59 @@
+"""create FTS5 full-text search tables for resources and scripts
+
+Revision ID: create_search_index
+Revises: create_resource_summaries
+Create Date: 2024-04-15 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'create_search_index'
+down_revision = 'create_resource_summaries'
+branch_labels = None
+depends_on = None
+
+RESOURCE_TRIGGERS = ('resources_search_ai', 'resources_search_ad', 'resources_search_au')
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        # 其他数据库退化为LIKE检索，无需建表
+        return
+    # init_db启动时的ensure_search_tables可能已建好这些表和触发器，建表语句需可重复执行
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS resource_search USING fts5("
+        "name, description, notes, content='resources', content_rowid='id', tokenize='trigram')"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS resources_search_ai AFTER INSERT ON resources BEGIN "
+        "INSERT INTO resource_search(rowid, name, description, notes) "
+        "VALUES (new.id, new.name, new.description, new.notes); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS resources_search_ad AFTER DELETE ON resources BEGIN "
+        "INSERT INTO resource_search(resource_search, rowid, name, description, notes) "
+        "VALUES ('delete', old.id, old.name, old.description, old.notes); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS resources_search_au AFTER UPDATE OF name, description, notes ON resources BEGIN "
+        "INSERT INTO resource_search(resource_search, rowid, name, description, notes) "
+        "VALUES ('delete', old.id, old.name, old.description, old.notes); "
+        "INSERT INTO resource_search(rowid, name, description, notes) "
+        "VALUES (new.id, new.name, new.description, new.notes); END"
+    )
+    # 为已有资源建立索引；剧本正文在下次解析时写入script_search
+    op.execute("INSERT INTO resource_search(resource_search) VALUES ('rebuild')")
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS script_search USING fts5("
+        "script_id UNINDEXED, scene_id UNINDEXED, heading, body, tokenize='trigram')"
+    )
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+    for trigger in RESOURCE_TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS resource_search")
+    op.execute("DROP TABLE IF EXISTS script_search")
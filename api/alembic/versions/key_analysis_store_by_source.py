@@ -0,0 +1,65 @@
+"""key analysis characters and summary versions by source
+
+Revision ID: key_analysis_store_by_source
+Revises: resource_keyset_index_null_scripts
+Create Date: 2024-04-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'key_analysis_store_by_source'
+down_revision = 'resource_keyset_index_null_scripts'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # 已有角色行由最后写入character_analysis的来源产生
+    with op.batch_alter_table('analysis_characters') as batch_op:
+        batch_op.add_column(sa.Column('source', sa.String(), nullable=True))
+    op.execute(
+        "UPDATE analysis_characters SET source = COALESCE(("
+        "SELECT s.source FROM analysis_sections s "
+        "WHERE s.script_id = analysis_characters.script_id AND s.section = 'character_analysis' "
+        "ORDER BY s.updated_at DESC LIMIT 1), 'ai_generator')"
+    )
+    with op.batch_alter_table('analysis_characters') as batch_op:
+        batch_op.alter_column('source', existing_type=sa.String(), nullable=False)
+        batch_op.drop_constraint('uq_analysis_characters_script_name', type_='unique')
+        batch_op.create_unique_constraint(
+            'uq_analysis_characters_script_source_name', ['script_id', 'source', 'name']
+        )
+
+    # 摘要的版本号改为按来源记录，从各部分的版本号回填
+    with op.batch_alter_table('analysis_summaries') as batch_op:
+        batch_op.add_column(sa.Column('versions', sa.JSON(), nullable=True))
+    bind = op.get_bind()
+    versions = {}
+    for script_id, source, version in bind.execute(sa.text(
+        "SELECT script_id, source, MAX(version) FROM analysis_sections GROUP BY script_id, source"
+    )):
+        versions.setdefault(script_id, {})[source] = version
+    summaries = sa.table('analysis_summaries', sa.column('script_id', sa.Integer), sa.column('versions', sa.JSON))
+    for script_id, by_source in versions.items():
+        bind.execute(
+            summaries.update().where(summaries.c.script_id == script_id).values(versions=by_source)
+        )
+    with op.batch_alter_table('analysis_summaries') as batch_op:
+        batch_op.drop_column('version')
+
+def downgrade() -> None:
+    with op.batch_alter_table('analysis_summaries') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+        batch_op.drop_column('versions')
+
+    # 每个剧本只保留一个来源的角色
+    op.execute(
+        "DELETE FROM analysis_characters WHERE id NOT IN ("
+        "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM analysis_characters "
+        "GROUP BY script_id, name) AS keep)"
+    )
+    with op.batch_alter_table('analysis_characters') as batch_op:
+        batch_op.drop_constraint('uq_analysis_characters_script_source_name', type_='unique')
+        batch_op.create_unique_constraint('uq_analysis_characters_script_name', ['script_id', 'name'])
+        batch_op.drop_column('source')
@@ -0,0 +1,29 @@
+"""index resource keyset pagination on coalesce(script_id, 0)
+
+Revision ID: resource_keyset_index_null_scripts
+Revises: create_search_index
+Create Date: 2024-04-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'resource_keyset_index_null_scripts'
+down_revision = 'create_search_index'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # 列表按coalesce(script_id, 0)排序，未关联剧本的资源也能被分页取到
+    op.drop_index('ix_resources_script_id_id', table_name='resources')
+    op.create_index(
+        'ix_resources_script_key_id',
+        'resources',
+        [sa.text('coalesce(script_id, 0)'), 'id'],
+        unique=False
+    )
+
+def downgrade() -> None:
+    op.drop_index('ix_resources_script_key_id', table_name='resources')
+    op.create_index('ix_resources_script_id_id', 'resources', ['script_id', 'id'], unique=False)
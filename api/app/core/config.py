@@ -22,6 +22,12 @@ class Settings(BaseSettings):
     OPENAI_API_VERSION: str = "2024-08-01-preview"
     OPENAI_API_ENDPOINT: str = "https://exbq.openai.azure.com/openai/deployments/gpt-4o-mini/chat/completions?api-version=2024-08-01-preview"
     OPENAI_MODEL_NAME: str = "gpt-4o-mini"
+    OPENAI_HEDGE_PERCENTILE: float = 95  # 超过该百分位耗时未返回则发送对冲请求
+    OPENAI_BREAKER_ERROR_RATE: float = 0.5  # 熔断错误率阈值
+    OPENAI_BREAKER_COOLDOWN: float = 30.0  # 熔断后等待秒数
+    OPENAI_DEFERRED_QUEUE_SIZE: int = 32  # 熔断期间最多暂存的调用数
+    OPENAI_DEFERRED_TIMEOUT: float = 120.0  # 暂存的调用最长等待秒数
+    AI_ANALYSIS_MODE: str = "sequential"  # sequential / concurrent / combined
     
     # 文件存储配置
     UPLOAD_DIR: str = "uploads"
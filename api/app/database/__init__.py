@@ -0,0 +1,6 @@
+from sqlalchemy.orm import declarative_base
+
+from ..core.database import engine, SessionLocal, get_db
+
+# 所有模型共用的声明基类
+Base = declarative_base()
@@ -1,6 +1,7 @@
 from ..database import engine
 from ..models.script import Script
-from ..models.analysis import ScriptAnalysis
+from ..models.analysis import ScriptAnalysis, AnalysisSection, AnalysisSummary, AnalysisCharacter
+from ..services.search_service import ensure_search_tables
 
 def init_db():
     """
@@ -10,6 +11,13 @@ def init_db():
     # 创建所有模型对应的表
     Script.__table__.create(engine, checkfirst=True)
     ScriptAnalysis.__table__.create(engine, checkfirst=True)
+    AnalysisSection.__table__.create(engine, checkfirst=True)
+    AnalysisSummary.__table__.create(engine, checkfirst=True)
+    AnalysisCharacter.__table__.create(engine, checkfirst=True)
+
+    # 全文检索表（SQLite FTS5）
+    with engine.begin() as connection:
+        ensure_search_tables(connection)
 
 if __name__ == "__main__":
     init_db()
@@ -1,13 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
-from .routers import scripts, projects, users, resources
+from .routers import scripts, projects, users, resources, search
 from .database.init_db import init_db
+from .services.project_statistics import shutdown_pool
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # 退出时关闭项目统计的进程池，不留下孤儿子进程
+    shutdown_pool()
 
 app = FastAPI(
     title="Script Analysis API",
     description="API for script parsing and analysis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 配置CORS
@@ -17,6 +26,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 跨域请求中前端需要读取的响应头：分页游标和缓存校验
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # 初始化数据库
@@ -27,6 +38,7 @@ app.include_router(scripts.router, prefix=settings.API_V1_STR)
 app.include_router(projects.router, prefix=settings.API_V1_STR)
 app.include_router(users.router, prefix=settings.API_V1_STR)
 app.include_router(resources.router, prefix=settings.API_V1_STR)
+app.include_router(search.router, prefix=settings.API_V1_STR)
 
 @app.get("/")
 async def root():
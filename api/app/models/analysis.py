@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, JSON, ForeignKey, DateTime, Text, Float, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -28,4 +28,57 @@ class ScriptAnalysis(Base):
     script = relationship("Script", back_populates="analyses")
 
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        orm_mode = True 
+
+class AnalysisSection(Base):
+    """
+    分析结果按部分拆分存储，每个部分一行，便于按需读取
+    """
+    __tablename__ = "analysis_sections"
+    __table_args__ = (
+        UniqueConstraint("script_id", "source", "section", name="uq_analysis_sections_script_source_section"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    script_id = Column(Integer, ForeignKey("scripts.id"), nullable=False)
+    source = Column(String, nullable=False)  # ai_generator / script_analysis
+    section = Column(String, nullable=False)  # story_analysis, character_analysis ...
+    version = Column(Integer, nullable=False, default=1)
+    data = Column(JSON, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class AnalysisSummary(Base):
+    """
+    从分析结果中提取的标量字段，支持跨剧本的索引查询
+    """
+    __tablename__ = "analysis_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    script_id = Column(Integer, ForeignKey("scripts.id"), nullable=False, unique=True)
+    versions = Column(JSON, nullable=True)  # 各来源最近写入的版本号，如{"ai_generator": 3, "script_analysis": 12}
+    total_scenes = Column(Integer, nullable=True, index=True)
+    estimated_duration = Column(Integer, nullable=True)
+    avg_scene_intensity = Column(Float, nullable=True, index=True)
+    high_intensity_scenes = Column(Integer, nullable=True)
+    total_characters = Column(Integer, nullable=True)
+    total_resources = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class AnalysisCharacter(Base):
+    """
+    每个剧本中各来源识别出的角色，一行一个，用于"角色X是主角的所有剧本"这类查询
+    """
+    __tablename__ = "analysis_characters"
+    __table_args__ = (
+        Index("ix_analysis_characters_name_main", "name", "is_main"),
+        UniqueConstraint("script_id", "source", "name", name="uq_analysis_characters_script_source_name"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    script_id = Column(Integer, ForeignKey("scripts.id"), nullable=False)
+    source = Column(String, nullable=False)  # ai_generator / script_analysis
+    name = Column(String, nullable=False)
+    is_main = Column(Boolean, nullable=False, default=False)
+    appearances = Column(Integer, nullable=True)
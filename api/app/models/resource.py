@@ -1,8 +1,19 @@
-from sqlalchemy import Column, Integer, String, Enum, Text, ForeignKey, DateTime, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Enum, Text, ForeignKey, DateTime, Float, UniqueConstraint, Index
+from sqlalchemy.orm import relationship, validates, Session
+from sqlalchemy import event, update, insert, delete, inspect, and_, func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime
 import enum
 
+from ..database import Base
+
+# 支持 INSERT ... ON CONFLICT 的方言
+UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
 class ResourceStatus(str, enum.Enum):
     PENDING = "pending"  # 待确认
     CONFIRMED = "confirmed"  # 已确认
@@ -18,6 +29,10 @@ class ResourcePriority(str, enum.Enum):
 
 class Resource(Base):
     __tablename__ = "resources"
+    __table_args__ = (
+        # 同一剧本下同类型同名资源只保留一条，批量导入依赖该约束去重
+        UniqueConstraint("script_id", "type", "name", name="uq_resources_script_type_name"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     script_id = Column(Integer, ForeignKey("scripts.id"))
@@ -41,6 +56,7 @@ class Resource(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     needed_by = Column(DateTime, nullable=True)  # 需要日期
+    needed_by_month = Column(String(7), nullable=True, index=True)  # 需要月份（YYYY-MM），随needed_by维护，用于按月统计
     
     # 场景关联（可选）
     scene_number = Column(Integer, nullable=True)  # 首次出现的场景编号
@@ -48,5 +64,250 @@ class Resource(Base):
     # 关联关系
     script = relationship("Script", back_populates="resources")
 
+    @validates("needed_by")
+    def _sync_needed_by_month(self, key, value):
+        self.needed_by_month = value.strftime("%Y-%m") if value else None
+        return value
+
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        orm_mode = True 
+
+# 资源列表键集分页的排序键：script_id为空的资源按0排在最前，游标中同样记为0；
+# 0写成字面量，语句中的表达式才能与索引表达式一致
+RESOURCE_LIST_SCRIPT_KEY = func.coalesce(Resource.script_id, literal_column("0"))
+
+# 与常用查询形状对应的索引；(script_id, type, name)由唯一约束覆盖
+Index("ix_resources_script_key_id", RESOURCE_LIST_SCRIPT_KEY, Resource.id)  # 资源列表键集分页
+Index("ix_resources_script_status", Resource.script_id, Resource.status)
+Index("ix_resources_script_priority", Resource.script_id, Resource.priority)
+Index("ix_resources_script_needed_by_month", Resource.script_id, Resource.needed_by_month)
+# 超支查询：部分表达式索引，只收录超支的资源，按超支金额排序
+Index(
+    "ix_resources_script_overbudget",
+    Resource.script_id,
+    Resource.actual_budget - Resource.estimated_budget,
+    postgresql_where=Resource.actual_budget > Resource.estimated_budget,
+    sqlite_where=Resource.actual_budget > Resource.estimated_budget
+)
+
+# 全部剧本共用的版本号所在行
+ALL_SCRIPTS_VERSION_KEY = 0
+
+class ResourceDataVersion(Base):
+    """
+    每个剧本的资源数据版本号，资源有任何写入时递增，用于导出缓存失效
+    """
+    __tablename__ = "resource_data_versions"
+
+    script_id = Column(Integer, primary_key=True)  # 0表示全部剧本
+    version = Column(Integer, nullable=False, default=0)
+
+def bump_resource_versions(connection, script_ids):
+    """
+    递增给定剧本以及全局的资源数据版本号
+    """
+    keys = {ALL_SCRIPTS_VERSION_KEY} | {script_id for script_id in script_ids if script_id is not None}
+    table = ResourceDataVersion.__table__
+    upsert_insert = UPSERT_INSERTS.get(connection.dialect.name)
+    if upsert_insert is not None:
+        # 单条INSERT ... ON CONFLICT原子递增，并发写入首次建行时不会因主键冲突失败
+        stmt = upsert_insert(table).values([
+            {"script_id": script_id, "version": 1} for script_id in sorted(keys)
+        ])
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.script_id],
+            set_={"version": table.c.version + 1}
+        ))
+        return
+    for script_id in sorted(keys):
+        result = connection.execute(
+            update(table)
+            .where(table.c.script_id == script_id)
+            .values(version=table.c.version + 1)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(script_id=script_id, version=1))
+
+@event.listens_for(Session, "after_flush")
+def _bump_versions_after_flush(session, flush_context):
+    script_ids = set()
+    for obj in session.new:
+        if isinstance(obj, Resource):
+            script_ids.add(obj.script_id)
+    for obj in session.deleted:
+        if isinstance(obj, Resource):
+            script_ids.add(obj.script_id)
+    for obj in session.dirty:
+        if isinstance(obj, Resource) and session.is_modified(obj, include_collections=False):
+            script_ids.add(obj.script_id)
+            # 资源移到其他剧本时，原剧本也要失效
+            script_ids.update(inspect(obj).attrs.script_id.history.deleted)
+    if script_ids:
+        bump_resource_versions(session.connection(), script_ids)
+
+class ResourceSummary(Base):
+    """
+    按(剧本, 类型, 状态, 优先级, 月份)汇总的资源数量和预算，随资源写入增量维护
+    """
+    __tablename__ = "resource_summaries"
+    __table_args__ = (
+        UniqueConstraint(
+            "script_id", "type", "status", "priority", "needed_by_month",
+            name="uq_resource_summaries_key"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    script_id = Column(Integer, nullable=False, index=True)
+    type = Column(String, nullable=False)
+    # 非原生枚举（VARCHAR），避免与resources表的数据库枚举类型冲突
+    status = Column(Enum(ResourceStatus, native_enum=False), nullable=False)
+    priority = Column(Enum(ResourcePriority, native_enum=False), nullable=False)
+    needed_by_month = Column(String(7), nullable=False, default="")  # 空字符串表示未设置需要日期
+
+    resource_count = Column(Integer, nullable=False, default=0)
+    estimated_sum = Column(Float, nullable=False, default=0.0)
+    estimated_count = Column(Integer, nullable=False, default=0)  # 预估预算非空的资源数
+    actual_sum = Column(Float, nullable=False, default=0.0)
+    actual_count = Column(Integer, nullable=False, default=0)  # 实际预算非空的资源数
+
+# 影响汇总表的资源字段
+SUMMARY_FIELDS = (
+    "script_id", "type", "status", "priority", "needed_by_month",
+    "estimated_budget", "actual_budget"
+)
+SUMMARY_VALUE_COLUMNS = ("resource_count", "estimated_sum", "estimated_count", "actual_sum", "actual_count")
+
+def summary_contribution(values, sign: int = 1):
+    """
+    一条资源对汇总表的贡献：(汇总键, 各数值列的增量)
+    """
+    key = (
+        values["script_id"] or 0,
+        values["type"] or "",
+        values["status"] or ResourceStatus.PENDING,
+        values["priority"] or ResourcePriority.MEDIUM,
+        values["needed_by_month"] or ""
+    )
+    estimated = values["estimated_budget"]
+    actual = values["actual_budget"]
+    return key, (
+        sign,
+        sign * (estimated or 0.0),
+        sign * (estimated is not None),
+        sign * (actual or 0.0),
+        sign * (actual is not None)
+    )
+
+def add_summary_delta(deltas, values, sign: int = 1):
+    key, delta = summary_contribution(values, sign)
+    current = deltas.get(key)
+    deltas[key] = delta if current is None else tuple(a + b for a, b in zip(current, delta))
+
+def apply_summary_deltas(connection, deltas):
+    """
+    在当前事务中把增量写入汇总表，计数归零的行随即删除
+    """
+    table = ResourceSummary.__table__
+    key_columns = (table.c.script_id, table.c.type, table.c.status, table.c.priority, table.c.needed_by_month)
+    upsert_insert = UPSERT_INSERTS.get(connection.dialect.name)
+    if upsert_insert is not None:
+        rows = [
+            {
+                **{column.name: value for column, value in zip(key_columns, key)},
+                **dict(zip(SUMMARY_VALUE_COLUMNS, delta))
+            }
+            for key, delta in sorted(deltas.items())
+            if any(delta)
+        ]
+        if rows:
+            # 单条INSERT ... ON CONFLICT累加增量，并发写入同一汇总键时不会重复建行
+            stmt = upsert_insert(table).values(rows)
+            connection.execute(stmt.on_conflict_do_update(
+                index_elements=list(key_columns),
+                set_={name: table.c[name] + stmt.excluded[name] for name in SUMMARY_VALUE_COLUMNS}
+            ))
+            connection.execute(
+                delete(table).where(
+                    table.c.script_id.in_({row["script_id"] for row in rows}),
+                    table.c.resource_count <= 0
+                )
+            )
+        return
+    touched = False
+    for key, delta in deltas.items():
+        if not any(delta):
+            continue
+        touched = True
+        condition = and_(*[column == value for column, value in zip(key_columns, key)])
+        result = connection.execute(
+            update(table)
+            .where(condition)
+            .values({
+                name: table.c[name] + amount
+                for name, amount in zip(SUMMARY_VALUE_COLUMNS, delta)
+            })
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(
+                **dict(zip(("script_id", "type", "status", "priority", "needed_by_month"), key)),
+                **dict(zip(SUMMARY_VALUE_COLUMNS, delta))
+            ))
+    if touched:
+        script_ids = {key[0] for key in deltas}
+        connection.execute(
+            delete(table).where(table.c.script_id.in_(script_ids), table.c.resource_count <= 0)
+        )
+
+def _state_values(obj, previous: bool):
+    """
+    资源在本次flush之前（previous=True）或之后的汇总字段取值
+    """
+    state = inspect(obj)
+    values = {}
+    for field in SUMMARY_FIELDS:
+        if previous:
+            history = state.attrs[field].history
+            if history.deleted:
+                values[field] = history.deleted[0]
+            elif history.unchanged:
+                values[field] = history.unchanged[0]
+            else:
+                values[field] = None
+        else:
+            values[field] = getattr(obj, field)
+    return values
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    return value
+
+# 修改汇总字段时加载旧值，保证flush时能算出旧的汇总贡献
+for _field in SUMMARY_FIELDS:
+    event.listen(getattr(Resource, _field), "set", _load_previous_value, active_history=True, retval=True)
+
+@event.listens_for(Session, "before_flush")
+def _load_deleted_summary_fields(session, flush_context, instances):
+    # 已过期的待删除对象先加载汇总字段，否则flush后无法得知要扣减的值
+    for obj in session.deleted:
+        if isinstance(obj, Resource):
+            for field in SUMMARY_FIELDS:
+                getattr(obj, field)
+
+@event.listens_for(Session, "after_flush")
+def _update_summary_after_flush(session, flush_context):
+    deltas = {}
+    for obj in session.new:
+        if isinstance(obj, Resource):
+            add_summary_delta(deltas, _state_values(obj, previous=False))
+    for obj in session.deleted:
+        if isinstance(obj, Resource):
+            add_summary_delta(deltas, _state_values(obj, previous=True), -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Resource):
+            continue
+        state = inspect(obj)
+        if any(state.attrs[field].history.has_changes() for field in SUMMARY_FIELDS):
+            add_summary_delta(deltas, _state_values(obj, previous=True), -1)
+            add_summary_delta(deltas, _state_values(obj, previous=False))
+    if deltas:
+        apply_summary_deltas(session.connection(), deltas)
@@ -1,17 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Dict, Any, Callable, Iterable
 from ..database import get_db
 from ..models.resource import Resource, ResourceStatus, ResourcePriority
-from ..schemas.resource import ResourceCreate, ResourceUpdate, Resource as ResourceSchema, ResourceResponse
+from ..schemas.resource import (
+    ResourceCreate, ResourceUpdate, Resource as ResourceSchema, ResourceResponse,
+    ResourceBulkUpdate, ResourceBulkSelection, ResourceBulkResponse
+)
 from ..services.resource_service import ResourceService
+from ..services.cost_distribution import DEFAULT_HISTOGRAM_BINS, MAX_HISTOGRAM_BINS
+from ..services.export_cache import export_cache, get_resource_version
+from ..services.export_jobs import export_jobs
+from ..services.websocket_manager import notify_resource_update
 import logging
+import json
 from datetime import datetime
 
 router = APIRouter(prefix="/resources", tags=["resources"])
 logger = logging.getLogger(__name__)
 
+# 资源列表分页大小
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+async def _cached_export(
+    request: Request,
+    db: Session,
+    kind: str,
+    filters: Dict[str, Any],
+    format: str,
+    build: Callable[[], Iterable[bytes]],
+    filename_prefix: str
+) -> Response:
+    """
+    按(导出类型, 过滤条件, 格式, 数据版本)缓存导出文件，并支持ETag/If-None-Match
+
+    命中缓存时直接返回文件；未命中时边生成边输出，同时写入缓存，不等整个文件写完
+    """
+    version = get_resource_version(db, filters.get("script_id"))
+    key = export_cache.make_key(kind, filters, format, version)
+    etag = f'"{key}"'
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # 生成文件名
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{filename_prefix}_{timestamp}.{format}"
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "ETag": etag
+    }
+
+    path = export_cache.get(key, format)
+    if path is not None:
+        return FileResponse(path, media_type=MEDIA_TYPES[format], headers=headers)
+
+    # build在线程池中调用，一次性生成的报告在此出错时仍返回500；
+    # 逐批生成的导出中途出错时临时文件被丢弃，不会写入缓存
+    chunks = await run_in_threadpool(build)
+    return StreamingResponse(
+        export_cache.tee(key, format, chunks),
+        media_type=MEDIA_TYPES[format],
+        headers=headers
+    )
+
 @router.post("", response_model=ResourceResponse)
 async def create_resource(
     resource: ResourceCreate,
@@ -35,29 +99,307 @@ async def create_resource(
         logger.error(f"Error creating resource: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("", response_model=List[ResourceSchema])
+@router.get("")
 async def get_resources(
+    response: Response,
     script_id: Optional[int] = None,
     status: Optional[ResourceStatus] = None,
     priority: Optional[ResourcePriority] = None,
     type: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="逗号分隔的字段列表，只查询这些列"),
+    cursor: Optional[str] = Query(None, description="上一页响应头X-Next-Cursor中的游标"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="每页数量，带游标时默认100"),
+    stream: bool = Query(False, description="以NDJSON流式返回，不分页"),
     db: Session = Depends(get_db)
 ):
     """
     获取资源列表，支持多种过滤条件
+
+    不带limit和cursor时返回全部结果；指定任一参数时按(script_id, id)键集分页，
+    下一页游标在X-Next-Cursor响应头中；stream=true时以NDJSON逐行返回游标之后的全部结果
     """
-    query = db.query(Resource)
-    
-    if script_id:
-        query = query.filter(Resource.script_id == script_id)
-    if status:
-        query = query.filter(Resource.status == status)
-    if priority:
-        query = query.filter(Resource.priority == priority)
-    if type:
-        query = query.filter(Resource.type == type)
+    try:
+        selected = ResourceService.parse_fields(fields)
+        filters = {"script_id": script_id, "status": status, "priority": priority, "resource_type": type}
+
+        if stream:
+            # 先校验游标，避免开始输出后才报错
+            if cursor:
+                ResourceService.decode_cursor(cursor)
+            lines = (
+                json.dumps(jsonable_encoder(row), ensure_ascii=False) + "\n"
+                for row in ResourceService.iter_resources(db, selected, cursor=cursor, **filters)
+            )
+            return StreamingResponse(lines, media_type="application/x-ndjson")
+
+        if limit is None and cursor is None:
+            return list(ResourceService.iter_resources(db, selected, **filters))
+
+        rows, next_cursor = ResourceService.list_resources(
+            db, selected, limit or DEFAULT_PAGE_SIZE, cursor=cursor, **filters
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+async def _apply_bulk_update(
+    db: Session,
+    selection: ResourceBulkSelection,
+    updates: Dict[str, Any],
+    update_type: str
+) -> ResourceBulkResponse:
+    try:
+        result = ResourceService.bulk_update(
+            db,
+            updates,
+            ids=selection.ids,
+            filters=selection.filter.model_dump(exclude_none=True) if selection.filter else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if result["updated"]:
+        await notify_resource_update(
+            update_type,
+            result["script_ids"],
+            result["resource_ids"],
+            jsonable_encoder(updates)
+        )
+
+    return ResourceBulkResponse(
+        success=True,
+        message=f"{result['updated']} resources updated",
+        updated=result["updated"],
+        results=result["results"]
+    )
+
+@router.patch("/bulk", response_model=ResourceBulkResponse)
+async def bulk_update_resources(
+    bulk_update: ResourceBulkUpdate,
+    db: Session = Depends(get_db)
+):
+    """
+    批量更新资源：按id列表或过滤条件选择，在一个事务中用一条UPDATE完成
+    """
+    return await _apply_bulk_update(
+        db,
+        bulk_update,
+        bulk_update.updates.model_dump(exclude_unset=True),
+        "bulk_update"
+    )
+
+@router.patch("/bulk/status", response_model=ResourceBulkResponse)
+async def bulk_update_resource_status(
+    selection: ResourceBulkSelection,
+    status: ResourceStatus,
+    db: Session = Depends(get_db)
+):
+    """
+    批量更新资源状态
+    """
+    return await _apply_bulk_update(db, selection, {"status": status}, "bulk_status")
+
+# 静态路径需在/{resource_id}之前注册，否则会被当作资源ID匹配
+@router.get("/export")
+async def export_resources(
+    request: Request,
+    format: str = Query("xlsx", regex="^(xlsx|csv|arrow|parquet)$"),
+    script_id: Optional[int] = None,
+    status: Optional[ResourceStatus] = None,
+    type: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    导出资源列表为Excel、CSV、Arrow IPC流或Parquet文件（流式生成，按数据版本缓存）
+
+    arrow/parquet使用表字段名作列名，预算为浮点、日期为时间戳，便于分析工具直接加载
+    """
+    try:
+        resource_service = ResourceService()
+        return await _cached_export(
+            request,
+            db,
+            kind="resources",
+            filters={"script_id": script_id, "status": status, "type": type},
+            format=format,
+            build=lambda: resource_service.export_resources(
+                db=db,
+                script_id=script_id,
+                status=status,
+                resource_type=type,
+                format=format
+            ),
+            filename_prefix="resources"
+        )
+        
+    except Exception as e:
+        logger.error(f"Error exporting resources: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/statistics")
+async def get_resource_statistics(
+    script_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    获取资源统计信息
+    """
+    try:
+        resource_service = ResourceService()
+        statistics = resource_service.get_resource_statistics(db, script_id)
+        return {
+            "success": True,
+            "message": "Statistics retrieved successfully",
+            "data": statistics
+        }
+    except Exception as e:
+        logger.error(f"Error getting resource statistics: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/statistics/export")
+async def export_resource_statistics(
+    request: Request,
+    format: str = Query("xlsx", regex="^(xlsx|csv)$"),
+    script_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    导出资源统计报告（按数据版本缓存）
+    """
+    try:
+        resource_service = ResourceService()
+        return await _cached_export(
+            request,
+            db,
+            kind="statistics",
+            filters={"script_id": script_id},
+            format=format,
+            build=lambda: [resource_service.export_statistics(
+                db=db,
+                script_id=script_id,
+                format=format
+            ).getvalue()],
+            filename_prefix="resource_statistics"
+        )
         
-    return query.all()
+    except Exception as e:
+        logger.error(f"Error exporting resource statistics: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cost-analysis/distribution")
+async def get_cost_distribution(
+    script_id: Optional[int] = None,
+    bins: int = Query(DEFAULT_HISTOGRAM_BINS, ge=1, le=MAX_HISTOGRAM_BINS),
+    db: Session = Depends(get_db)
+):
+    """
+    获取按资源类型的成本分布：预估/实际/偏差的P50/P90/P99、实际预算直方图和偏差离群资源
+    """
+    try:
+        distribution = ResourceService.get_cost_distribution(db, script_id, bins)
+        return {
+            "success": True,
+            "message": "Cost distribution retrieved successfully",
+            "data": distribution
+        }
+    except Exception as e:
+        logger.error(f"Error getting cost distribution: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cost-analysis/export")
+async def export_cost_analysis(
+    request: Request,
+    format: str = Query("xlsx", regex="^(xlsx|csv)$"),
+    script_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    导出成本分析报告（按数据版本缓存）
+    """
+    try:
+        resource_service = ResourceService()
+        return await _cached_export(
+            request,
+            db,
+            kind="cost_analysis",
+            filters={"script_id": script_id},
+            format=format,
+            build=lambda: [resource_service.export_cost_analysis(
+                db=db,
+                script_id=script_id,
+                format=format
+            ).getvalue()],
+            filename_prefix="cost_analysis"
+        )
+        
+    except Exception as e:
+        logger.error(f"Error exporting cost analysis: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/export-jobs")
+async def submit_export_job(
+    kind: str = Query(..., regex="^(statistics|cost_analysis)$"),
+    format: str = Query("xlsx", regex="^(xlsx|csv)$"),
+    script_id: Optional[int] = None
+):
+    """
+    提交后台导出任务，进度通过轮询或订阅exports频道获取
+    """
+    try:
+        job = export_jobs.submit(kind, format, script_id)
+        return {
+            "success": True,
+            "message": "Export job submitted",
+            "data": job.to_dict()
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/export-jobs/{job_id}")
+async def get_export_job(job_id: str):
+    """
+    查询后台导出任务状态
+    """
+    job = export_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return {
+        "success": True,
+        "message": "Export job retrieved successfully",
+        "data": job.to_dict()
+    }
+
+@router.get("/export-jobs/{job_id}/download")
+async def download_export_job(job_id: str):
+    """
+    下载已完成的导出任务文件
+    """
+    job = export_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Export job is {job.status}")
+
+    path = export_jobs.artifact_path(job)
+    if path is None:
+        # 文件已被缓存淘汰，需要重新提交
+        raise HTTPException(status_code=410, detail="Export file expired, please resubmit")
+
+    timestamp = job.finished_at.strftime("%Y%m%d_%H%M%S")
+    filename = f"{job.kind}_{timestamp}.{job.format}"
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[job.format],
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "ETag": f'"{job.cache_key}"'
+        }
+    )
 
 @router.get("/{resource_id}", response_model=ResourceResponse)
 async def get_resource(
@@ -159,101 +501,3 @@ async def update_resource_status(
         db.rollback()
         logger.error(f"Error updating resource status: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-
-@router.get("/export")
-async def export_resources(
-    format: str = Query("xlsx", regex="^(xlsx|csv)$"),
-    script_id: Optional[int] = None,
-    status: Optional[ResourceStatus] = None,
-    type: Optional[str] = None,
-    db: Session = Depends(get_db)
-):
-    """
-    导出资源列表为Excel或CSV文件
-    """
-    try:
-        resource_service = ResourceService()
-        output = resource_service.export_resources(
-            db=db,
-            script_id=script_id,
-            status=status,
-            resource_type=type,
-            format=format
-        )
-        
-        # 生成文件名
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"resources_{timestamp}.{format}"
-        
-        # 设置正确的媒体类型
-        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet" if format == "xlsx" else "text/csv"
-        
-        # 返回文件流
-        return StreamingResponse(
-            output,
-            media_type=media_type,
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
-        )
-        
-    except Exception as e:
-        logger.error(f"Error exporting resources: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.get("/statistics")
-async def get_resource_statistics(
-    script_id: Optional[int] = None,
-    db: Session = Depends(get_db)
-):
-    """
-    获取资源统计信息
-    """
-    try:
-        resource_service = ResourceService()
-        statistics = resource_service.get_resource_statistics(db, script_id)
-        return {
-            "success": True,
-            "message": "Statistics retrieved successfully",
-            "data": statistics
-        }
-    except Exception as e:
-        logger.error(f"Error getting resource statistics: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-@router.get("/statistics/export")
-async def export_resource_statistics(
-    format: str = Query("xlsx", regex="^(xlsx|csv)$"),
-    script_id: Optional[int] = None,
-    db: Session = Depends(get_db)
-):
-    """
-    导出资源统计报告
-    """
-    try:
-        resource_service = ResourceService()
-        output = resource_service.export_statistics(
-            db=db,
-            script_id=script_id,
-            format=format
-        )
-        
-        # 生成文件名
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"resource_statistics_{timestamp}.{format}"
-        
-        # 设置正确的媒体类型
-        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet" if format == "xlsx" else "text/csv"
-        
-        # 返回文件流
-        return StreamingResponse(
-            output,
-            media_type=media_type,
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
-        )
-        
-    except Exception as e:
-        logger.error(f"Error exporting resource statistics: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
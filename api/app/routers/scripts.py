@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..core.database import get_db
@@ -10,7 +10,9 @@ from ..core.auth import get_current_user
 from ..models.user import User
 from ..schemas.analysis import AnalysisResponse, Analysis
 from ..services.ai_analysis import AIAnalysisService
+from ..services.llm_resilience import get_llm_metrics
 from ..services.resource_service import ResourceService
+from ..services.analysis_store import AnalysisStore
 import json
 import logging
 
@@ -167,27 +169,80 @@ async def trigger_ai_generation(
             detail=f"Failed to start AI analysis: {str(e)}"
         )
 
+@router.get("/search/main-character")
+async def find_scripts_by_main_character(
+    name: str,
+    db: Session = Depends(get_db)
+) -> dict:
+    """
+    查询某角色为主要角色的所有剧本
+    """
+    return {"character": name, "script_ids": AnalysisStore.find_scripts_by_main_character(db, name)}
+
+@router.get("/search/analysis")
+async def search_analyses(
+    min_scenes: Optional[int] = None,
+    max_scenes: Optional[int] = None,
+    min_intensity: Optional[float] = None,
+    db: Session = Depends(get_db)
+) -> List[dict]:
+    """
+    按场景数、场景强度等提取字段筛选剧本
+    """
+    return AnalysisStore.find_scripts(db, min_scenes, max_scenes, min_intensity)
+
+@router.get("/{script_id}/analysis/sections/{section}")
+async def get_analysis_section(
+    script_id: int,
+    section: str,
+    source: Optional[str] = None,
+    db: Session = Depends(get_db)
+) -> dict:
+    """
+    获取单个分析部分
+    """
+    result = AnalysisStore.get_section(db, script_id, section, source)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Analysis section not found")
+    return result
+
+@router.get("/ai-metrics")
+async def get_ai_metrics() -> dict:
+    """
+    获取LLM调用的对冲请求与熔断器指标
+    """
+    return get_llm_metrics()
+
 @router.get("/{script_id}/ai-analysis")
 async def get_ai_analysis(
     script_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user)
-) -> dict:
+):
     """
     Get the AI-generated analysis results for a script.
+
+    The ETag carries the persisted analysis version; a matching
+    If-None-Match returns 304.
     """
     try:
         # Get the analysis results
-        analysis_file = ai_generator.output_dir / f"script_{script_id}_analysis.json"
-        if not analysis_file.exists():
+        analysis = await ai_generator.load_analysis_results(script_id)
+        if analysis is None:
             raise HTTPException(
                 status_code=404,
                 detail="AI analysis not found or not yet generated"
             )
-
-        with open(analysis_file, 'r', encoding='utf-8') as f:
-            analysis = json.loads(f.read())
+        etag = ai_generator.analysis_etag(script_id, analysis)
+        if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
         return analysis
 
+    except HTTPException:
+        raise
+
     except AIGenerationError as e:
         raise HTTPException(
             status_code=500,
@@ -211,7 +266,7 @@ async def delete_script(
         await script_service.delete_script(script_id)
         
         # Also delete AI analysis if it exists
-        analysis_file = ai_generator.output_dir / f"script_{script_id}_analysis.json"
+        analysis_file = ai_generator.analysis_file(script_id)
         if analysis_file.exists():
             analysis_file.unlink()
             
@@ -259,6 +314,14 @@ async def perform_analysis(script_id: int, analysis_id: int, db: Session):
                 )
                 logger.info(f"Created {len(created_resources)} resources from analysis")
 
+            # 写入分析索引失败不影响已保存的结果和资源
+            try:
+                AnalysisStore.save_analysis(
+                    db, script_id, analysis_result, source="script_analysis", version=analysis.id
+                )
+            except Exception as e:
+                logger.error(f"Failed to index analysis for script {script_id}: {str(e)}")
+
     except AIAnalysisError as e:
         logger.error(f"AI Analysis error for script {script_id}: {str(e)}")
         if analysis:
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional, Literal
+from ..database import get_db
+from ..services.search_service import SearchService
+import logging
+
+router = APIRouter(prefix="/search", tags=["search"])
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+@router.get("")
+async def search(
+    q: str = Query(..., min_length=1, description="检索词，空格分隔的多个词须同时出现"),
+    scope: Literal["all", "resources", "scripts"] = "all",
+    script_id: Optional[int] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
+    """
+    全文检索资源（名称/描述/备注）和剧本正文，结果按相关度排序并分页
+
+    scope=all时资源和剧本各自分页，total为各自的命中总数
+    """
+    offset = (page - 1) * page_size
+    try:
+        result = {"query": q, "page": page, "page_size": page_size}
+        if scope in ("all", "resources"):
+            result["resources"] = SearchService.search_resources(db, q, script_id, page_size, offset)
+        if scope in ("all", "scripts"):
+            result["scripts"] = SearchService.search_scripts(db, q, script_id, page_size, offset)
+        return result
+    except Exception as e:
+        logger.error(f"Error searching for '{q}': {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import Dict
 from ..services.statistics_service import StatisticsService
+from ..services.project_statistics import ProjectStatisticsService
 from ..core.auth import get_current_user
 from ..models.user import User
 
 router = APIRouter(prefix="/statistics", tags=["statistics"])
 statistics_service = StatisticsService()
+project_statistics_service = ProjectStatisticsService()
 
 @router.get("/scripts/{script_id}")
 async def get_script_statistics(
@@ -37,8 +39,7 @@ async def get_scene_statistics(
     Get scene-related statistics for a script.
     """
     try:
-        stats = await statistics_service.get_script_statistics(script_id)
-        return stats["scene_statistics"]
+        return await statistics_service.get_section_statistics(script_id, "scene_statistics")
     except ValueError as e:
         raise HTTPException(
             status_code=404,
@@ -59,8 +60,7 @@ async def get_character_statistics(
     Get character-related statistics for a script.
     """
     try:
-        stats = await statistics_service.get_script_statistics(script_id)
-        return stats["character_statistics"]
+        return await statistics_service.get_section_statistics(script_id, "character_statistics")
     except ValueError as e:
         raise HTTPException(
             status_code=404,
@@ -81,8 +81,7 @@ async def get_resource_statistics(
     Get resource-related statistics for a script.
     """
     try:
-        stats = await statistics_service.get_script_statistics(script_id)
-        return stats["resource_statistics"]
+        return await statistics_service.get_section_statistics(script_id, "resource_statistics")
     except ValueError as e:
         raise HTTPException(
             status_code=404,
@@ -103,8 +102,7 @@ async def get_timeline_statistics(
     Get timeline-related statistics for a script.
     """
     try:
-        stats = await statistics_service.get_script_statistics(script_id)
-        return stats["timeline_statistics"]
+        return await statistics_service.get_section_statistics(script_id, "timeline_statistics")
     except ValueError as e:
         raise HTTPException(
             status_code=404,
@@ -114,4 +112,25 @@ async def get_timeline_statistics(
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate timeline statistics: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+@router.get("/projects/{project_id}")
+async def get_project_statistics(
+    project_id: int,
+    current_user: User = Depends(get_current_user)
+) -> Dict:
+    """
+    Get statistics aggregated across all scripts of a project.
+    """
+    try:
+        return await project_statistics_service.get_project_statistics(project_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=404,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate project statistics: {str(e)}"
+        )
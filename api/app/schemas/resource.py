@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, List
 from datetime import datetime
 from ..models.resource import ResourceStatus, ResourcePriority
 
@@ -32,6 +32,28 @@ class ResourceUpdate(BaseModel):
     needed_by: Optional[datetime] = None
     scene_number: Optional[int] = None
 
+class ResourceBulkFilter(BaseModel):
+    script_id: Optional[int] = None
+    status: Optional[ResourceStatus] = None
+    priority: Optional[ResourcePriority] = None
+    type: Optional[str] = None
+
+class ResourceBulkSelection(BaseModel):
+    """按id列表或过滤条件选择资源，二者必须且只能提供一个"""
+    ids: Optional[List[int]] = None
+    filter: Optional[ResourceBulkFilter] = None
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Provide exactly one of 'ids' or 'filter'")
+        if self.filter is not None and not self.filter.model_dump(exclude_none=True):
+            raise ValueError("Filter must contain at least one condition")
+        return self
+
+class ResourceBulkUpdate(ResourceBulkSelection):
+    updates: ResourceUpdate
+
 class Resource(ResourceBase):
     id: int
     script_id: int
@@ -44,4 +66,14 @@ class Resource(ResourceBase):
 class ResourceResponse(BaseModel):
     success: bool
     message: str
-    data: Optional[Resource] = None 
\ No newline at end of file
+    data: Optional[Resource] = None 
+
+class ResourceBulkResult(BaseModel):
+    id: int
+    status: str  # updated / not_found
+
+class ResourceBulkResponse(BaseModel):
+    success: bool
+    message: str
+    updated: int
+    results: List[ResourceBulkResult]
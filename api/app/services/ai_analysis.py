@@ -1,11 +1,18 @@
 import os
 from openai import AzureOpenAI
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 import json
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from openai.types.error import APIError, APIConnectionError, RateLimitError
+from ..core.config import settings
+from .ai_schema import validate_section, SchemaValidationError
+from .llm_resilience import (
+    CircuitOpenError, openai_latency, openai_breaker, hedge_metrics, deferred_calls
+)
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -15,6 +22,43 @@ class AIAnalysisError(Exception):
     """AI分析过程中的自定义错误"""
     pass
 
+# 各分析部分的系统提示词
+SECTION_PROMPTS: Dict[str, str] = {
+    "character_analysis": """你是一个专业的剧本分析助手。请分析提供的剧本中的角色信息，包括：
+            1. 每个角色的出场次数
+            2. 每个角色的对话数量
+            3. 每个角色首次出现的场景
+            请以JSON格式返回分析结果，格式为：
+            {"characters": [{"name": "角色名", "appearances": 出场次数, "dialogue_count": 对话数量, "first_scene": "首次出现的场景ID"}]}""",
+    "resource_analysis": """你是一个专业的剧本分析助手。请分析提供的剧本中的资源信息，包括：
+            1. 各类资源的统计数量
+            2. 每种资源类型的详细列表
+            3. 资源在不同场景中的分布
+            请以JSON格式返回分析结果，格式为：
+            {"resources_by_type": {"资源类型": ["资源名称"]}, "scene_distribution": {"资源名称": {"first_appearance": 首次出现的场景编号}}}""",
+    "scene_analysis": """你是一个专业的剧本分析助手。请分析提供的剧本中的场景信息，包括：
+            1. 场景数量统计
+            2. 每个场景的主要内容概述
+            3. 场景转换的频率和规律
+            请以JSON格式返回分析结果，格式为：
+            {"total_scenes": 场景数量, "scenes": [{"scene_id": "场景ID", "summary": "内容概述"}], "transitions": {"转换类型": 次数}}"""
+}
+
+# 合并模式：剧本只发送一次，一次返回三个部分
+COMBINED_PROMPT = """你是一个专业的剧本分析助手。请对提供的剧本同时完成角色、资源和场景三项分析：
+            1. 角色：每个角色的出场次数、对话数量、首次出现的场景
+            2. 资源：各类资源的详细列表及其首次出现的场景
+            3. 场景：场景数量、每个场景的内容概述、场景转换的频率
+            请以JSON格式返回，顶层包含三个键，格式为：
+            {"character_analysis": {"characters": [{"name": "角色名", "appearances": 出场次数, "dialogue_count": 对话数量, "first_scene": "首次出现的场景ID"}]},
+             "resource_analysis": {"resources_by_type": {"资源类型": ["资源名称"]}, "scene_distribution": {"资源名称": {"first_appearance": 首次出现的场景编号}}},
+             "scene_analysis": {"total_scenes": 场景数量, "scenes": [{"scene_id": "场景ID", "summary": "内容概述"}], "transitions": {"转换类型": 次数}}}"""
+
+ANALYSIS_MODES = ("sequential", "concurrent", "combined")
+
+# 对冲请求使用的线程池，主请求与对冲请求各占一个线程
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="openai-hedge")
+
 class AIAnalysisService:
     def __init__(self, max_retries: int = 3, initial_wait: float = 1):
         self.client = AzureOpenAI(
@@ -24,6 +68,44 @@ class AIAnalysisService:
         )
         self.max_retries = max_retries
         self.initial_wait = initial_wait
+        # 本实例累计的token用量，供基准测试和成本统计使用
+        self.usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._usage_lock = threading.Lock()
+
+    def _call_openai(self, system_prompt: str, user_prompt: str) -> str:
+        """
+        调用OpenAI API的方法，包含熔断、对冲请求和重试逻辑
+
+        重试只在_call_openai_with_retry内进行，重试耗尽后才向熔断器记一次失败；
+        熔断打开时调用进入有界的暂存队列，熔断半开/关闭后重放并返回结果，
+        队列已满或等待超时才抛出CircuitOpenError
+        """
+        try:
+            return self._guarded_call(system_prompt, user_prompt)
+        except CircuitOpenError as e:
+            logger.warning(f"{e}; deferring call until the circuit half-opens")
+            try:
+                future = deferred_calls.submit(
+                    lambda: self._guarded_call(system_prompt, user_prompt), e.retry_after
+                )
+                hedge_metrics.record_deferred()
+                return deferred_calls.wait(future, settings.OPENAI_DEFERRED_TIMEOUT)
+            except CircuitOpenError:
+                hedge_metrics.record_rejected()
+                raise
+
+    def _guarded_call(self, system_prompt: str, user_prompt: str) -> str:
+        """
+        经过熔断器的一次调用，熔断打开时抛出CircuitOpenError，不发送请求
+        """
+        openai_breaker.before_call()
+        try:
+            result = self._call_openai_with_retry(system_prompt, user_prompt)
+        except Exception:
+            openai_breaker.record_failure()
+            raise
+        openai_breaker.record_success()
+        return result
 
     @retry(
         stop=stop_after_attempt(3),
@@ -31,19 +113,16 @@ class AIAnalysisService:
         retry=retry_if_exception_type((APIError, APIConnectionError, RateLimitError)),
         before_sleep=lambda retry_state: logger.info(f"Retrying after {retry_state.next_action.sleep} seconds...")
     )
-    def _call_openai(self, system_prompt: str, user_prompt: str) -> str:
+    def _call_openai_with_retry(self, system_prompt: str, user_prompt: str) -> str:
         """
-        调用OpenAI API的方法，包含重试逻辑
+        单次带对冲的调用，显式错误由tenacity重试
         """
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ]
-            )
-            return response.choices[0].message.content
+            return self._hedged_completion(messages)
         except RateLimitError as e:
             logger.warning(f"Rate limit hit: {str(e)}")
             raise
@@ -57,32 +136,105 @@ class AIAnalysisService:
             logger.error(f"Unexpected error in OpenAI call: {str(e)}")
             raise AIAnalysisError(f"Failed to get AI response: {str(e)}")
 
+    def _create_completion(self, messages: List[Dict[str, str]]) -> str:
+        """
+        发送一次补全请求并记录耗时
+        """
+        started = time.monotonic()
+        response = self.client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=messages
+        )
+        openai_latency.record(time.monotonic() - started)
+        self._record_usage(response)
+        return response.choices[0].message.content
+
+    def _record_usage(self, response):
+        usage = getattr(response, "usage", None)
+        with self._usage_lock:
+            self.usage["calls"] += 1
+            if usage:
+                self.usage["prompt_tokens"] += usage.prompt_tokens or 0
+                self.usage["completion_tokens"] += usage.completion_tokens or 0
+
+    def _hedged_completion(self, messages: List[Dict[str, str]]) -> str:
+        """
+        主请求超过观测到的p95耗时仍未返回时，发送一个重复请求，取先完成的结果
+        """
+        hedge_delay = openai_latency.percentile(settings.OPENAI_HEDGE_PERCENTILE)
+        primary = _hedge_executor.submit(self._create_completion, messages)
+        if hedge_delay is None:
+            # 样本不足，不做对冲
+            result = primary.result()
+            hedge_metrics.record_call(hedged=False)
+            return result
+
+        done, _ = wait([primary], timeout=hedge_delay)
+        if done:
+            result = primary.result()
+            hedge_metrics.record_call(hedged=False)
+            return result
+
+        logger.info(f"OpenAI call exceeded p{settings.OPENAI_HEDGE_PERCENTILE:g} ({hedge_delay:.2f}s), sending hedge request")
+        hedge = _hedge_executor.submit(self._create_completion, messages)
+        pending = {primary, hedge}
+        last_error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    hedge_metrics.record_call(hedged=True, hedge_won=future is hedge)
+                    return future.result()
+                last_error = future.exception()
+        # 两个请求都失败，抛出最后一个错误交给重试逻辑
+        hedge_metrics.record_call(hedged=True)
+        raise last_error
+
     def _parse_ai_response(self, response: str) -> Dict[str, Any]:
         """
         解析AI响应，确保返回有效的JSON
         """
+        text = response.strip()
+        if text.startswith("```"):
+            # 去掉模型常加的 ```json 代码块包裹
+            text = text.split("\n", 1)[1] if "\n" in text else ""
+            text = text.rsplit("```", 1)[0]
         try:
-            return json.loads(response)
+            return json.loads(text)
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse AI response as JSON: {str(e)}")
             logger.error(f"Raw response: {response}")
             raise AIAnalysisError("AI response was not valid JSON")
 
+    def _analyze_section(self, section: str, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        """
+        调用模型并校验返回结构；本地修复失败时只针对该部分重试一次
+        """
+        result = self._call_openai(system_prompt, user_prompt)
+        return self._validate_or_retry(section, result, system_prompt, user_prompt)
+
+    def _validate_or_retry(self, section: str, response: str, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        """
+        校验单个分析部分，失败时把错误反馈给模型重新生成该部分
+        """
+        try:
+            return validate_section(section, self._parse_ai_response(response))
+        except (SchemaValidationError, AIAnalysisError) as e:
+            logger.warning(f"{section} failed validation, retrying section: {str(e)}")
+            retry_prompt = f"""{system_prompt}
+            上一次的输出不符合格式要求：{str(e)}
+            请只返回符合上述格式的JSON，不要包含其他文字。"""
+            result = self._call_openai(retry_prompt, user_prompt)
+            return validate_section(section, self._parse_ai_response(result))
+
     def analyze_characters(self, parsed_script: Dict[str, Any]) -> Dict[str, Any]:
         """
         分析角色信息，包含错误处理和重试
         """
         try:
-            system_prompt = """你是一个专业的剧本分析助手。请分析提供的剧本中的角色信息，包括：
-            1. 每个角色的出场次数
-            2. 每个角色的对话数量
-            3. 每个角色首次出现的场景
-            请以JSON格式返回分析结果。"""
-            
             user_prompt = json.dumps(parsed_script, ensure_ascii=False)
             
-            result = self._call_openai(system_prompt, user_prompt)
-            return self._parse_ai_response(result)
+            return self._analyze_section("character_analysis", SECTION_PROMPTS["character_analysis"], user_prompt)
         except Exception as e:
             logger.error(f"Character analysis failed: {str(e)}")
             raise AIAnalysisError(f"Failed to analyze characters: {str(e)}")
@@ -92,16 +244,9 @@ class AIAnalysisService:
         分析资源信息，包含错误处理和重试
         """
         try:
-            system_prompt = """你是一个专业的剧本分析助手。请分析提供的剧本中的资源信息，包括：
-            1. 各类资源的统计数量
-            2. 每种资源类型的详细列表
-            3. 资源在不同场景中的分布
-            请以JSON格式返回分析结果。"""
-            
             user_prompt = json.dumps(parsed_script, ensure_ascii=False)
             
-            result = self._call_openai(system_prompt, user_prompt)
-            return self._parse_ai_response(result)
+            return self._analyze_section("resource_analysis", SECTION_PROMPTS["resource_analysis"], user_prompt)
         except Exception as e:
             logger.error(f"Resource analysis failed: {str(e)}")
             raise AIAnalysisError(f"Failed to analyze resources: {str(e)}")
@@ -111,25 +256,66 @@ class AIAnalysisService:
         分析场景信息，包含错误处理和重试
         """
         try:
-            system_prompt = """你是一个专业的剧本分析助手。请分析提供的剧本中的场景信息，包括：
-            1. 场景数量统计
-            2. 每个场景的主要内容概述
-            3. 场景转换的频率和规律
-            请以JSON格式返回分析结果。"""
-            
             user_prompt = json.dumps(parsed_script, ensure_ascii=False)
             
-            result = self._call_openai(system_prompt, user_prompt)
-            return self._parse_ai_response(result)
+            return self._analyze_section("scene_analysis", SECTION_PROMPTS["scene_analysis"], user_prompt)
         except Exception as e:
             logger.error(f"Scene analysis failed: {str(e)}")
             raise AIAnalysisError(f"Failed to analyze scenes: {str(e)}")
 
-    def generate_complete_analysis(self, parsed_script: Dict[str, Any]) -> Dict[str, Any]:
+    def analyze_combined(self, parsed_script: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        合并模式：剧本只发送一次，一次返回三个部分；校验失败的部分单独回退
+        """
+        user_prompt = json.dumps(parsed_script, ensure_ascii=False)
+        try:
+            combined = self._parse_ai_response(self._call_openai(COMBINED_PROMPT, user_prompt))
+        except AIAnalysisError as e:
+            logger.warning(f"Combined analysis failed, falling back to separate sections: {str(e)}")
+            combined = {}
+        if not isinstance(combined, dict):
+            combined = {}
+
+        results = {}
+        for section, system_prompt in SECTION_PROMPTS.items():
+            try:
+                results[section] = validate_section(section, combined.get(section))
+            except SchemaValidationError as e:
+                logger.warning(f"Combined {section} failed validation, requesting section separately: {str(e)}")
+                try:
+                    results[section] = self._analyze_section(section, system_prompt, user_prompt)
+                except Exception as e:
+                    raise AIAnalysisError(f"Failed to analyze {section}: {str(e)}")
+        return results
+
+    def generate_complete_analysis(self, parsed_script: Dict[str, Any], mode: Optional[str] = None) -> Dict[str, Any]:
         """
         生成完整分析，包含错误处理
+
+        mode:
+            sequential - 三个部分依次请求（默认）
+            concurrent - 三个部分并发请求
+            combined - 单次请求同时生成三个部分
         """
+        mode = mode or settings.AI_ANALYSIS_MODE
+        if mode not in ANALYSIS_MODES:
+            raise AIAnalysisError(f"Unknown analysis mode: {mode}")
+
         try:
+            if mode == "combined":
+                return self.analyze_combined(parsed_script)
+
+            if mode == "concurrent":
+                with ThreadPoolExecutor(max_workers=3) as executor:
+                    characters = executor.submit(self.analyze_characters, parsed_script)
+                    resources = executor.submit(self.analyze_resources, parsed_script)
+                    scenes = executor.submit(self.analyze_scenes, parsed_script)
+                    return {
+                        "character_analysis": characters.result(),
+                        "resource_analysis": resources.result(),
+                        "scene_analysis": scenes.result()
+                    }
+
             return {
                 "character_analysis": self.analyze_characters(parsed_script),
                 "resource_analysis": self.analyze_resources(parsed_script),
@@ -137,4 +323,4 @@ class AIAnalysisService:
             }
         except Exception as e:
             logger.error(f"Complete analysis failed: {str(e)}")
-            raise AIAnalysisError(f"Failed to generate complete analysis: {str(e)}") 
\ No newline at end of file
+            raise AIAnalysisError(f"Failed to generate complete analysis: {str(e)}")
@@ -1,15 +1,22 @@
 import json
 from typing import List, Dict, Any, Optional
 import os
+import asyncio
+import logging
 from openai import AzureOpenAI
 from sqlalchemy.orm import Session
 from ..models.models import Script, Scene, Resource, ScriptStatus
 from ..core.config import settings
 from ..core.database import SessionLocal
 from .script_service import ScriptService
+from .scene_features import SceneFeatureIndex, get_scene_index
+from .analysis_store import AnalysisStore
+from .file_store import write_json_atomic, read_json, file_lock
 from pathlib import Path
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 # 配置Azure OpenAI
 client = AzureOpenAI(
     api_key=settings.OPENAI_API_KEY,
@@ -53,12 +60,18 @@ class AIGenerator:
                 }
 
                 # Save analysis results
-                await self._save_analysis_results(script_id, analysis_result)
+                version = await self._save_analysis_results(script_id, analysis_result)
+                # Indexing is secondary to the saved file; a store failure must not fail the analysis
+                try:
+                    AnalysisStore.save_analysis(db, script_id, analysis_result, source="ai_generator", version=version)
+                except Exception as e:
+                    logger.error(f"Failed to index analysis for script {script_id}: {str(e)}")
 
                 # Update script status
                 script.status = ScriptStatus.COMPLETED
                 script.metadata.update({
                     "analysis_completed_at": datetime.utcnow().isoformat(),
+                    "analysis_version": version,
                     "analysis_summary": {
                         "total_insights": len(analysis_result["recommendations"]),
                         "analyzed_elements": list(analysis_result.keys())
@@ -66,7 +79,7 @@ class AIGenerator:
                 })
                 db.commit()
 
-                return analysis_result
+                return {**analysis_result, "analysis_version": version}
 
             except Exception as e:
                 script.status = ScriptStatus.ERROR
@@ -80,17 +93,18 @@ class AIGenerator:
     async def _analyze_story_structure(self, parsed_data: Dict) -> Dict:
         """Analyze the story structure and plot elements."""
         scenes = parsed_data.get("scenes", [])
+        index = get_scene_index(parsed_data)
         
         # 分析故事结构
         return {
             "structure": {
                 "total_scenes": len(scenes),
                 "estimated_duration": len(scenes) * 3,  # 粗略估计每个场景3分钟
-                "pacing_analysis": self._analyze_pacing(scenes),
+                "pacing_analysis": self._analyze_pacing(index),
             },
             "plot_elements": {
-                "main_locations": self._extract_main_locations(scenes),
-                "time_periods": self._analyze_time_periods(scenes),
+                "main_locations": self._extract_main_locations(index),
+                "time_periods": self._analyze_time_periods(index),
             },
             "narrative_flow": self._analyze_narrative_flow(scenes)
         }
@@ -99,27 +113,29 @@ class AIGenerator:
         """Analyze character relationships and development."""
         characters = parsed_data.get("characters", [])
         scenes = parsed_data.get("scenes", [])
+        index = get_scene_index(parsed_data)
         
         return {
             "character_list": characters,
-            "main_characters": self._identify_main_characters(characters, scenes),
-            "character_relationships": self._analyze_character_relationships(characters, scenes),
+            "main_characters": self._identify_main_characters(characters, index),
+            "character_relationships": self._analyze_character_relationships(characters, scenes, index),
             "character_arcs": self._analyze_character_arcs(characters, scenes)
         }
 
     async def _analyze_scenes(self, parsed_data: Dict) -> Dict:
         """Analyze individual scenes and their connections."""
         scenes = parsed_data.get("scenes", [])
+        index = get_scene_index(parsed_data)
         
         return {
             "scene_breakdown": [
                 {
                     "scene_id": scene["id"],
-                    "intensity": self._calculate_scene_intensity(scene),
+                    "intensity": self._intensity_label(index.intensity[i]),
                     "key_elements": self._extract_scene_elements(scene),
                     "suggested_improvements": self._generate_scene_suggestions(scene)
                 }
-                for scene in scenes
+                for i, scene in enumerate(scenes)
             ],
             "scene_transitions": self._analyze_scene_transitions(scenes),
             "pacing_suggestions": self._generate_pacing_suggestions(scenes)
@@ -161,39 +177,56 @@ class AIGenerator:
             }
         ]
 
-    async def _save_analysis_results(self, script_id: int, analysis: Dict):
-        """Save analysis results to a file."""
-        analysis_file = self.output_dir / f"script_{script_id}_analysis.json"
-        with open(analysis_file, 'w', encoding='utf-8') as f:
-            json.dump(analysis, f, ensure_ascii=False, indent=2)
-
-    def _analyze_pacing(self, scenes: List[Dict]) -> Dict:
+    def analysis_file(self, script_id: int) -> Path:
+        return self.output_dir / f"script_{script_id}_analysis.json"
+
+    async def _save_analysis_results(self, script_id: int, analysis: Dict) -> int:
+        """Save analysis results to a file without blocking the event loop.
+
+        Serialization and the write run in a worker thread; the file is
+        written to a temp file and atomically renamed so readers never see
+        a partial document. The version number is stored in the file itself
+        as ``analysis_version`` (previous version + 1), so it survives
+        restarts; the read and the write happen under a file lock, so two
+        workers saving the same script cannot hand out the same version.
+        ``analysis`` itself is not modified. Returns the new version.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._write_versioned, self.analysis_file(script_id), analysis)
+
+    @staticmethod
+    def _write_versioned(path: Path, analysis: Dict) -> int:
+        with file_lock(path):
+            previous = read_json(path) or {}
+            version = int(previous.get("analysis_version", 0)) + 1
+            write_json_atomic(path, {**analysis, "analysis_version": version})
+        return version
+
+    async def load_analysis_results(self, script_id: int) -> Optional[Dict]:
+        """Read saved analysis results off the event loop; None if not generated yet."""
+        path = self.analysis_file(script_id)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, read_json, path)
+
+    @staticmethod
+    def analysis_etag(script_id: int, analysis: Dict) -> str:
+        """ETag for saved analysis results, derived from the persisted version."""
+        return f'"analysis-{script_id}-{analysis.get("analysis_version", 0)}"'
+
+    def _analyze_pacing(self, index: SceneFeatureIndex) -> Dict:
         """分析场景节奏."""
         return {
             "overall_pacing": "balanced",
-            "pacing_distribution": {
-                "fast_paced": len([s for s in scenes if self._is_fast_paced(s)]),
-                "medium_paced": len([s for s in scenes if self._is_medium_paced(s)]),
-                "slow_paced": len([s for s in scenes if self._is_slow_paced(s)])
-            }
+            "pacing_distribution": index.pace_counts()
         }
 
-    def _extract_main_locations(self, scenes: List[Dict]) -> List[str]:
+    def _extract_main_locations(self, index: SceneFeatureIndex) -> List[str]:
         """提取主要场景地点."""
-        locations = {}
-        for scene in scenes:
-            location = self._extract_location(scene)
-            locations[location] = locations.get(location, 0) + 1
-        return [loc for loc, count in sorted(locations.items(), key=lambda x: x[1], reverse=True)[:5]]
+        return list(index.location_counts(top=5).keys())
 
-    def _analyze_time_periods(self, scenes: List[Dict]) -> List[str]:
+    def _analyze_time_periods(self, index: SceneFeatureIndex) -> List[str]:
         """分析场景时间分布."""
-        time_periods = set()
-        for scene in scenes:
-            time_period = self._extract_time_period(scene)
-            if time_period:
-                time_periods.add(time_period)
-        return list(time_periods)
+        return list(index.time_period_counts().keys())
 
     def _analyze_narrative_flow(self, scenes: List[Dict]) -> Dict:
         """分析叙事流程."""
@@ -203,33 +236,26 @@ class AIGenerator:
             "suggested_improvements": self._suggest_narrative_improvements(scenes)
         }
 
-    def _identify_main_characters(self, characters: List[str], scenes: List[Dict]) -> List[str]:
+    def _identify_main_characters(self, characters: List[str], index: SceneFeatureIndex) -> List[str]:
         """识别主要角色."""
-        character_appearances = {char: 0 for char in characters}
-        for scene in scenes:
-            scene_chars = self._extract_scene_characters(scene)
-            for char in scene_chars:
-                if char in character_appearances:
-                    character_appearances[char] += 1
+        character_appearances = {char: index.appearances.get(char, 0) for char in characters}
         
         # 返回出现次数最多的角色
         return [char for char, count in sorted(character_appearances.items(), 
                                              key=lambda x: x[1], 
                                              reverse=True)[:3]]
 
-    def _analyze_character_relationships(self, characters: List[str], scenes: List[Dict]) -> List[Dict]:
+    def _analyze_character_relationships(self, characters: List[str], scenes: List[Dict],
+                                         index: SceneFeatureIndex) -> List[Dict]:
         """分析角色关系."""
-        relationships = []
-        for i, char1 in enumerate(characters):
-            for char2 in characters[i+1:]:
-                interaction_count = self._count_character_interactions(char1, char2, scenes)
-                if interaction_count > 0:
-                    relationships.append({
-                        "characters": [char1, char2],
-                        "interaction_count": interaction_count,
-                        "relationship_type": self._determine_relationship_type(char1, char2, scenes)
-                    })
-        return relationships
+        return [
+            {
+                "characters": [char1, char2],
+                "interaction_count": interaction_count,
+                "relationship_type": self._determine_relationship_type(char1, char2, scenes)
+            }
+            for char1, char2, interaction_count in index.character_pairs(characters)
+        ]
 
     def _analyze_character_arcs(self, characters: List[str], scenes: List[Dict]) -> List[Dict]:
         """分析角色发展弧线."""
@@ -243,10 +269,13 @@ class AIGenerator:
             character_arcs.append(arc)
         return character_arcs
 
-    def _calculate_scene_intensity(self, scene: Dict) -> str:
-        """计算场景强度."""
-        # 实现场景强度计算逻辑
-        return "medium"
+    def _intensity_label(self, score: float) -> str:
+        """把场景强度分数映射为等级."""
+        if score < 1 / 3:
+            return "low"
+        if score < 2 / 3:
+            return "medium"
+        return "high"
 
     def _extract_scene_elements(self, scene: Dict) -> List[str]:
         """提取场景关键元素."""
@@ -322,33 +351,12 @@ class AIGenerator:
         return ["production_suggestion1", "production_suggestion2"]
 
     # Helper methods
-    def _is_fast_paced(self, scene: Dict) -> bool:
-        return False  # 实现具体逻辑
-
-    def _is_medium_paced(self, scene: Dict) -> bool:
-        return True  # 实现具体逻辑
-
-    def _is_slow_paced(self, scene: Dict) -> bool:
-        return False  # 实现具体逻辑
-
-    def _extract_location(self, scene: Dict) -> str:
-        return scene.get("name", "").split()[0]
-
-    def _extract_time_period(self, scene: Dict) -> Optional[str]:
-        return None  # 实现具体逻辑
-
     def _identify_narrative_issues(self, scenes: List[Dict]) -> List[str]:
         return []  # 实现具体逻辑
 
     def _suggest_narrative_improvements(self, scenes: List[Dict]) -> List[str]:
         return []  # 实现具体逻辑
 
-    def _extract_scene_characters(self, scene: Dict) -> List[str]:
-        return []  # 实现具体逻辑
-
-    def _count_character_interactions(self, char1: str, char2: str, scenes: List[Dict]) -> int:
-        return 0  # 实现具体逻辑
-
     def _determine_relationship_type(self, char1: str, char2: str, scenes: List[Dict]) -> str:
         return "neutral"  # 实现具体逻辑
 
@@ -0,0 +1,229 @@
+from typing import Dict, Any, List, Callable
+import re
+
+# 各分析部分的期望结构
+# object: 必填/可选字段；array: 列表；map: 任意键到同一结构的映射
+SECTION_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "character_analysis": {
+        "type": "object",
+        "required": {
+            "characters": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "required": {"name": {"type": "string"}},
+                    "optional": {
+                        "appearances": {"type": "integer"},
+                        "dialogue_count": {"type": "integer"},
+                        "first_scene": {"type": "string"}
+                    }
+                }
+            }
+        }
+    },
+    "resource_analysis": {
+        "type": "object",
+        "required": {
+            "resources_by_type": {
+                "type": "map",
+                "values": {"type": "array", "items": {"type": "string"}}
+            }
+        },
+        "optional": {
+            "scene_distribution": {
+                "type": "map",
+                "values": {
+                    "type": "object",
+                    "optional": {"first_appearance": {"type": "integer"}}
+                }
+            }
+        }
+    },
+    "scene_analysis": {
+        "type": "object",
+        "required": {
+            "total_scenes": {"type": "integer"},
+            "scenes": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "required": {"scene_id": {"type": "string"}},
+                    "optional": {"summary": {"type": "string"}}
+                }
+            }
+        },
+        "optional": {
+            "transitions": {"type": "object"}
+        }
+    }
+}
+
+# 模型常见的键名变体；只在当前对象的schema包含目标字段时才改名
+KEY_ALIASES: Dict[str, str] = {
+    "resources": "resources_by_type",
+    "resource_types": "resources_by_type",
+    "distribution": "scene_distribution",
+    "scene_count": "total_scenes",
+    "num_scenes": "total_scenes",
+    "character_list": "characters",
+    "dialogues": "dialogue_count",
+    "dialogue_lines": "dialogue_count",
+    "appearance_count": "appearances",
+    "first_appearance_scene": "first_scene",
+    "id": "scene_id",
+}
+
+Validator = Callable[[Any, str], List[str]]
+
+
+class SchemaValidationError(Exception):
+    """AI返回的JSON结构不符合预期"""
+    def __init__(self, section: str, errors: List[str]):
+        self.section = section
+        self.errors = errors
+        super().__init__(f"{section} failed validation: {'; '.join(errors[:5])}")
+
+
+def _compile(spec: Dict[str, Any]) -> Validator:
+    """
+    把结构描述编译成嵌套闭包，校验时不再解释schema
+    """
+    kind = spec["type"]
+
+    if kind == "string":
+        return lambda value, path: [] if isinstance(value, str) else [f"{path}: expected string"]
+
+    if kind == "integer":
+        return lambda value, path: (
+            [] if isinstance(value, int) and not isinstance(value, bool) else [f"{path}: expected integer"]
+        )
+
+    if kind == "array":
+        item_validator = _compile(spec["items"])
+
+        def validate_array(value, path):
+            if not isinstance(value, list):
+                return [f"{path}: expected array"]
+            errors = []
+            for i, item in enumerate(value):
+                errors.extend(item_validator(item, f"{path}[{i}]"))
+            return errors
+        return validate_array
+
+    if kind == "map":
+        value_validator = _compile(spec["values"])
+
+        def validate_map(value, path):
+            if not isinstance(value, dict):
+                return [f"{path}: expected object"]
+            errors = []
+            for key, item in value.items():
+                errors.extend(value_validator(item, f"{path}.{key}"))
+            return errors
+        return validate_map
+
+    required = {key: _compile(sub) for key, sub in spec.get("required", {}).items()}
+    optional = {key: _compile(sub) for key, sub in spec.get("optional", {}).items()}
+
+    def validate_object(value, path):
+        if not isinstance(value, dict):
+            return [f"{path}: expected object"]
+        errors = []
+        for key, validator in required.items():
+            if key not in value:
+                errors.append(f"{path}.{key}: missing")
+            else:
+                errors.extend(validator(value[key], f"{path}.{key}"))
+        for key, validator in optional.items():
+            if value.get(key) is not None:
+                errors.extend(validator(value[key], f"{path}.{key}"))
+        return errors
+    return validate_object
+
+
+# 模块加载时预编译
+SECTION_VALIDATORS: Dict[str, Validator] = {
+    section: _compile(spec) for section, spec in SECTION_SCHEMAS.items()
+}
+
+
+def _normalize_key(key: str, fields: Dict[str, Any]) -> str:
+    normalized = re.sub(r"[\s\-]+", "_", str(key).strip()).lower()
+    alias = KEY_ALIASES.get(normalized)
+    # 例如"id"只在场景对象里映射为scene_id，角色或资源对象中的id保持不变
+    if alias in fields and normalized not in fields:
+        return alias
+    return normalized
+
+
+def _repair(value: Any, spec: Dict[str, Any]) -> Any:
+    """
+    本地修复：schema声明字段的键名规范化、列表和整数类型的宽松转换
+    """
+    kind = spec["type"]
+
+    if kind == "integer":
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str) and value.strip().isdigit():
+            return int(value.strip())
+        if isinstance(value, list):
+            return len(value)
+        return value
+
+    if kind == "string":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return str(value)
+        return value
+
+    if kind == "array":
+        if isinstance(value, str):
+            value = [value]
+        elif isinstance(value, dict):
+            if all(isinstance(item, dict) for item in value.values()):
+                # {"张三": {...}} -> [{"name": "张三", ...}]
+                value = [{"name": key, **item} for key, item in value.items()]
+            else:
+                value = list(value.keys())
+        if not isinstance(value, list):
+            return value
+        return [_repair(item, spec["items"]) for item in value]
+
+    if kind == "map":
+        if not isinstance(value, dict):
+            return value
+        return {key: _repair(item, spec["values"]) for key, item in value.items()}
+
+    fields = {**spec.get("optional", {}), **spec.get("required", {})}
+    if not isinstance(value, dict) or not fields:
+        # 未声明字段的对象（如transitions）键名是用户数据，原样保留
+        return value
+    repaired = {}
+    for key, item in value.items():
+        normalized = _normalize_key(key, fields)
+        if normalized in fields:
+            repaired[normalized] = _repair(item, fields[normalized])
+        else:
+            # 只规范化schema中声明的字段，其余键保持原名
+            repaired.setdefault(key, item)
+    return repaired
+
+
+def validate_section(section: str, data: Any) -> Dict[str, Any]:
+    """
+    校验一个分析部分；失败时先尝试本地修复，仍失败则抛出SchemaValidationError
+    """
+    validator = SECTION_VALIDATORS[section]
+    errors = validator(data, section)
+    if not errors:
+        return data
+
+    if isinstance(data, dict) and len(data) == 1 and section in data:
+        # 模型有时会把结果包在一层同名键下
+        data = data[section]
+    repaired = _repair(data, SECTION_SCHEMAS[section])
+    repaired_errors = validator(repaired, section)
+    if not repaired_errors:
+        return repaired
+
+    raise SchemaValidationError(section, repaired_errors)
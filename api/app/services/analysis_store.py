@@ -0,0 +1,215 @@
+from typing import List, Dict, Any, Optional
+from sqlalchemy.orm import Session
+from ..models.analysis import AnalysisSection, AnalysisSummary, AnalysisCharacter
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 场景强度等级对应的分数
+INTENSITY_SCORES = {"low": 0.0, "medium": 0.5, "high": 1.0}
+
+# 结果中不属于分析部分的元数据键
+NON_SECTION_KEYS = {"generated_at", "analysis_version"}
+
+
+class AnalysisStore:
+    @staticmethod
+    def save_analysis(
+        db: Session,
+        script_id: int,
+        analysis: Dict[str, Any],
+        source: str,
+        version: int = 1
+    ) -> AnalysisSummary:
+        """
+        保存分析结果：按部分写入analysis_sections，并刷新标量摘要和角色索引
+
+        角色和版本号都按来源分别记录，两种来源的写入互不覆盖
+        """
+        try:
+            existing = {
+                row.section: row
+                for row in db.query(AnalysisSection).filter(
+                    AnalysisSection.script_id == script_id,
+                    AnalysisSection.source == source
+                ).all()
+            }
+            for section, data in analysis.items():
+                if section in NON_SECTION_KEYS:
+                    continue
+                row = existing.get(section)
+                if row is None:
+                    row = AnalysisSection(script_id=script_id, source=source, section=section)
+                    db.add(row)
+                row.data = data
+                row.version = version
+
+            extracted = AnalysisStore._extract_scalars(analysis)
+
+            summary = db.query(AnalysisSummary).filter(AnalysisSummary.script_id == script_id).first()
+            if summary is None:
+                summary = AnalysisSummary(script_id=script_id)
+                db.add(summary)
+            summary.versions = {**(summary.versions or {}), source: version}
+            for field, value in extracted["summary"].items():
+                # 只覆盖本次结果中能提取到的字段，两种来源可互相补充
+                if value is not None:
+                    setattr(summary, field, value)
+
+            if extracted["characters"]:
+                db.query(AnalysisCharacter).filter(
+                    AnalysisCharacter.script_id == script_id,
+                    AnalysisCharacter.source == source
+                ).delete(synchronize_session=False)
+                db.add_all([
+                    AnalysisCharacter(script_id=script_id, source=source, **character)
+                    for character in extracted["characters"]
+                ])
+
+            db.commit()
+            return summary
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error saving analysis for script {script_id}: {str(e)}")
+            raise
+
+    @staticmethod
+    def _extract_scalars(analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        从AIGenerator或AIAnalysisService的结果中提取可索引字段
+        """
+        summary: Dict[str, Optional[Any]] = {
+            "total_scenes": None,
+            "estimated_duration": None,
+            "avg_scene_intensity": None,
+            "high_intensity_scenes": None,
+            "total_characters": None,
+            "total_resources": None
+        }
+        characters: List[Dict[str, Any]] = []
+
+        structure = (analysis.get("story_analysis") or {}).get("structure") or {}
+        summary["total_scenes"] = structure.get("total_scenes")
+        summary["estimated_duration"] = structure.get("estimated_duration")
+
+        scene_analysis = analysis.get("scene_analysis") or {}
+        if summary["total_scenes"] is None:
+            summary["total_scenes"] = scene_analysis.get("total_scenes")
+        intensities = [
+            INTENSITY_SCORES[scene["intensity"]]
+            for scene in scene_analysis.get("scene_breakdown", [])
+            if scene.get("intensity") in INTENSITY_SCORES
+        ]
+        if intensities:
+            summary["avg_scene_intensity"] = sum(intensities) / len(intensities)
+            summary["high_intensity_scenes"] = sum(1 for score in intensities if score >= 1.0)
+
+        character_analysis = analysis.get("character_analysis") or {}
+        if "character_list" in character_analysis:
+            # AIGenerator: 角色名列表 + 主要角色
+            main = set(character_analysis.get("main_characters", []))
+            characters = [
+                {"name": name, "is_main": name in main, "appearances": None}
+                for name in dict.fromkeys(character_analysis["character_list"])
+            ]
+        elif "characters" in character_analysis:
+            # AIAnalysisService: 带出场次数的角色列表，出场最多的三个视为主要角色
+            ranked = sorted(
+                character_analysis["characters"],
+                key=lambda c: c.get("appearances") or 0,
+                reverse=True
+            )
+            main = {c["name"] for c in ranked[:3]}
+            seen = set()
+            for c in ranked:
+                if c["name"] in seen:
+                    continue
+                seen.add(c["name"])
+                characters.append({
+                    "name": c["name"],
+                    "is_main": c["name"] in main,
+                    "appearances": c.get("appearances")
+                })
+        if characters:
+            summary["total_characters"] = len(characters)
+
+        resource_analysis = analysis.get("resource_analysis") or {}
+        if "resource_summary" in resource_analysis:
+            summary["total_resources"] = resource_analysis["resource_summary"].get("total_resources")
+        elif "resources_by_type" in resource_analysis:
+            summary["total_resources"] = sum(
+                len(names) for names in resource_analysis["resources_by_type"].values()
+            )
+
+        return {"summary": summary, "characters": characters}
+
+    @staticmethod
+    def get_section(
+        db: Session,
+        script_id: int,
+        section: str,
+        source: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        读取单个分析部分，不加载整个结果
+        """
+        query = db.query(AnalysisSection).filter(
+            AnalysisSection.script_id == script_id,
+            AnalysisSection.section == section
+        )
+        if source:
+            query = query.filter(AnalysisSection.source == source)
+        row = query.order_by(AnalysisSection.updated_at.desc()).first()
+        if row is None:
+            return None
+        return {
+            "script_id": row.script_id,
+            "source": row.source,
+            "section": row.section,
+            "version": row.version,
+            "data": row.data
+        }
+
+    @staticmethod
+    def find_scripts_by_main_character(db: Session, name: str) -> List[int]:
+        """
+        查询角色为主要角色的所有剧本（任一来源认定即可），走(name, is_main)索引
+        """
+        rows = (
+            db.query(AnalysisCharacter.script_id)
+            .filter(AnalysisCharacter.name == name, AnalysisCharacter.is_main.is_(True))
+            .distinct()
+            .order_by(AnalysisCharacter.script_id)
+            .all()
+        )
+        return [script_id for script_id, in rows]
+
+    @staticmethod
+    def find_scripts(
+        db: Session,
+        min_scenes: Optional[int] = None,
+        max_scenes: Optional[int] = None,
+        min_intensity: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        按提取的标量字段筛选剧本
+        """
+        query = db.query(AnalysisSummary)
+        if min_scenes is not None:
+            query = query.filter(AnalysisSummary.total_scenes >= min_scenes)
+        if max_scenes is not None:
+            query = query.filter(AnalysisSummary.total_scenes <= max_scenes)
+        if min_intensity is not None:
+            query = query.filter(AnalysisSummary.avg_scene_intensity >= min_intensity)
+        return [
+            {
+                "script_id": s.script_id,
+                "total_scenes": s.total_scenes,
+                "avg_scene_intensity": s.avg_scene_intensity,
+                "high_intensity_scenes": s.high_intensity_scenes,
+                "total_characters": s.total_characters,
+                "total_resources": s.total_resources
+            }
+            for s in query.order_by(AnalysisSummary.script_id).all()
+        ]
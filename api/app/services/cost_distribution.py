@@ -0,0 +1,317 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Any
+from collections import OrderedDict
+import threading
+import numpy as np
+from sqlalchemy import select, type_coerce, String
+from sqlalchemy.orm import Session
+
+from ..models.resource import Resource, ResourceStatus
+
+# 分布统计输出的分位点
+PERCENTILES = (50, 90, 99)
+
+DEFAULT_HISTOGRAM_BINS = 20
+MAX_HISTOGRAM_BINS = 200
+
+# 离群判定（Tukey fences）：偏差超出本类型[Q1 - k*IQR, Q3 + k*IQR]即为离群
+OUTLIER_IQR_FACTOR = 1.5
+
+# 每个类型最多列出的离群资源（按偏差绝对值从大到小）
+MAX_OUTLIERS_PER_TYPE = 20
+
+
+def _encode(values: Sequence[Optional[str]], default: str) -> Tuple[np.ndarray, List[str]]:
+    """
+    字符串列编码为整数，编号按首次出现顺序
+    """
+    lookup: Dict[str, int] = {}
+    codes = np.fromiter(
+        (lookup.setdefault(value or default, len(lookup)) for value in values),
+        dtype=np.int64,
+        count=len(values)
+    )
+    return codes, list(lookup)
+
+
+class CostColumns:
+    """
+    按列存放的资源成本数据，各数组按行对齐；预算缺失为NaN
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        type_codes: np.ndarray,
+        type_names: List[str],
+        status_codes: np.ndarray,
+        status_names: List[str],
+        estimated: np.ndarray,
+        actual: np.ndarray
+    ):
+        self.ids = ids
+        self.type_codes = type_codes
+        self.type_names = type_names
+        self.status_codes = status_codes
+        self.status_names = status_names
+        self.estimated = estimated
+        self.actual = actual
+
+    @classmethod
+    def fetch(cls, db: Session, script_id: Optional[int] = None) -> "CostColumns":
+        """
+        一次查询取出(id, type, status, 预估, 实际)，直接转为列数组
+        """
+        # status按存储的枚举名读取，跳过逐行的Enum转换
+        stmt = select(
+            Resource.id,
+            Resource.type,
+            type_coerce(Resource.status, String),
+            Resource.estimated_budget,
+            Resource.actual_budget
+        )
+        if script_id:
+            stmt = stmt.where(Resource.script_id == script_id)
+        # 走Core连接执行，不经过ORM结果加载
+        rows = db.connection().execute(stmt).all()
+
+        if rows:
+            ids, types, statuses, estimated, actual = zip(*rows)
+        else:
+            ids = types = statuses = estimated = actual = ()
+        type_codes, type_names = _encode(types, "")
+        status_codes, status_names = _encode(statuses, ResourceStatus.PENDING.name)
+        # 取数时按类型排一次行，列数据随版本缓存，按类型分组的各指标计算不再重复分组
+        order = np.argsort(type_codes.astype(np.int16) if len(type_names) <= np.iinfo(np.int16).max
+                           else type_codes, kind="stable")
+        return cls(
+            np.array(ids, dtype=np.int64)[order],
+            type_codes[order],
+            type_names,
+            status_codes[order],
+            [ResourceStatus[name].value for name in status_names],
+            # None转为NaN
+            np.array(estimated, dtype=np.float64)[order],
+            np.array(actual, dtype=np.float64)[order]
+        )
+
+    def __len__(self) -> int:
+        return self.ids.size
+
+
+class GroupedValues:
+    """
+    一个指标按组排好序的值：每组为一段连续的有序区间，NaN已剔除
+
+    分位数、矩和直方图都复用这一次排序，每个指标只排序一次
+    """
+
+    def __init__(self, codes: np.ndarray, values: np.ndarray, n_groups: int):
+        valid = ~np.isnan(values)
+        codes, values = codes[valid], values[valid]
+        self.n_groups = n_groups
+        self.counts = np.bincount(codes, minlength=n_groups)
+        self.starts = np.cumsum(self.counts) - self.counts
+
+        if codes.size and np.any(codes[1:] < codes[:-1]):
+            # 16位整数的稳定排序走基数排序，比np.lexsort((values, codes))快一个数量级
+            narrow = codes.astype(np.int16) if n_groups <= np.iinfo(np.int16).max else codes
+            self.values = values[np.argsort(narrow, kind="stable")]
+        else:
+            # 行已按组排列（CostColumns.fetch按类型排过序），无需再分组
+            self.values = values.copy()
+        for start, count in zip(self.starts.tolist(), self.counts.tolist()):
+            self.values[start:start + count].sort()
+
+    def percentiles(self, percentiles: Sequence[float]) -> np.ndarray:
+        """
+        各组的分位数（线性插值，与np.percentile一致），形状为(组数, 分位点数)；空组为NaN
+        """
+        result = np.full((self.n_groups, len(percentiles)), np.nan)
+        size = self.values.size
+        if size == 0:
+            return result
+        q = np.asarray(percentiles, dtype=np.float64) / 100
+        position = self.starts[:, None] + q[None, :] * np.maximum(self.counts - 1, 0)[:, None]
+        lower = np.minimum(np.floor(position).astype(np.int64), size - 1)
+        upper = np.minimum(np.ceil(position).astype(np.int64), size - 1)
+        interpolated = self.values[lower] + (self.values[upper] - self.values[lower]) * (position - lower)
+
+        non_empty = self.counts > 0
+        result[non_empty] = interpolated[non_empty]
+        return result
+
+    def moments(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        各组的(均值, 总体标准差)，空组为NaN
+        """
+        sums = np.zeros(self.n_groups)
+        squares = np.zeros(self.n_groups)
+        present = self.counts > 0
+        if present.any():
+            # 各组是连续区间，按区间起点分段求和
+            starts = self.starts[present]
+            sums[present] = np.add.reduceat(self.values, starts)
+            squares[present] = np.add.reduceat(self.values * self.values, starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / self.counts
+            variances = np.maximum(squares / self.counts - means * means, 0.0)
+        return means, np.sqrt(variances)
+
+    def histograms(self, bins: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        各组在本组[最小值, 最大值]上等宽分箱的直方图
+
+        返回(边界 (组数, bins+1), 计数 (组数, bins))；最值直接取有序区间两端，一次bincount完成所有组的计数
+        """
+        edges = np.full((self.n_groups, bins + 1), np.nan)
+        present = self.counts > 0
+        if not present.any():
+            return edges, np.zeros((self.n_groups, bins), dtype=np.int64)
+
+        minimums = np.zeros(self.n_groups)
+        maximums = np.zeros(self.n_groups)
+        minimums[present] = self.values[self.starts[present]]
+        maximums[present] = self.values[self.starts[present] + self.counts[present] - 1]
+        # 组内所有值相同时给一个单位宽度，避免除零
+        spans = np.where(maximums > minimums, maximums - minimums, 1.0)
+
+        codes = np.repeat(np.arange(self.n_groups), self.counts)
+        bin_index = ((self.values - minimums[codes]) / spans[codes] * bins).astype(np.int64)
+        np.clip(bin_index, 0, bins - 1, out=bin_index)
+        counts = np.bincount(codes * bins + bin_index, minlength=self.n_groups * bins).reshape(self.n_groups, bins)
+
+        steps = np.linspace(0.0, 1.0, bins + 1)
+        edges[present] = minimums[present, None] + spans[present, None] * steps[None, :]
+        return edges, counts
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        各组的数量、均值、标准差和PERCENTILES分位数
+        """
+        means, stds = self.moments()
+        quantiles = self.percentiles(PERCENTILES)
+        return [_stats(self.counts[g], means[g], stds[g], quantiles[g]) for g in range(self.n_groups)]
+
+
+def _stats(count: int, mean: float, std: float, quantiles: np.ndarray) -> Dict[str, Any]:
+    def value(x):
+        return None if np.isnan(x) else round(float(x), 2)
+
+    stats = {"count": int(count), "mean": value(mean), "std": value(std)}
+    for p, q in zip(PERCENTILES, quantiles):
+        stats[f"p{p}"] = value(q)
+    return stats
+
+
+def compute_cost_distribution(columns: CostColumns, bins: int = DEFAULT_HISTOGRAM_BINS) -> Dict[str, Any]:
+    """
+    按资源类型计算预估/实际/偏差（实际-预估）的分位数、实际预算直方图和偏差离群资源，
+    并按状态给出偏差分布
+    """
+    n_types = len(columns.type_names)
+    n_statuses = len(columns.status_names)
+    type_codes = columns.type_codes
+    variance = columns.actual - columns.estimated  # 任一缺失即为NaN
+
+    actual_groups = GroupedValues(type_codes, columns.actual, n_types)
+    variance_groups = GroupedValues(type_codes, variance, n_types)
+    estimated_stats = GroupedValues(type_codes, columns.estimated, n_types).stats()
+    actual_stats = actual_groups.stats()
+    variance_stats = variance_groups.stats()
+    status_variance_stats = GroupedValues(columns.status_codes, variance, n_statuses).stats()
+    edges, histograms = actual_groups.histograms(bins)
+
+    # 离群：偏差超出本类型的Tukey fences，四分位数复用偏差的分组排序
+    has_variance = ~np.isnan(variance)
+    variance_codes = type_codes[has_variance]
+    variance_values = variance[has_variance]
+    quartiles = variance_groups.percentiles((25, 75))
+    iqr = quartiles[:, 1] - quartiles[:, 0]
+    lower_fences = quartiles[:, 0] - OUTLIER_IQR_FACTOR * iqr
+    upper_fences = quartiles[:, 1] + OUTLIER_IQR_FACTOR * iqr
+    flags = (
+        (variance_values < lower_fences[variance_codes])
+        | (variance_values > upper_fences[variance_codes])
+    )
+    outlier_rows = np.flatnonzero(has_variance)[flags]
+    outlier_codes = variance_codes[flags]
+    outlier_counts = np.bincount(outlier_codes, minlength=n_types)
+
+    # 每个类型内按偏差绝对值从大到小取前N个
+    order = np.lexsort((-np.abs(variance[outlier_rows]), outlier_codes))
+    outlier_rows, outlier_codes = outlier_rows[order], outlier_codes[order]
+    starts = np.cumsum(outlier_counts) - outlier_counts
+    keep = np.arange(outlier_rows.size) - starts[outlier_codes] < MAX_OUTLIERS_PER_TYPE
+    top_outliers: List[List[Dict[str, Any]]] = [[] for _ in range(n_types)]
+    for row, code in zip(outlier_rows[keep].tolist(), outlier_codes[keep].tolist()):
+        top_outliers[code].append({
+            "id": int(columns.ids[row]),
+            "status": columns.status_names[columns.status_codes[row]],
+            "estimated": float(columns.estimated[row]),
+            "actual": float(columns.actual[row]),
+            "variance": float(variance[row])
+        })
+
+    resource_counts = np.bincount(type_codes, minlength=n_types)
+    by_type = {}
+    for g, type_name in enumerate(columns.type_names):
+        by_type[type_name] = {
+            "count": int(resource_counts[g]),
+            "estimated": estimated_stats[g],
+            "actual": actual_stats[g],
+            "variance": variance_stats[g],
+            "histogram": {
+                "metric": "actual",
+                "bin_edges": [] if np.isnan(edges[g, 0]) else [round(float(e), 2) for e in edges[g]],
+                "counts": histograms[g].tolist()
+            },
+            "outliers": {
+                "count": int(outlier_counts[g]),
+                "lower_fence": None if np.isnan(lower_fences[g]) else round(float(lower_fences[g]), 2),
+                "upper_fence": None if np.isnan(upper_fences[g]) else round(float(upper_fences[g]), 2),
+                "resources": top_outliers[g]
+            }
+        }
+
+    return {
+        "total_resources": len(columns),
+        "percentiles": list(PERCENTILES),
+        "by_type": by_type,
+        "by_status": {
+            status: {"variance": status_variance_stats[g]}
+            for g, status in enumerate(columns.status_names)
+        }
+    }
+
+
+class CostColumnsCache:
+    """
+    按(剧本, 资源数据版本)缓存列数据；资源写入后版本号变化，旧数据自动失效
+    """
+
+    def __init__(self, maxsize: int = 16):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[int, Tuple[int, CostColumns]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: int, version: int) -> Optional[CostColumns]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: int, version: int, columns: CostColumns):
+        with self._lock:
+            self._entries[key] = (version, columns)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+# 全局缓存实例
+cost_columns_cache = CostColumnsCache()
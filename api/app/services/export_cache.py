@@ -0,0 +1,118 @@
+from typing import Dict, Any, Iterator, Optional
+from pathlib import Path
+from sqlalchemy.orm import Session
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import logging
+
+from ..core.config import settings
+from ..models.resource import ResourceDataVersion, ALL_SCRIPTS_VERSION_KEY
+
+logger = logging.getLogger(__name__)
+
+
+def get_resource_version(db: Session, script_id: Optional[int] = None) -> int:
+    """
+    读取剧本（未指定时为全部剧本）的资源数据版本号，从未写入过时为0
+    """
+    key = script_id if script_id else ALL_SCRIPTS_VERSION_KEY
+    version = (
+        db.query(ResourceDataVersion.version)
+        .filter(ResourceDataVersion.script_id == key)
+        .scalar()
+    )
+    return version or 0
+
+
+class ExportCache:
+    """
+    磁盘上的导出文件缓存，按(导出类型, 过滤条件, 格式, 数据版本)寻址
+
+    数据版本变化后旧文件不再被命中，由LRU淘汰；命中时更新文件访问时间
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = 512 * 1024 * 1024, max_entries: int = 256):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind: str, filters: Dict[str, Any], format: str, version: int) -> str:
+        payload = json.dumps(
+            {"kind": kind, "filters": filters, "format": format, "version": version},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, format: str) -> Path:
+        return self.directory / f"{key}.{format}"
+
+    def get(self, key: str, format: str) -> Optional[Path]:
+        path = self._path(key, format)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def store(self, key: str, format: str, chunks: Iterator[bytes]) -> Path:
+        """
+        将导出内容写入缓存，先写临时文件再原子替换，避免读到半个文件
+        """
+        for _ in self.tee(key, format, chunks):
+            pass
+        return self._path(key, format)
+
+    def tee(self, key: str, format: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """
+        边输出边写入缓存：每块写入临时文件后原样返回，全部输出完才原子替换进缓存；
+        生成失败或调用方提前关闭（如客户端断开）时丢弃临时文件
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{key}.", suffix=".tmp")
+        completed = False
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, self._path(key, format))
+            completed = True
+        finally:
+            if not completed and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict()
+
+    def evict(self):
+        """
+        按最近访问时间淘汰，直到文件数和总大小都在上限内
+        """
+        with self._lock:
+            entries = []
+            for path in self.directory.iterdir():
+                if path.name.startswith("."):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            entries.sort()
+
+            total = sum(size for _, size, _ in entries)
+            while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+                _, size, path = entries.pop(0)
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+# 全局导出缓存实例
+export_cache = ExportCache(Path(settings.UPLOAD_DIR) / "export_cache")
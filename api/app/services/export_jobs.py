@@ -0,0 +1,220 @@
+from typing import Dict, List, Any, Optional, Tuple, Iterator
+from datetime import datetime
+from io import StringIO
+import asyncio
+import csv
+import math
+import os
+import tempfile
+import uuid
+import logging
+
+import pandas as pd
+import xlsxwriter
+
+from ..core.database import SessionLocal
+from .resource_service import (
+    ResourceService, EXPORT_CHUNK_SIZE, XLSX_HEADER_FORMAT, XLSX_CELL_FORMATS, xlsx_column_format
+)
+from .export_cache import export_cache, get_resource_version
+from .websocket_manager import notify_export_job
+
+logger = logging.getLogger(__name__)
+
+# 支持后台导出的报告：类型 -> (统计函数, 工作表构建函数)
+EXPORT_JOB_KINDS = {
+    "statistics": (ResourceService.get_resource_statistics, ResourceService.statistics_sheets),
+    "cost_analysis": (ResourceService.get_cost_analysis, ResourceService.cost_analysis_sheets),
+}
+
+# 自动列宽上限
+MAX_COLUMN_WIDTH = 60
+
+
+def _cell(value: Any) -> Any:
+    # NaN和numpy标量转换为可写入的Python值
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def render_sheet(name: str, df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Render one sheet into plain rows plus layout (column widths and number formats).
+
+    Report sheets are small, so this runs on a worker thread next to the
+    workbook writer; shipping DataFrames to worker processes cost more than
+    the rendering itself.
+    """
+    columns = [str(col) for col in df.columns]
+    rows = [[_cell(value) for value in row] for row in df.itertuples(index=False, name=None)]
+
+    widths = []
+    formats = []
+    for i, col in enumerate(columns):
+        longest = max([len(col)] + [len(str(row[i])) for row in rows if row[i] is not None])
+        widths.append(min(max(longest + 2, 15), MAX_COLUMN_WIDTH))
+        formats.append(xlsx_column_format(col))
+
+    return {"name": name, "columns": columns, "rows": rows, "widths": widths, "formats": formats}
+
+
+def _stitch_xlsx(sheets: List[Dict[str, Any]]) -> Iterator[bytes]:
+    """按顺序把各工作表写入同一个工作簿"""
+    fd, tmp_path = tempfile.mkstemp(prefix="export_job_", suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(tmp_path, {"constant_memory": True})
+        header_format = workbook.add_format(XLSX_HEADER_FORMAT)
+        cell_formats = {key: workbook.add_format(fmt) for key, fmt in XLSX_CELL_FORMATS.items()}
+        cell_formats[None] = None
+
+        for sheet in sheets:
+            worksheet = workbook.add_worksheet(sheet["name"])
+            for i, width in enumerate(sheet["widths"]):
+                worksheet.set_column(i, i, width, cell_formats[sheet["formats"][i]])
+            worksheet.write_row(0, 0, sheet["columns"], header_format)
+            for row_num, row in enumerate(sheet["rows"], start=1):
+                worksheet.write_row(row_num, 0, row)
+
+        workbook.close()
+
+        with open(tmp_path, "rb") as f:
+            while True:
+                chunk = f.read(EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(tmp_path)
+
+
+def _stitch_csv(sheets: List[Dict[str, Any]]) -> Iterator[bytes]:
+    """CSV没有工作表，各表依次输出，表名单独一行，表之间空一行"""
+    for i, sheet in enumerate(sheets):
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        if i:
+            writer.writerow([])
+        writer.writerow([sheet["name"]])
+        writer.writerow(sheet["columns"])
+        writer.writerows([["" if value is None else value for value in row] for row in sheet["rows"]])
+        yield buffer.getvalue().encode("utf-8-sig" if i == 0 else "utf-8")
+
+
+class ExportJob:
+    def __init__(self, kind: str, format: str, script_id: Optional[int]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.format = format
+        self.script_id = script_id
+        self.status = "pending"
+        self.progress = 0.0
+        self.error: Optional[str] = None
+        self.cache_key: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "format": self.format,
+            "script_id": self.script_id,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class ExportJobManager:
+    """
+    Background export jobs: submit, poll or subscribe to the ``exports``
+    websocket channel, then download.
+
+    Report data is aggregated, sheets are rendered and stitched into one
+    file on worker threads, so the event loop never runs pandas or
+    xlsxwriter itself.
+    """
+
+    def __init__(self, max_jobs: int = 200):
+        self.max_jobs = max_jobs
+        self.jobs: Dict[str, ExportJob] = {}
+        self._tasks = set()
+
+    def submit(self, kind: str, format: str, script_id: Optional[int] = None) -> ExportJob:
+        if kind not in EXPORT_JOB_KINDS:
+            raise ValueError(f"Unsupported export kind: {kind}")
+        job = ExportJob(kind, format, script_id)
+        self.jobs[job.id] = job
+        self._prune()
+
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        return self.jobs.get(job_id)
+
+    def artifact_path(self, job: ExportJob):
+        if job.status != "completed" or job.cache_key is None:
+            return None
+        return export_cache.get(job.cache_key, job.format)
+
+    def _prune(self):
+        # 只保留最近的任务记录，优先丢弃已结束的任务
+        finished = [job for job in self.jobs.values() if job.status in ("completed", "failed")]
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job.id]
+
+    async def _update(self, job: ExportJob, status: str, progress: float, message: str):
+        job.status = status
+        job.progress = progress
+        await notify_export_job(job.id, status, progress, message)
+
+    def _load_sheets(self, job: ExportJob) -> Tuple[str, List[Tuple[str, pd.DataFrame]]]:
+        compute, build_sheets = EXPORT_JOB_KINDS[job.kind]
+        db = SessionLocal()
+        try:
+            version = get_resource_version(db, job.script_id)
+            key = export_cache.make_key(f"{job.kind}_job", {"script_id": job.script_id}, job.format, version)
+            if export_cache.get(key, job.format) is not None:
+                return key, []
+            return key, build_sheets(compute(db, job.script_id))
+        finally:
+            db.close()
+
+    async def _run(self, job: ExportJob):
+        try:
+            await self._update(job, "running", 0.0, "Collecting report data")
+            job.cache_key, sheets = await asyncio.to_thread(self._load_sheets, job)
+
+            if sheets:
+                rendered = []
+                for name, df in sheets:
+                    rendered.append(await asyncio.to_thread(render_sheet, name, df))
+                    await self._update(
+                        job, "running", len(rendered) / (len(sheets) + 1),
+                        f"Rendered {len(rendered)}/{len(sheets)} sheets"
+                    )
+
+                stitch = _stitch_xlsx if job.format == "xlsx" else _stitch_csv
+                await asyncio.to_thread(lambda: export_cache.store(job.cache_key, job.format, stitch(rendered)))
+
+            job.finished_at = datetime.utcnow()
+            await self._update(job, "completed", 1.0, "Export ready")
+
+        except Exception as e:
+            logger.error(f"Export job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            await self._update(job, "failed", job.progress, str(e))
+
+
+# 全局导出任务管理器
+export_jobs = ExportJobManager()
@@ -0,0 +1,69 @@
+from typing import Dict, Any, Optional, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to an in-process lock
+    fcntl = None
+
+_process_lock = threading.Lock()
+
+
+def write_json_atomic(path: Path, data: Any):
+    """
+    Write JSON to a temp file in the same directory, fsync it and rename it
+    over ``path``, so readers see either the old or the new document, never
+    a partial one.
+    """
+    payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """
+    Hold an exclusive lock for ``path`` during a read-modify-write, such as
+    bumping a version counter stored inside the document.
+
+    The lock is a flock on a ``.lock`` sidecar, so it serializes writers in
+    every worker process on the host; each call opens its own descriptor, so
+    threads in one process exclude each other as well. Without fcntl
+    (Windows) only threads within this process are serialized.
+    """
+    lock_path = path.with_name(f".{path.name}.lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        with _process_lock:
+            yield
+        return
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def read_json(path: Path) -> Optional[Dict]:
+    """Read a JSON document; None if the file does not exist."""
+    try:
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,277 @@
+from typing import Dict, Any, Optional, Deque, Callable, Tuple
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError, InvalidStateError
+import threading
+import time
+import logging
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class LatencyTracker:
+    """
+    记录最近的LLM调用耗时，用于计算对冲请求的触发阈值
+    """
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        返回最近样本的百分位耗时，样本不足时返回None（不触发对冲）
+        """
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态时快速失败"""
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"LLM endpoint circuit is open, retry after {retry_after:.1f}s")
+
+
+class CircuitBreaker:
+    """
+    基于滑动窗口错误率的熔断器
+
+    closed: 正常放行；错误率超过阈值后进入open
+    open: 在cooldown内直接失败；cooldown结束后进入half_open
+    half_open: 只放行一个探测请求，成功则关闭，失败则重新打开
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        error_rate_threshold: float = 0.5,
+        window: int = 20,
+        min_calls: int = 10,
+        cooldown: float = 30.0
+    ):
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.results: Deque[bool] = deque(maxlen=window)
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.open_count = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        调用前检查熔断状态，打开时抛出CircuitOpenError
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                elapsed = time.monotonic() - self.opened_at
+                if elapsed < self.cooldown:
+                    raise CircuitOpenError(self.cooldown - elapsed)
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError(self.cooldown)
+                self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.results.append(True)
+            if self.state == self.HALF_OPEN:
+                logger.info("LLM circuit breaker closed after successful probe")
+                self.state = self.CLOSED
+                self.results.clear()
+                self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.results.append(False)
+            if self.state == self.HALF_OPEN:
+                self._open()
+                return
+            if len(self.results) >= self.min_calls and self.error_rate() >= self.error_rate_threshold:
+                self._open()
+
+    def retry_after(self) -> float:
+        """
+        打开状态下距离允许探测还需等待的秒数，其他状态为0
+        """
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def error_rate(self) -> float:
+        if not self.results:
+            return 0.0
+        return self.results.count(False) / len(self.results)
+
+    def _open(self):
+        logger.warning(f"LLM circuit breaker opened, error rate {self.error_rate():.0%}")
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.open_count += 1
+        self._probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "error_rate": round(self.error_rate(), 4),
+                "window_calls": len(self.results),
+                "open_count": self.open_count
+            }
+
+
+class DeferredCallQueue:
+    """
+    熔断打开期间暂存的调用
+
+    队列有上限，满时直接抛出CircuitOpenError；后台线程在冷却结束后按顺序重放，
+    第一个重放的调用就是半开探测，成功后熔断关闭，其余调用随之放行；
+    结果通过Future交回仍在等待的调用方
+    """
+    def __init__(self, breaker: CircuitBreaker, maxsize: int = 32, poll_interval: float = 1.0):
+        self.breaker = breaker
+        self.maxsize = maxsize
+        self.poll_interval = poll_interval
+        self._items: Deque[Tuple[Callable[[], Any], Future]] = deque()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def submit(self, call: Callable[[], Any], retry_after: float) -> Future:
+        """
+        暂存一次调用，返回其结果的Future；队列已满时抛出CircuitOpenError
+        """
+        with self._lock:
+            if len(self._items) >= self.maxsize:
+                raise CircuitOpenError(retry_after)
+            future: Future = Future()
+            self._items.append((call, future))
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._drain, name="openai-deferred", daemon=True)
+                self._worker.start()
+            return future
+
+    def wait(self, future: Future, timeout: float) -> Any:
+        """
+        等待暂存调用的结果；超时则放弃该调用并抛出CircuitOpenError
+        """
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # 已取消的调用在重放时跳过，或在完成时丢弃结果
+            future.cancel()
+            raise CircuitOpenError(self.breaker.retry_after())
+
+    def _drain(self):
+        while True:
+            delay = self.breaker.retry_after()
+            if delay > 0:
+                time.sleep(delay)
+            with self._lock:
+                if not self._items:
+                    self._worker = None
+                    return
+                call, future = self._items.popleft()
+            if future.cancelled():
+                continue
+            try:
+                result = call()
+            except CircuitOpenError:
+                # 探测名额被占用或探测失败后再次打开，放回队首等待下一轮
+                with self._lock:
+                    self._items.appendleft((call, future))
+                time.sleep(self.poll_interval)
+                continue
+            except Exception as e:
+                self._settle(future.set_exception, e)
+            else:
+                self._settle(future.set_result, result)
+
+    @staticmethod
+    def _settle(setter: Callable[[Any], None], value: Any):
+        try:
+            setter(value)
+        except InvalidStateError:
+            # 调用方已超时放弃
+            pass
+
+
+class HedgeMetrics:
+    """
+    对冲请求的计数器
+    """
+    def __init__(self):
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.rejected = 0
+        self.deferred = 0
+        self._lock = threading.Lock()
+
+    def record_call(self, hedged: bool, hedge_won: bool = False):
+        with self._lock:
+            self.calls += 1
+            if hedged:
+                self.hedged += 1
+            if hedge_won:
+                self.hedge_wins += 1
+
+    def record_rejected(self):
+        """熔断打开期间被拒绝的调用：暂存队列已满或等待超时"""
+        with self._lock:
+            self.rejected += 1
+
+    def record_deferred(self):
+        """熔断打开期间进入暂存队列的调用"""
+        with self._lock:
+            self.deferred += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+                "hedge_win_rate": round(self.hedge_wins / self.hedged, 4) if self.hedged else 0.0,
+                "deferred": self.deferred,
+                "rejected": self.rejected
+            }
+
+
+# 全局共享实例：每次分析都会新建AIAnalysisService，状态需要跨实例保留
+openai_latency = LatencyTracker()
+openai_breaker = CircuitBreaker(
+    error_rate_threshold=settings.OPENAI_BREAKER_ERROR_RATE,
+    cooldown=settings.OPENAI_BREAKER_COOLDOWN
+)
+hedge_metrics = HedgeMetrics()
+deferred_calls = DeferredCallQueue(openai_breaker, maxsize=settings.OPENAI_DEFERRED_QUEUE_SIZE)
+
+def get_llm_metrics() -> Dict[str, Any]:
+    """
+    汇总LLM调用的对冲与熔断指标
+    """
+    return {
+        "hedging": hedge_metrics.snapshot(),
+        "circuit_breaker": {**openai_breaker.snapshot(), "deferred_queue": len(deferred_calls)},
+        "latency_p95": openai_latency.percentile(95)
+    }
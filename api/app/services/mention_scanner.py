@@ -0,0 +1,88 @@
+from typing import Dict, List, Iterator, Tuple
+from collections import deque
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and (ch.isalnum() or ch == "_")
+
+
+class MentionScanner:
+    """
+    Aho-Corasick automaton over a set of names.
+
+    Builds once from all patterns and finds every occurrence of every
+    pattern in a single pass over the text, so scanning cost is
+    O(len(text) + matches) regardless of how many names there are.
+    Matching is case-insensitive; ASCII names must sit on word boundaries
+    (so "cup" does not match inside "cupboard"), CJK names match anywhere.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for pattern in patterns:
+            normalized = pattern.strip().lower()
+            pattern_id = len(self.patterns)
+            self.patterns.append(normalized)
+            if normalized:
+                self._insert(normalized, pattern_id)
+        self._build_failure_links()
+
+    def _insert(self, pattern: str, pattern_id: int):
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern_id)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # 合并后缀状态的输出，扫描时无需再沿失败链查找
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def scan(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (pattern_id, start_offset) for every match in ``text``."""
+        lowered = text.lower()
+        goto, fail, output, patterns = self._goto, self._fail, self._output, self.patterns
+        state = 0
+        for end, ch in enumerate(lowered):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern_id in output[state]:
+                start = end - len(patterns[pattern_id]) + 1
+                if self._on_boundary(lowered, start, end, patterns[pattern_id]):
+                    yield pattern_id, start
+
+    @staticmethod
+    def _on_boundary(text: str, start: int, end: int, pattern: str) -> bool:
+        if _is_word_char(pattern[0]) and start > 0 and _is_word_char(text[start - 1]):
+            return False
+        if _is_word_char(pattern[-1]) and end + 1 < len(text) and _is_word_char(text[end + 1]):
+            return False
+        return True
+
+    def count(self, text: str) -> Dict[int, int]:
+        """Occurrences per pattern id in ``text`` (only patterns that occur)."""
+        counts: Dict[int, int] = {}
+        for pattern_id, _ in self.scan(text):
+            counts[pattern_id] = counts.get(pattern_id, 0) + 1
+        return counts
@@ -0,0 +1,218 @@
+from typing import Dict, List, Optional, Tuple, Any
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import asyncio
+import json
+import logging
+import multiprocessing
+import threading
+
+from ..models.models import Script
+from ..core.config import settings
+from ..core.database import SessionLocal
+from .script_service import ScriptService
+from .scene_features import SceneFeatureIndex, SETTING_LABELS, TIME_PERIOD_LABELS
+
+logger = logging.getLogger(__name__)
+
+# 每个剧本的部分统计: script_id -> (parse_version, partial)
+_partials: Dict[int, Tuple[int, Dict]] = {}
+_partials_lock = threading.Lock()
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn：不在多线程的服务进程里fork，子进程不会继承父进程的锁和连接
+            _pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool():
+    """
+    关闭统计用的进程池，由应用lifespan在退出时调用
+    """
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def compute_script_partial(results_path: str) -> Dict:
+    """
+    Compute the mergeable statistics partial for one parsed script.
+
+    Runs in a worker process; reads the parse results itself so the parent
+    does not have to pickle the whole document.
+    """
+    with open(results_path, "r", encoding="utf-8") as f:
+        parsed_data = json.load(f)
+
+    index = SceneFeatureIndex(parsed_data.get("scenes", []))
+    cast_counts = Counter()
+    for cast in index.casts:
+        cast_counts.update(cast)
+
+    return {
+        "scene_count": index.scene_count,
+        "locations": index.location_counts(),
+        "scene_types": index.setting_counts(),
+        "time_periods": index.time_period_counts(),
+        "cast_appearances": dict(cast_counts),
+        "resource_types": dict(Counter(r.get("type", "other") for r in parsed_data.get("resources", []))),
+        "title": parsed_data.get("metadata", {}).get("title", "")
+    }
+
+
+def merge_partials(partials: List[Dict]) -> Dict:
+    """Merge per-script partials; every reducer is a Counter sum, so order doesn't matter."""
+    merged = {
+        "scene_count": 0,
+        "locations": Counter(),
+        "scene_types": Counter(),
+        "time_periods": Counter(),
+        "cast_appearances": Counter(),
+        "resource_types": Counter()
+    }
+    for partial in partials:
+        merged["scene_count"] += partial["scene_count"]
+        for key in ("locations", "scene_types", "time_periods", "cast_appearances", "resource_types"):
+            merged[key].update(partial[key])
+    return merged
+
+
+class ProjectStatisticsService:
+    def __init__(self, top_k: int = 10):
+        self.script_service = ScriptService()
+        self.top_k = top_k
+        self.results_dir = Path(settings.UPLOAD_DIR) / "parse_results"
+
+    def _get_project_script_ids(self, project_id: int) -> List[int]:
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(Script.id)
+                .filter(Script.project_id == project_id)
+                .order_by(Script.id)
+                .all()
+            )
+            return [script_id for script_id, in rows]
+        finally:
+            db.close()
+
+    async def _get_partials(self, script_ids: List[int]) -> Tuple[Dict[int, Dict], List[Dict[str, Any]]]:
+        """
+        Return partials for the scripts, recomputing only those whose parse version changed.
+
+        Episodes whose parse results cannot be read (missing, mid-write or
+        corrupt) are skipped and reported instead of failing the whole project.
+        """
+        partials: Dict[int, Dict] = {}
+        skipped: List[Dict[str, Any]] = []
+        stale: List[Tuple[int, int]] = []
+        for script_id in script_ids:
+            version = self.script_service.get_parse_version(script_id)
+            if version is None:
+                continue
+            with _partials_lock:
+                cached = _partials.get(script_id)
+            if cached and cached[0] == version:
+                partials[script_id] = cached[1]
+            else:
+                stale.append((script_id, version))
+
+        if stale:
+            loop = asyncio.get_running_loop()
+            pool = _get_pool()
+            computed = await asyncio.gather(*[
+                loop.run_in_executor(
+                    pool,
+                    compute_script_partial,
+                    str(self.results_dir / f"script_{script_id}_parsed.json")
+                )
+                for script_id, _ in stale
+            ], return_exceptions=True)
+            with _partials_lock:
+                for (script_id, version), partial in zip(stale, computed):
+                    if isinstance(partial, (OSError, ValueError)):
+                        logger.warning(f"Skipping script {script_id} in project statistics: {str(partial)}")
+                        # 响应中只给出原因，不暴露服务器上的文件路径
+                        reason = "missing" if isinstance(partial, FileNotFoundError) else "unreadable"
+                        skipped.append({"script_id": script_id, "reason": f"parse results {reason}"})
+                        continue
+                    if isinstance(partial, BaseException):
+                        raise partial
+                    _partials[script_id] = (version, partial)
+                    partials[script_id] = partial
+
+        return partials, skipped
+
+    async def get_project_statistics(self, project_id: int) -> Dict:
+        """Aggregate statistics across all parsed scripts of a project."""
+        script_ids = self._get_project_script_ids(project_id)
+        partials, skipped = await self._get_partials(script_ids)
+        if not partials:
+            raise ValueError("No parsed scripts found for project")
+
+        ordered_ids = [script_id for script_id in script_ids if script_id in partials]
+        merged = merge_partials([partials[script_id] for script_id in ordered_ids])
+
+        top_locations = merged["locations"].most_common(self.top_k)
+        top_cast = merged["cast_appearances"].most_common(self.top_k)
+
+        return {
+            "project_id": project_id,
+            "script_count": len(ordered_ids),
+            "skipped_scripts": skipped,
+            "total_scenes": merged["scene_count"],
+            "location_frequency": {
+                "labels": [location for location, _ in top_locations],
+                "data": [count for _, count in top_locations],
+                "type": "bar",
+                "title": "全剧场景地点使用频率"
+            },
+            "cast_appearances": {
+                "labels": [char for char, _ in top_cast],
+                "data": [count for _, count in top_cast],
+                "type": "bar",
+                "title": "全剧角色出场次数"
+            },
+            "cast_by_episode": {
+                "labels": [partials[script_id]["title"] or str(script_id) for script_id in ordered_ids],
+                "datasets": [
+                    {
+                        "label": char,
+                        "data": [partials[script_id]["cast_appearances"].get(char, 0) for script_id in ordered_ids]
+                    }
+                    for char, _ in top_cast
+                ],
+                "type": "line",
+                "title": "角色分集出场趋势"
+            },
+            "scene_types": {
+                "labels": [label for label in SETTING_LABELS if label in merged["scene_types"]],
+                "data": [merged["scene_types"][label] for label in SETTING_LABELS if label in merged["scene_types"]],
+                "type": "pie",
+                "title": "场景类型分布"
+            },
+            "time_distribution": {
+                "labels": [label for label in TIME_PERIOD_LABELS if label in merged["time_periods"]],
+                "data": [merged["time_periods"][label] for label in TIME_PERIOD_LABELS if label in merged["time_periods"]],
+                "type": "bar",
+                "title": "时间线分布"
+            },
+            "resource_types": {
+                "labels": list(merged["resource_types"].keys()),
+                "data": list(merged["resource_types"].values()),
+                "type": "pie",
+                "title": "资源类型分布"
+            },
+            "generated_at": datetime.utcnow().isoformat()
+        }
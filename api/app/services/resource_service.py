@@ -1,14 +1,155 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from ..models.resource import Resource, ResourceStatus, ResourcePriority
+from sqlalchemy import func, and_, tuple_, select
+from ..models.resource import (
+    Resource, ResourceStatus, ResourcePriority, ResourceSummary, SUMMARY_FIELDS, UPSERT_INSERTS,
+    RESOURCE_LIST_SCRIPT_KEY,
+    bump_resource_versions, add_summary_delta, apply_summary_deltas
+)
+from .export_cache import get_resource_version
+from .cost_distribution import (
+    CostColumns, compute_cost_distribution, cost_columns_cache, DEFAULT_HISTOGRAM_BINS
+)
 import logging
 import pandas as pd
-from io import BytesIO
+import xlsxwriter
+import pyarrow as pa
+import pyarrow.parquet as pq
+import csv
+import os
+import tempfile
+import base64
+from io import BytesIO, StringIO
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# 资源导出的列定义：(表头, 取值函数)
+EXPORT_COLUMNS = [
+    ("资源ID", lambda r: r.id),
+    ("名称", lambda r: r.name),
+    ("类型", lambda r: r.type),
+    ("状态", lambda r: r.status.value),
+    ("优先级", lambda r: r.priority.value),
+    ("描述", lambda r: r.description),
+    ("预估预算", lambda r: r.estimated_budget),
+    ("实际预算", lambda r: r.actual_budget),
+    ("负责人", lambda r: r.responsible_person),
+    ("备注", lambda r: r.notes),
+    ("需要日期", lambda r: r.needed_by.strftime("%Y-%m-%d") if r.needed_by else None),
+    ("首次出现场景", lambda r: r.scene_number),
+    ("创建时间", lambda r: r.created_at.strftime("%Y-%m-%d %H:%M:%S")),
+    ("更新时间", lambda r: r.updated_at.strftime("%Y-%m-%d %H:%M:%S")),
+]
+
+# 导出时每批从数据库读取的行数
+EXPORT_BATCH_SIZE = 1000
+
+# Excel列宽只根据前N行估算
+EXPORT_WIDTH_SAMPLE_ROWS = 200
+
+# 读取临时导出文件时每次返回的字节数
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# 报告xlsx的表头格式，同步导出和后台导出任务共用
+XLSX_HEADER_FORMAT = {'bold': True, 'bg_color': '#D9D9D9', 'border': 1}
+
+# 报告xlsx的数字格式：百分比列的值已乘以100，只追加%号，不再按Excel百分比格式放大
+XLSX_CELL_FORMATS = {
+    'money': {'num_format': '#,##0.00'},
+    'percent': {'num_format': '0.00"%"'},
+}
+
+# 表头中含这些词的列按金额格式显示
+MONEY_COLUMN_KEYS = ('budget', 'cost', 'variance', 'estimated', 'actual')
+
+# Arrow/Parquet导出的列：(列名, Arrow类型)，列名即resources表字段名，便于分析工具直接使用
+ARROW_EXPORT_COLUMNS = [
+    ("id", pa.int64()),
+    ("script_id", pa.int64()),
+    ("name", pa.string()),
+    ("type", pa.string()),
+    ("status", pa.string()),
+    ("priority", pa.string()),
+    ("description", pa.string()),
+    ("estimated_budget", pa.float64()),
+    ("actual_budget", pa.float64()),
+    ("responsible_person", pa.string()),
+    ("notes", pa.string()),
+    ("needed_by", pa.timestamp("us")),
+    ("scene_number", pa.int64()),
+    ("created_at", pa.timestamp("us")),
+    ("updated_at", pa.timestamp("us")),
+]
+ARROW_EXPORT_SCHEMA = pa.schema(ARROW_EXPORT_COLUMNS)
+
+# 资源列表可选择返回的字段
+LIST_FIELDS = (
+    "id", "script_id", "name", "type", "description", "status", "priority",
+    "estimated_budget", "actual_budget", "responsible_person", "notes",
+    "needed_by", "scene_number", "created_at", "updated_at"
+)
+
+# 分页游标依赖的字段，无论是否请求都会查询
+CURSOR_FIELDS = ("script_id", "id")
+
+
+def xlsx_column_format(column: str) -> Optional[str]:
+    """按表头判断列的数字格式（XLSX_CELL_FORMATS的键），百分比优先于金额"""
+    lowered = column.lower()
+    if 'percentage' in lowered:
+        return 'percent'
+    if any(key in lowered for key in MONEY_COLUMN_KEYS):
+        return 'money'
+    return None
+
+
+def write_xlsx_report(output: BytesIO, sheets: List[Tuple[str, pd.DataFrame]]) -> None:
+    """把报告的各工作表写入xlsx，表头和数字格式与后台导出任务一致"""
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        workbook = writer.book
+        header_format = workbook.add_format(XLSX_HEADER_FORMAT)
+        cell_formats = {key: workbook.add_format(fmt) for key, fmt in XLSX_CELL_FORMATS.items()}
+        cell_formats[None] = None
+
+        for sheet_name, df in sheets:
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+            worksheet = writer.sheets[sheet_name]
+            for col_num, column in enumerate(str(col) for col in df.columns):
+                worksheet.set_column(col_num, col_num, 15, cell_formats[xlsx_column_format(column)])
+                worksheet.write(0, col_num, column, header_format)
+
+
+class _ChunkSink:
+    """
+    只追加的输出对象：收集写入的字节供分块取走，自行记录写入位置（Parquet footer依赖tell()）
+    """
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        chunks, self._chunks = self._chunks, []
+        return b"".join(chunks)
+
 class ResourceService:
     @staticmethod
     def create_resources_from_analysis(
@@ -20,8 +161,6 @@ class ResourceService:
         从AI分析结果创建资源记录
         """
         try:
-            created_resources = []
-            
             # 预期resource_analysis的结构：
             # {
             #     "resources_by_type": {
@@ -40,34 +179,36 @@ class ResourceService:
             resources_by_type = resource_analysis.get("resources_by_type", {})
             scene_distribution = resource_analysis.get("scene_distribution", {})
             
+            # 一次查询取出该剧本已有的(type, name)，代替逐条检查
+            seen_keys = set(
+                db.query(Resource.type, Resource.name)
+                .filter(Resource.script_id == script_id)
+                .all()
+            )
+            
+            rows = []
             for resource_type, resources in resources_by_type.items():
                 for resource_name in resources:
-                    # 检查资源是否已存在
-                    existing_resource = db.query(Resource).filter(
-                        Resource.script_id == script_id,
-                        Resource.name == resource_name,
-                        Resource.type == resource_type
-                    ).first()
-                    
-                    if existing_resource:
+                    key = (resource_type, resource_name)
+                    if key in seen_keys:
                         continue
+                    seen_keys.add(key)
                     
                     # 获取首次出现的场景编号
                     scene_info = scene_distribution.get(resource_name, {})
-                    first_appearance = scene_info.get("first_appearance")
-                    
-                    # 创建新资源记录
-                    new_resource = Resource(
-                        script_id=script_id,
-                        name=resource_name,
-                        type=resource_type,
-                        status=ResourceStatus.PENDING,
-                        priority=ResourcePriority.MEDIUM,
-                        scene_number=first_appearance
-                    )
-                    
-                    db.add(new_resource)
-                    created_resources.append(new_resource)
+                    rows.append({
+                        "script_id": script_id,
+                        "name": resource_name,
+                        "type": resource_type,
+                        "status": ResourceStatus.PENDING,
+                        "priority": ResourcePriority.MEDIUM,
+                        "scene_number": scene_info.get("first_appearance")
+                    })
+            
+            created_resources = ResourceService._bulk_insert_resources(db, rows) if rows else []
+            if created_resources:
+                # 批量INSERT不经过ORM flush事件，需手动递增数据版本
+                bump_resource_versions(db.connection(), [script_id])
             
             db.commit()
             return created_resources
@@ -77,6 +218,203 @@ class ResourceService:
             logger.error(f"Error creating resources from analysis: {str(e)}")
             raise
 
+    @staticmethod
+    def _bulk_insert_resources(db: Session, rows: List[Dict[str, Any]]) -> List[Resource]:
+        """
+        批量插入资源：支持的方言用 ON CONFLICT DO NOTHING 跳过并发写入的重复行，
+        其余方言交给ORM批量flush（executemany）
+        """
+        upsert_insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if upsert_insert is None:
+            resources = [Resource(**row) for row in rows]
+            db.add_all(resources)
+            db.flush()
+            return resources
+        
+        stmt = upsert_insert(Resource).on_conflict_do_nothing(
+            index_elements=["script_id", "type", "name"]
+        ).returning(Resource)
+        resources = list(db.scalars(stmt, rows))
+
+        # 批量INSERT不经过flush事件，按实际插入的行更新汇总表
+        deltas = {}
+        for resource in resources:
+            add_summary_delta(deltas, {field: getattr(resource, field) for field in SUMMARY_FIELDS})
+        apply_summary_deltas(db.connection(), deltas)
+        return resources
+
+    @staticmethod
+    def encode_cursor(script_id: Optional[int], resource_id: int) -> str:
+        # 与排序键一致，未关联剧本的资源记为0
+        return base64.urlsafe_b64encode(f"{script_id or 0}:{resource_id}".encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[int, int]:
+        try:
+            script_id, resource_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+            return int(script_id), int(resource_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+    @staticmethod
+    def parse_fields(fields: Optional[str]) -> List[str]:
+        """
+        解析fields参数（逗号分隔），未指定时返回全部字段
+        """
+        if not fields:
+            return list(LIST_FIELDS)
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in LIST_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return list(dict.fromkeys(requested))
+
+    @staticmethod
+    def _list_query(
+        db: Session,
+        fields: List[str],
+        script_id: Optional[int] = None,
+        status: Optional[ResourceStatus] = None,
+        priority: Optional[ResourcePriority] = None,
+        resource_type: Optional[str] = None,
+        cursor: Optional[str] = None
+    ):
+        """
+        只查询需要的列，按(script_id, id)排序并从游标之后开始；script_id为空的资源按0排序
+        """
+        columns = list(dict.fromkeys(list(CURSOR_FIELDS) + fields))
+        query = db.query(*[getattr(Resource, column) for column in columns])
+
+        if script_id:
+            query = query.filter(Resource.script_id == script_id)
+        if status:
+            query = query.filter(Resource.status == status)
+        if priority:
+            query = query.filter(Resource.priority == priority)
+        if resource_type:
+            query = query.filter(Resource.type == resource_type)
+
+        if cursor:
+            last_script_id, last_id = ResourceService.decode_cursor(cursor)
+            # 行值比较，数据库可直接在(coalesce(script_id, 0), id)索引上定位，不随页数变慢；
+            # 单独的首列下界让SQLite在表达式索引上做范围查找而不是从头扫描
+            query = query.filter(
+                RESOURCE_LIST_SCRIPT_KEY >= last_script_id,
+                tuple_(RESOURCE_LIST_SCRIPT_KEY, Resource.id) > tuple_(last_script_id, last_id)
+            )
+
+        return query.order_by(RESOURCE_LIST_SCRIPT_KEY, Resource.id)
+
+    @staticmethod
+    def _row_to_dict(row, fields: List[str]) -> Dict[str, Any]:
+        mapping = row._mapping
+        return {field: mapping[field] for field in fields}
+
+    @staticmethod
+    def list_resources(
+        db: Session,
+        fields: List[str],
+        limit: int,
+        cursor: Optional[str] = None,
+        **filters
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        键集分页获取资源列表，返回(当前页, 下一页游标)
+        """
+        rows = ResourceService._list_query(db, fields, cursor=cursor, **filters).limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = ResourceService.encode_cursor(rows[-1].script_id, rows[-1].id)
+        return [ResourceService._row_to_dict(row, fields) for row in rows], next_cursor
+
+    @staticmethod
+    def iter_resources(
+        db: Session,
+        fields: List[str],
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        **filters
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        按批次游标逐行返回资源，用于流式输出
+        """
+        query = ResourceService._list_query(db, fields, cursor=cursor, **filters)
+        if limit:
+            query = query.limit(limit)
+        for row in query.yield_per(EXPORT_BATCH_SIZE):
+            yield ResourceService._row_to_dict(row, fields)
+
+    @staticmethod
+    def bulk_update(
+        db: Session,
+        updates: Dict[str, Any],
+        ids: Optional[List[int]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        批量更新资源：一次查询确定目标行，一条UPDATE ... WHERE id IN (...)完成更新
+
+        返回每行的结果以及受影响的剧本，便于调用方发送一条汇总通知
+        """
+        if not updates:
+            raise ValueError("No fields to update")
+
+        try:
+            query = db.query(Resource.id, *[getattr(Resource, field) for field in SUMMARY_FIELDS])
+            if ids is not None:
+                query = query.filter(Resource.id.in_(ids))
+            else:
+                filters = filters or {}
+                if filters.get("script_id"):
+                    query = query.filter(Resource.script_id == filters["script_id"])
+                if filters.get("status"):
+                    query = query.filter(Resource.status == filters["status"])
+                if filters.get("priority"):
+                    query = query.filter(Resource.priority == filters["priority"])
+                if filters.get("type"):
+                    query = query.filter(Resource.type == filters["type"])
+            targets = {row.id: row._mapping for row in query.order_by(Resource.id).all()}
+
+            values = dict(updates)
+            if "needed_by" in values:
+                # 批量UPDATE不经过模型校验，需同步月份字段
+                needed_by = values["needed_by"]
+                values["needed_by_month"] = needed_by.strftime("%Y-%m") if needed_by else None
+
+            if targets:
+                db.query(Resource).filter(Resource.id.in_(list(targets))).update(
+                    values, synchronize_session=False
+                )
+                # 批量UPDATE不触发flush事件，需手动递增数据版本并更新汇总表
+                bump_resource_versions(db.connection(), {row["script_id"] for row in targets.values()})
+                deltas = {}
+                for row in targets.values():
+                    previous = {field: row[field] for field in SUMMARY_FIELDS}
+                    add_summary_delta(deltas, previous, -1)
+                    add_summary_delta(deltas, {**previous, **{
+                        field: value for field, value in values.items() if field in SUMMARY_FIELDS
+                    }})
+                apply_summary_deltas(db.connection(), deltas)
+            db.commit()
+
+            requested = ids if ids is not None else list(targets)
+            results = [
+                {"id": resource_id, "status": "updated" if resource_id in targets else "not_found"}
+                for resource_id in dict.fromkeys(requested)
+            ]
+            return {
+                "updated": len(targets),
+                "results": results,
+                "resource_ids": list(targets),
+                "script_ids": sorted({row["script_id"] for row in targets.values() if row["script_id"] is not None})
+            }
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error bulk updating resources: {str(e)}")
+            raise
+
     @staticmethod
     def update_resource_from_analysis(
         db: Session,
@@ -111,86 +449,211 @@ class ResourceService:
         status: Optional[ResourceStatus] = None,
         resource_type: Optional[str] = None,
         format: str = "xlsx"
-    ) -> BytesIO:
+    ) -> Iterator[bytes]:
+        """
+        流式导出资源列表为Excel、CSV、Arrow IPC或Parquet文件
+
+        按批次游标读取数据库，返回字节块迭代器，内存占用不随行数增长
+        """
+        if format in ("arrow", "parquet"):
+            return ResourceService._stream_arrow(
+                ResourceService._arrow_batches(db, script_id, status, resource_type), format
+            )
+
+        query = db.query(Resource)
+        if script_id:
+            query = query.filter(Resource.script_id == script_id)
+        if status:
+            query = query.filter(Resource.status == status)
+        if resource_type:
+            query = query.filter(Resource.type == resource_type)
+        query = query.order_by(Resource.id).yield_per(EXPORT_BATCH_SIZE)
+
+        if format == "csv":
+            return ResourceService._stream_csv(query)
+        return ResourceService._stream_xlsx(query)
+
+    @staticmethod
+    def _iter_export_rows(query) -> Iterator[List[Any]]:
+        for resource in query:
+            yield [getter(resource) for _, getter in EXPORT_COLUMNS]
+
+    @staticmethod
+    def _stream_csv(query) -> Iterator[bytes]:
         """
-        导出资源列表为Excel文件
+        逐批生成CSV，每批编码后立即交给响应
         """
         try:
-            # 构建查询
-            query = db.query(Resource)
-            if script_id:
-                query = query.filter(Resource.script_id == script_id)
-            if status:
-                query = query.filter(Resource.status == status)
-            if resource_type:
-                query = query.filter(Resource.type == resource_type)
-
-            resources = query.all()
-
-            # 准备数据
-            data = []
-            for resource in resources:
-                data.append({
-                    "资源ID": resource.id,
-                    "名称": resource.name,
-                    "类型": resource.type,
-                    "状态": resource.status.value,
-                    "优先级": resource.priority.value,
-                    "描述": resource.description,
-                    "预估预算": resource.estimated_budget,
-                    "实际预算": resource.actual_budget,
-                    "负责人": resource.responsible_person,
-                    "备注": resource.notes,
-                    "需要日期": resource.needed_by.strftime("%Y-%m-%d") if resource.needed_by else None,
-                    "首次出现场景": resource.scene_number,
-                    "创建时间": resource.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    "更新时间": resource.updated_at.strftime("%Y-%m-%d %H:%M:%S")
-                })
-
-            # 创建DataFrame
-            df = pd.DataFrame(data)
+            buffer = StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow([header for header, _ in EXPORT_COLUMNS])
+            # 带BOM，Excel打开中文不乱码
+            yield buffer.getvalue().encode("utf-8-sig")
+
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+            for row in ResourceService._iter_export_rows(query):
+                writer.writerow(["" if value is None else value for value in row])
+                pending += 1
+                if pending >= EXPORT_BATCH_SIZE:
+                    yield buffer.getvalue().encode("utf-8")
+                    buffer.seek(0)
+                    buffer.truncate()
+                    pending = 0
+            # 未满一批的剩余行
+            if pending:
+                yield buffer.getvalue().encode("utf-8")
 
-            # 创建输出缓冲区
-            output = BytesIO()
-            
-            if format == "xlsx":
-                # 创建Excel writer
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    df.to_excel(writer, sheet_name='资源列表', index=False)
-                    
-                    # 获取workbook和worksheet对象
-                    workbook = writer.book
-                    worksheet = writer.sheets['资源列表']
-                    
-                    # 设置列宽
-                    for i, col in enumerate(df.columns):
-                        max_length = max(
-                            df[col].astype(str).apply(len).max(),
-                            len(col)
-                        )
-                        worksheet.set_column(i, i, max_length + 2)
-                    
-                    # 添加格式
-                    header_format = workbook.add_format({
-                        'bold': True,
-                        'bg_color': '#D9D9D9',
-                        'border': 1
-                    })
-                    
-                    # 应用格式到表头
-                    for col_num, value in enumerate(df.columns.values):
-                        worksheet.write(0, col_num, value, header_format)
+        except Exception as e:
+            logger.error(f"Error exporting resources: {str(e)}")
+            raise
 
-            elif format == "csv":
-                df.to_csv(output, index=False, encoding='utf-8-sig')
-            
-            # 将指针移到开始
-            output.seek(0)
-            return output
+    @staticmethod
+    def _stream_xlsx(query) -> Iterator[bytes]:
+        """
+        以constant_memory模式逐行写入临时文件，再分块读出
+        """
+        fd, tmp_path = tempfile.mkstemp(prefix="resources_export_", suffix=".xlsx")
+        os.close(fd)
+        try:
+            workbook = xlsxwriter.Workbook(tmp_path, {"constant_memory": True})
+            worksheet = workbook.add_worksheet("资源列表")
+            header_format = workbook.add_format({
+                'bold': True,
+                'bg_color': '#D9D9D9',
+                'border': 1
+            })
+
+            rows = ResourceService._iter_export_rows(query)
+
+            # 先缓存前N行估算列宽，constant_memory模式下行必须按顺序写入
+            sample = []
+            for row in rows:
+                sample.append(row)
+                if len(sample) >= EXPORT_WIDTH_SAMPLE_ROWS:
+                    break
+            for i, (header, _) in enumerate(EXPORT_COLUMNS):
+                max_length = max(
+                    [len(header)] + [len(str(row[i])) for row in sample]
+                )
+                worksheet.set_column(i, i, max_length + 2)
+
+            for col_num, (header, _) in enumerate(EXPORT_COLUMNS):
+                worksheet.write(0, col_num, header, header_format)
+
+            row_num = 1
+            for row in sample:
+                worksheet.write_row(row_num, 0, row)
+                row_num += 1
+            for row in rows:
+                worksheet.write_row(row_num, 0, row)
+                row_num += 1
+
+            workbook.close()
+
+            with open(tmp_path, "rb") as f:
+                while True:
+                    chunk = f.read(EXPORT_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
 
         except Exception as e:
             logger.error(f"Error exporting resources: {str(e)}")
             raise
+        finally:
+            os.remove(tmp_path)
+
+    @staticmethod
+    def _arrow_batches(
+        db: Session,
+        script_id: Optional[int],
+        status: Optional[ResourceStatus],
+        resource_type: Optional[str]
+    ) -> Iterator[pa.RecordBatch]:
+        """
+        只查询导出列，按游标每批转换为一个RecordBatch，不构造ORM对象
+        """
+        columns = [getattr(Resource, name) for name, _ in ARROW_EXPORT_COLUMNS]
+        stmt = select(*columns)
+        if script_id:
+            stmt = stmt.where(Resource.script_id == script_id)
+        if status:
+            stmt = stmt.where(Resource.status == status)
+        if resource_type:
+            stmt = stmt.where(Resource.type == resource_type)
+        stmt = stmt.order_by(Resource.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+        enum_columns = {ARROW_EXPORT_SCHEMA.get_field_index(name) for name in ("status", "priority")}
+        for partition in db.execute(stmt).partitions():
+            arrays = []
+            for i, values in enumerate(zip(*partition)):
+                if i in enum_columns:
+                    values = [value.value if value is not None else None for value in values]
+                arrays.append(pa.array(values, type=ARROW_EXPORT_SCHEMA.field(i).type))
+            yield pa.RecordBatch.from_arrays(arrays, schema=ARROW_EXPORT_SCHEMA)
+
+    @staticmethod
+    def _stream_arrow(batches: Iterator[pa.RecordBatch], format: str) -> Iterator[bytes]:
+        """
+        逐批写入Arrow IPC流或Parquet（每批一个row group），写出的字节立即交给响应
+        """
+        try:
+            sink = _ChunkSink()
+            output = pa.PythonFile(sink, mode="w")
+            if format == "parquet":
+                writer = pq.ParquetWriter(output, ARROW_EXPORT_SCHEMA, compression="zstd")
+            else:
+                writer = pa.ipc.new_stream(output, ARROW_EXPORT_SCHEMA)
+
+            for batch in batches:
+                writer.write_batch(batch)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+
+            # Parquet在关闭时写入footer，没有数据也会生成只含schema的有效文件
+            writer.close()
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+        except Exception as e:
+            logger.error(f"Error exporting resources: {str(e)}")
+            raise
+
+    @staticmethod
+    def _summary_rows(db: Session, script_id: Optional[int] = None) -> List[ResourceSummary]:
+        query = db.query(ResourceSummary)
+        if script_id:
+            query = query.filter(ResourceSummary.script_id == script_id)
+        return query.order_by(ResourceSummary.type, ResourceSummary.needed_by_month).all()
+
+    @staticmethod
+    def rebuild_summary(db: Session, script_id: Optional[int] = None) -> int:
+        """
+        根据resources表重建汇总表（全部或单个剧本），用于初始化或修复
+        """
+        try:
+            summary_query = db.query(ResourceSummary)
+            resource_query = db.query(*[getattr(Resource, field) for field in SUMMARY_FIELDS])
+            if script_id:
+                summary_query = summary_query.filter(ResourceSummary.script_id == script_id)
+                resource_query = resource_query.filter(Resource.script_id == script_id)
+            summary_query.delete(synchronize_session=False)
+
+            deltas = {}
+            for row in resource_query.yield_per(EXPORT_BATCH_SIZE):
+                add_summary_delta(deltas, row._mapping)
+            apply_summary_deltas(db.connection(), deltas)
+            db.commit()
+            return len(deltas)
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error rebuilding resource summary: {str(e)}")
+            raise
 
     @staticmethod
     def get_resource_statistics(
@@ -201,78 +664,53 @@ class ResourceService:
         获取资源统计信息
         """
         try:
-            # 基础查询
-            base_query = db.query(Resource)
-            if script_id:
-                base_query = base_query.filter(Resource.script_id == script_id)
-
-            # 1. 按类型统计
-            type_stats = (
-                base_query
-                .with_entities(Resource.type, func.count(Resource.id))
-                .group_by(Resource.type)
-                .all()
-            )
-            type_summary = {t: c for t, c in type_stats}
-
-            # 2. 按状态统计
-            status_stats = (
-                base_query
-                .with_entities(Resource.status, func.count(Resource.id))
-                .group_by(Resource.status)
-                .all()
-            )
-            status_summary = {s.value: c for s, c in status_stats}
+            # 从增量维护的汇总表读取，行数只与维度组合数有关，与资源数量无关
+            groups = ResourceService._summary_rows(db, script_id)
+
+            type_summary: Dict[str, int] = {}
+            status_summary: Dict[str, int] = {}
+            priority_summary: Dict[str, int] = {}
+            time_distribution: Dict[str, int] = {}
+            total_resources = 0
+            completed_resources = 0
+            estimated_sum = actual_sum = 0.0
+            estimated_count = actual_count = 0
+
+            for row in groups:
+                type_summary[row.type] = type_summary.get(row.type, 0) + row.resource_count
+                status_summary[row.status.value] = status_summary.get(row.status.value, 0) + row.resource_count
+                priority_summary[row.priority.value] = priority_summary.get(row.priority.value, 0) + row.resource_count
+                if row.needed_by_month:
+                    time_distribution[row.needed_by_month] = time_distribution.get(row.needed_by_month, 0) + row.resource_count
+                total_resources += row.resource_count
+                if row.status == ResourceStatus.COMPLETED:
+                    completed_resources += row.resource_count
+                estimated_sum += row.estimated_sum
+                estimated_count += row.estimated_count
+                actual_sum += row.actual_sum
+                actual_count += row.actual_count
+
+            time_distribution = dict(sorted(time_distribution.items()))
+            completion_rate = (completed_resources / total_resources * 100) if total_resources > 0 else 0
 
-            # 3. 按优先级统计
-            priority_stats = (
-                base_query
-                .with_entities(Resource.priority, func.count(Resource.id))
-                .group_by(Resource.priority)
-                .all()
-            )
-            priority_summary = {p.value: c for p, c in priority_stats}
-
-            # 4. 预算统计
-            budget_stats = db.query(
-                func.count(Resource.id).label('total_count'),
-                func.sum(Resource.estimated_budget).label('total_estimated_budget'),
-                func.sum(Resource.actual_budget).label('total_actual_budget'),
-                func.avg(Resource.estimated_budget).label('avg_estimated_budget'),
-                func.avg(Resource.actual_budget).label('avg_actual_budget')
-            ).filter(base_query.whereclause).first()
-
-            # 5. 时间分布统计
-            time_stats = (
-                base_query
-                .with_entities(
-                    func.date_trunc('month', Resource.needed_by).label('month'),
-                    func.count(Resource.id)
-                )
-                .filter(Resource.needed_by.isnot(None))
-                .group_by('month')
-                .order_by('month')
-                .all()
-            )
-            time_distribution = {
-                month.strftime("%Y-%m") if month else "未设置": count 
-                for month, count in time_stats
+            # 与SQL的SUM/AVG一致：没有非空值时为None
+            total_estimated_budget = estimated_sum if estimated_count else None
+            total_actual_budget = actual_sum if actual_count else None
+            budget_stats = {
+                "total_count": total_resources,
+                "total_estimated_budget": total_estimated_budget,
+                "total_actual_budget": total_actual_budget,
+                "average_estimated_budget": round(estimated_sum / estimated_count, 2) if estimated_count else 0,
+                "average_actual_budget": round(actual_sum / actual_count, 2) if actual_count else 0
             }
 
-            # 6. 计算完成率
-            total_resources = base_query.count()
-            completed_resources = base_query.filter(
-                Resource.status == ResourceStatus.COMPLETED
-            ).count()
-            completion_rate = (completed_resources / total_resources * 100) if total_resources > 0 else 0
-
-            # 7. 预算执行情况
+            # 预算执行情况
             budget_execution = {
-                "total_estimated": budget_stats.total_estimated_budget or 0,
-                "total_actual": budget_stats.total_actual_budget or 0,
+                "total_estimated": total_estimated_budget or 0,
+                "total_actual": total_actual_budget or 0,
                 "budget_usage_rate": (
-                    (budget_stats.total_actual_budget / budget_stats.total_estimated_budget * 100)
-                    if budget_stats.total_estimated_budget
+                    (total_actual_budget / total_estimated_budget * 100)
+                    if total_estimated_budget
                     else 0
                 )
             }
@@ -281,19 +719,13 @@ class ResourceService:
                 "summary": {
                     "total_resources": total_resources,
                     "completion_rate": round(completion_rate, 2),
-                    "total_estimated_budget": budget_stats.total_estimated_budget,
-                    "total_actual_budget": budget_stats.total_actual_budget,
+                    "total_estimated_budget": total_estimated_budget,
+                    "total_actual_budget": total_actual_budget,
                 },
                 "type_distribution": type_summary,
                 "status_distribution": status_summary,
                 "priority_distribution": priority_summary,
-                "budget_statistics": {
-                    "total_count": budget_stats.total_count,
-                    "total_estimated_budget": budget_stats.total_estimated_budget,
-                    "total_actual_budget": budget_stats.total_actual_budget,
-                    "average_estimated_budget": round(budget_stats.avg_estimated_budget or 0, 2),
-                    "average_actual_budget": round(budget_stats.avg_actual_budget or 0, 2)
-                },
+                "budget_statistics": budget_stats,
                 "time_distribution": time_distribution,
                 "budget_execution": budget_execution
             }
@@ -302,6 +734,32 @@ class ResourceService:
             logger.error(f"Error generating resource statistics: {str(e)}")
             raise
 
+    @staticmethod
+    def statistics_sheets(stats: Dict[str, Any]) -> List[Tuple[str, pd.DataFrame]]:
+        """
+        资源统计报告的各个工作表：(表名, DataFrame)
+        """
+        return [
+            ('总体概况', pd.DataFrame([stats['summary']])),
+            ('类型分布', pd.DataFrame(
+                stats['type_distribution'].items(),
+                columns=['资源类型', '数量']
+            )),
+            ('状态分布', pd.DataFrame(
+                stats['status_distribution'].items(),
+                columns=['状态', '数量']
+            )),
+            ('优先级分布', pd.DataFrame(
+                stats['priority_distribution'].items(),
+                columns=['优先级', '数量']
+            )),
+            ('预算统计', pd.DataFrame([stats['budget_statistics']])),
+            ('时间分布', pd.DataFrame(
+                stats['time_distribution'].items(),
+                columns=['月份', '数量']
+            )),
+        ]
+
     @staticmethod
     def export_statistics(
         db: Session,
@@ -315,69 +773,17 @@ class ResourceService:
             # 获取统计数据
             stats = ResourceService.get_resource_statistics(db, script_id)
             
-            # 创建多个DataFrame用于不同的统计表
-            summary_df = pd.DataFrame([stats['summary']])
-            
-            type_df = pd.DataFrame(
-                stats['type_distribution'].items(),
-                columns=['资源类型', '数量']
-            )
-            
-            status_df = pd.DataFrame(
-                stats['status_distribution'].items(),
-                columns=['状态', '数量']
-            )
-            
-            priority_df = pd.DataFrame(
-                stats['priority_distribution'].items(),
-                columns=['优先级', '数量']
-            )
-            
-            budget_df = pd.DataFrame([stats['budget_statistics']])
-            
-            time_df = pd.DataFrame(
-                stats['time_distribution'].items(),
-                columns=['月份', '数量']
-            )
+            sheets = ResourceService.statistics_sheets(stats)
 
             # 创建输出缓冲区
             output = BytesIO()
             
             if format == "xlsx":
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    # 写入各个表
-                    summary_df.to_excel(writer, sheet_name='总体概况', index=False)
-                    type_df.to_excel(writer, sheet_name='类型分布', index=False)
-                    status_df.to_excel(writer, sheet_name='状态分布', index=False)
-                    priority_df.to_excel(writer, sheet_name='优先级分布', index=False)
-                    budget_df.to_excel(writer, sheet_name='预算统计', index=False)
-                    time_df.to_excel(writer, sheet_name='时间分布', index=False)
-                    
-                    # 获取workbook对象
-                    workbook = writer.book
-                    
-                    # 为每个sheet添加格式
-                    for sheet_name in writer.sheets:
-                        worksheet = writer.sheets[sheet_name]
-                        
-                        # 设置列宽
-                        for i in range(worksheet.dim_colmax + 1):
-                            worksheet.set_column(i, i, 15)
-                        
-                        # 添加表头格式
-                        header_format = workbook.add_format({
-                            'bold': True,
-                            'bg_color': '#D9D9D9',
-                            'border': 1
-                        })
-                        
-                        # 应用表头格式
-                        for col_num in range(worksheet.dim_colmax + 1):
-                            worksheet.write(0, col_num, worksheet.table[0][col_num], header_format)
+                write_xlsx_report(output, sheets)
 
             elif format == "csv":
                 # CSV格式只导出总体概况
-                summary_df.to_csv(output, index=False, encoding='utf-8-sig')
+                sheets[0][1].to_csv(output, index=False, encoding='utf-8-sig')
             
             output.seek(0)
             return output
@@ -395,43 +801,50 @@ class ResourceService:
         获取详细的成本分析
         """
         try:
-            # 基础查询
-            base_query = db.query(Resource)
-            if script_id:
-                base_query = base_query.filter(Resource.script_id == script_id)
+            # 类型、状态、月度和总计都从汇总表聚合，不扫描resources表
+            # 每个分组累计为[预估合计, 实际合计, 资源数]
+            summary_rows = ResourceService._summary_rows(db, script_id)
+            by_type: Dict[str, List[float]] = {}
+            by_status: Dict[ResourceStatus, List[float]] = {}
+            by_month: Dict[str, List[float]] = {}
+            total_estimated, total_actual, total_count = 0.0, 0.0, 0
+            for row in summary_rows:
+                for groups, group_key in (
+                    (by_type, row.type),
+                    (by_status, row.status),
+                    (by_month, row.needed_by_month)
+                ):
+                    bucket = groups.setdefault(group_key, [0.0, 0.0, 0])
+                    bucket[0] += row.estimated_sum
+                    bucket[1] += row.actual_sum
+                    bucket[2] += row.resource_count
+                total_estimated += row.estimated_sum
+                total_actual += row.actual_sum
+                total_count += row.resource_count
 
             # 1. 按资源类型的成本分析
-            cost_by_type = (
-                base_query
-                .with_entities(
-                    Resource.type,
-                    func.sum(Resource.estimated_budget).label('total_estimated'),
-                    func.sum(Resource.actual_budget).label('total_actual'),
-                    func.count(Resource.id).label('count')
-                )
-                .group_by(Resource.type)
-                .all()
-            )
-
-            type_costs = {}
-            for t in cost_by_type:
-                type_costs[t.type] = {
-                    "total_estimated": float(t.total_estimated or 0),
-                    "total_actual": float(t.total_actual or 0),
-                    "count": t.count,
-                    "average_cost": float(t.total_actual or 0) / t.count if t.count > 0 else 0,
-                    "variance": float((t.total_actual or 0) - (t.total_estimated or 0)),
+            type_costs = {
+                type_name: {
+                    "total_estimated": float(estimated),
+                    "total_actual": float(actual),
+                    "count": count,
+                    "average_cost": float(actual) / count if count > 0 else 0,
+                    "variance": float(actual - estimated),
                     "variance_percentage": (
-                        ((float(t.total_actual or 0) - float(t.total_estimated or 0)) / float(t.total_estimated or 1)) * 100
-                        if t.total_estimated
+                        (float(actual - estimated) / float(estimated)) * 100
+                        if estimated
                         else 0
                     )
                 }
+                for type_name, (estimated, actual, count) in by_type.items()
+            }
 
-            # 2. 超支分析
+            # 2. 超支分析：需要逐条资源明细，只取超支最多的10条
+            overbudget_query = db.query(Resource).filter(Resource.actual_budget > Resource.estimated_budget)
+            if script_id:
+                overbudget_query = overbudget_query.filter(Resource.script_id == script_id)
             overbudget_resources = (
-                base_query
-                .filter(Resource.actual_budget > Resource.estimated_budget)
+                overbudget_query
                 .order_by((Resource.actual_budget - Resource.estimated_budget).desc())
                 .limit(10)
                 .all()
@@ -451,84 +864,51 @@ class ResourceService:
                 )
             } for r in overbudget_resources]
 
-            # 3. 月度成本趋势
-            monthly_costs = (
-                base_query
-                .with_entities(
-                    func.date_trunc('month', Resource.needed_by).label('month'),
-                    func.sum(Resource.estimated_budget).label('estimated'),
-                    func.sum(Resource.actual_budget).label('actual')
-                )
-                .filter(Resource.needed_by.isnot(None))
-                .group_by('month')
-                .order_by('month')
-                .all()
-            )
-
+            # 3. 月度成本趋势（未设置需要日期的资源不计入）
             cost_trends = {
-                month.strftime("%Y-%m") if month else "未设置": {
-                    "estimated": float(estimated or 0),
-                    "actual": float(actual or 0),
-                    "variance": float((actual or 0) - (estimated or 0))
+                month: {
+                    "estimated": float(estimated),
+                    "actual": float(actual),
+                    "variance": float(actual - estimated)
                 }
-                for month, estimated, actual in monthly_costs
+                for month, (estimated, actual, _) in sorted(
+                    (item for item in by_month.items() if item[0]),
+                    key=lambda item: item[0]
+                )
             }
 
             # 4. 成本效率分析
-            total_stats = db.query(
-                func.sum(Resource.estimated_budget).label('total_estimated'),
-                func.sum(Resource.actual_budget).label('total_actual'),
-                func.count(Resource.id).label('total_count')
-            ).filter(base_query.whereclause).first()
-
+            total_variance = float(total_actual - total_estimated)
             efficiency_metrics = {
-                "average_cost_per_resource": (
-                    float(total_stats.total_actual or 0) / total_stats.total_count
-                    if total_stats.total_count > 0
-                    else 0
-                ),
+                "average_cost_per_resource": float(total_actual) / total_count if total_count > 0 else 0,
                 "budget_accuracy": (
-                    (1 - abs(float(total_stats.total_actual or 0) - float(total_stats.total_estimated or 0)) 
-                     / float(total_stats.total_estimated or 1)) * 100
-                    if total_stats.total_estimated
+                    (1 - abs(total_variance) / float(total_estimated)) * 100
+                    if total_estimated
                     else 0
                 ),
-                "total_variance": float((total_stats.total_actual or 0) - (total_stats.total_estimated or 0)),
+                "total_variance": total_variance,
                 "total_variance_percentage": (
-                    ((float(total_stats.total_actual or 0) - float(total_stats.total_estimated or 0)) 
-                     / float(total_stats.total_estimated or 1)) * 100
-                    if total_stats.total_estimated
+                    (total_variance / float(total_estimated)) * 100
+                    if total_estimated
                     else 0
                 )
             }
 
             # 5. 状态相关的成本分析
-            status_costs = (
-                base_query
-                .with_entities(
-                    Resource.status,
-                    func.sum(Resource.estimated_budget).label('estimated'),
-                    func.sum(Resource.actual_budget).label('actual'),
-                    func.count(Resource.id).label('count')
-                )
-                .group_by(Resource.status)
-                .all()
-            )
-
             costs_by_status = {
                 status.value: {
-                    "estimated": float(estimated or 0),
-                    "actual": float(actual or 0),
+                    "estimated": float(estimated),
+                    "actual": float(actual),
                     "count": count,
-                    "average": float(actual or 0) / count if count > 0 else 0
+                    "average": float(actual) / count if count > 0 else 0
                 }
-                for status, estimated, actual, count in status_costs
+                for status, (estimated, actual, count) in by_status.items()
             }
 
             return {
                 "summary": {
-                    "total_estimated_budget": float(total_stats.total_estimated or 0),
-                    "total_actual_budget": float(total_stats.total_actual or 0),
+                    "total_estimated_budget": float(total_estimated),
+                    "total_actual_budget": float(total_actual),
                     "total_variance": efficiency_metrics["total_variance"],
                     "budget_accuracy": round(efficiency_metrics["budget_accuracy"], 2)
                 },
@@ -546,6 +926,62 @@ class ResourceService:
             logger.error(f"Error generating cost analysis: {str(e)}")
             raise
 
+    @staticmethod
+    def get_cost_distribution(
+        db: Session,
+        script_id: Optional[int] = None,
+        bins: int = DEFAULT_HISTOGRAM_BINS
+    ) -> Dict[str, Any]:
+        """
+        成本分布分析：按类型的分位数（P50/P90/P99）、直方图和超支离群资源
+
+        列数据按资源数据版本缓存，数据未变时只做NumPy计算，不再查询数据库。
+        耗时目标（50万行约100ms内）只针对缓存命中；版本变化后的首次调用需重新取列，耗时以数据库查询为主
+        """
+        try:
+            version = get_resource_version(db, script_id)
+            cache_key = script_id or 0
+            columns = cost_columns_cache.get(cache_key, version)
+            if columns is None:
+                columns = CostColumns.fetch(db, script_id)
+                cost_columns_cache.put(cache_key, version, columns)
+            return compute_cost_distribution(columns, bins)
+
+        except Exception as e:
+            logger.error(f"Error generating cost distribution: {str(e)}")
+            raise
+
+    @staticmethod
+    def cost_analysis_sheets(cost_analysis: Dict[str, Any]) -> List[Tuple[str, pd.DataFrame]]:
+        """
+        成本分析报告的各个工作表：(表名, DataFrame)
+        """
+        # 类型成本分析
+        type_costs_data = [
+            {**costs, 'type': type_name}
+            for type_name, costs in cost_analysis['costs_by_type'].items()
+        ]
+        
+        # 状态成本分析
+        status_costs_data = [
+            {**costs, 'status': status}
+            for status, costs in cost_analysis['costs_by_status'].items()
+        ]
+        
+        # 月度趋势分析
+        trends_data = [
+            {**data, 'month': month}
+            for month, data in cost_analysis['monthly_trends'].items()
+        ]
+        
+        return [
+            ('总体概况', pd.DataFrame([cost_analysis['summary']])),
+            ('类型成本分析', pd.DataFrame(type_costs_data)),
+            ('状态成本分析', pd.DataFrame(status_costs_data)),
+            ('超支分析', pd.DataFrame(cost_analysis['overbudget_analysis']['top_overbudget_resources'])),
+            ('月度趋势', pd.DataFrame(trends_data)),
+        ]
+
     @staticmethod
     def export_cost_analysis(
         db: Session,
@@ -559,81 +995,17 @@ class ResourceService:
             # 获取成本分析数据
             cost_analysis = ResourceService.get_cost_analysis(db, script_id)
             
-            # 创建多个DataFrame用于不同的分析表
-            summary_df = pd.DataFrame([cost_analysis['summary']])
-            
-            # 类型成本分析
-            type_costs_data = []
-            for type_name, costs in cost_analysis['costs_by_type'].items():
-                costs['type'] = type_name
-                type_costs_data.append(costs)
-            type_costs_df = pd.DataFrame(type_costs_data)
-            
-            # 状态成本分析
-            status_costs_data = []
-            for status, costs in cost_analysis['costs_by_status'].items():
-                costs['status'] = status
-                status_costs_data.append(costs)
-            status_costs_df = pd.DataFrame(status_costs_data)
-            
-            # 超支资源分析
-            overbudget_df = pd.DataFrame(cost_analysis['overbudget_analysis']['top_overbudget_resources'])
-            
-            # 月度趋势分析
-            trends_data = []
-            for month, data in cost_analysis['monthly_trends'].items():
-                data['month'] = month
-                trends_data.append(data)
-            trends_df = pd.DataFrame(trends_data)
-            
+            sheets = ResourceService.cost_analysis_sheets(cost_analysis)
+
             # 创建输出缓冲区
             output = BytesIO()
             
             if format == "xlsx":
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    # 写入各个表
-                    summary_df.to_excel(writer, sheet_name='总体概况', index=False)
-                    type_costs_df.to_excel(writer, sheet_name='类型成本分析', index=False)
-                    status_costs_df.to_excel(writer, sheet_name='状态成本分析', index=False)
-                    overbudget_df.to_excel(writer, sheet_name='超支分析', index=False)
-                    trends_df.to_excel(writer, sheet_name='月度趋势', index=False)
-                    
-                    # 获取workbook对象
-                    workbook = writer.book
-                    
-                    # 为每个sheet添加格式
-                    for sheet_name in writer.sheets:
-                        worksheet = writer.sheets[sheet_name]
-                        
-                        # 设置列宽
-                        for i in range(worksheet.dim_colmax + 1):
-                            worksheet.set_column(i, i, 15)
-                        
-                        # 添加表头格式
-                        header_format = workbook.add_format({
-                            'bold': True,
-                            'bg_color': '#D9D9D9',
-                            'border': 1
-                        })
-                        
-                        # 添加数字格式
-                        number_format = workbook.add_format({'num_format': '#,##0.00'})
-                        percent_format = workbook.add_format({'num_format': '0.00%'})
-                        
-                        # 应用格式
-                        for col_num in range(worksheet.dim_colmax + 1):
-                            worksheet.write(0, col_num, worksheet.table[0][col_num], header_format)
-                            
-                            # 对数字列应用格式
-                            if any(key in worksheet.table[0][col_num].lower() 
-                                  for key in ['budget', 'cost', 'variance', 'estimated', 'actual']):
-                                worksheet.set_column(col_num, col_num, 15, number_format)
-                            elif 'percentage' in worksheet.table[0][col_num].lower():
-                                worksheet.set_column(col_num, col_num, 15, percent_format)
+                write_xlsx_report(output, sheets)
 
             elif format == "csv":
                 # CSV格式只导出总体概况和超支分析
-                summary_df.to_csv(output, index=False, encoding='utf-8-sig')
+                sheets[0][1].to_csv(output, index=False, encoding='utf-8-sig')
             
             output.seek(0)
             return output
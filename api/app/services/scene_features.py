@@ -0,0 +1,270 @@
+from typing import Dict, List, Optional, FrozenSet, Tuple
+from collections import OrderedDict
+import threading
+import numpy as np
+
+# 内外景编码
+SETTING_LABELS = ("Other", "Interior", "Exterior")
+SETTING_OTHER, SETTING_INTERIOR, SETTING_EXTERIOR = range(3)
+
+# 日夜戏编码，0表示无法识别
+TIME_PERIOD_LABELS = (None, "day", "night")
+TIME_UNKNOWN, TIME_DAY, TIME_NIGHT = range(3)
+
+# 节奏编码及对应的节奏分数
+PACE_LABELS = ("fast_paced", "medium_paced", "slow_paced")
+PACE_FAST, PACE_MEDIUM, PACE_SLOW = range(3)
+PACE_SCORES = np.array([0.8, 0.5, 0.2])
+
+DAY_KEYWORDS = ("日", "早", "上午", "下午", "白天", "day", "morning", "afternoon")
+NIGHT_KEYWORDS = ("夜", "晚", "night", "evening")
+
+
+def extract_location(scene: Dict) -> str:
+    """Extract the location token from a scene heading."""
+    return _location_from_heading(scene.get("name", ""))
+
+
+def determine_setting(scene: Dict) -> int:
+    """Classify a scene as interior, exterior or other."""
+    return _setting_from_heading(scene.get("name", "").lower())
+
+
+def extract_time_period(scene: Dict) -> int:
+    """Classify a scene as day or night from its heading."""
+    return _time_period_from_heading(scene.get("name", "").lower())
+
+
+def _location_from_heading(heading: str) -> str:
+    parts = heading.split(None, 1)
+    return parts[0] if parts else ""
+
+
+def _setting_from_heading(lowered: str) -> int:
+    if "int." in lowered or "内景" in lowered:
+        return SETTING_INTERIOR
+    if "ext." in lowered or "外景" in lowered:
+        return SETTING_EXTERIOR
+    return SETTING_OTHER
+
+
+def _time_period_from_heading(lowered: str) -> int:
+    if any(keyword in lowered for keyword in NIGHT_KEYWORDS):
+        return TIME_NIGHT
+    if any(keyword in lowered for keyword in DAY_KEYWORDS):
+        return TIME_DAY
+    return TIME_UNKNOWN
+
+
+def extract_scene_characters(scene: Dict) -> List[str]:
+    """Character names recorded on the scene by the parser."""
+    return list(scene.get("characters") or [])
+
+
+def calculate_intensity(scene: Dict) -> float:
+    """Intensity score in [0, 1] for a scene."""
+    return 0.5
+
+
+def classify_pace(scene: Dict) -> int:
+    """Pace category for a scene."""
+    return PACE_MEDIUM
+
+
+class SceneFeatureIndex:
+    """
+    Per-scene features extracted once from a parse result.
+
+    Every field is an array aligned with the scene order, so derived
+    statistics are array reductions instead of repeated passes over the
+    scene dicts.
+    """
+
+    def __init__(self, scenes: List[Dict]):
+        self.scene_count = len(scenes)
+        self.scene_ids: List[str] = [scene.get("id", f"scene_{i+1}") for i, scene in enumerate(scenes)]
+
+        n = len(scenes)
+        location_ids = np.empty(n, dtype=np.int32)
+        self.setting = np.empty(n, dtype=np.int8)
+        self.time_period = np.empty(n, dtype=np.int8)
+        self.lengths = np.empty(n, dtype=np.int64)
+        self.intensity = np.empty(n, dtype=np.float64)
+        self.pace = np.empty(n, dtype=np.int8)
+        self.casts: List[FrozenSet[str]] = []
+
+        # 台词索引汇总：角色 -> 出场场次/台词行数/台词字数/首次出场场景序号
+        self.appearances: Dict[str, int] = {}
+        self.dialogue_lines: Dict[str, int] = {}
+        self.dialogue_words: Dict[str, int] = {}
+        self.first_appearance: Dict[str, int] = {}
+
+        # 地点按首次出现顺序编号；每个场景标题只做一次lower/split
+        self.location_names: List[str] = []
+        location_lookup: Dict[str, int] = {}
+        for i, scene in enumerate(scenes):
+            heading = scene.get("name", "")
+            lowered = heading.lower()
+            location = _location_from_heading(heading)
+            location_id = location_lookup.get(location)
+            if location_id is None:
+                location_id = location_lookup[location] = len(self.location_names)
+                self.location_names.append(location)
+            location_ids[i] = location_id
+            self.setting[i] = _setting_from_heading(lowered)
+            self.time_period[i] = _time_period_from_heading(lowered)
+            self.lengths[i] = len(scene.get("content", ""))
+            self.intensity[i] = calculate_intensity(scene)
+            self.pace[i] = classify_pace(scene)
+            characters = extract_scene_characters(scene)
+            self.casts.append(frozenset(characters))
+            cues = scene.get("cues") or {}
+            for char in characters:
+                self.appearances[char] = self.appearances.get(char, 0) + 1
+                self.first_appearance.setdefault(char, i)
+                cue = cues.get(char)
+                if cue:
+                    self.dialogue_lines[char] = self.dialogue_lines.get(char, 0) + cue.get("lines", 0)
+                    self.dialogue_words[char] = self.dialogue_words.get(char, 0) + cue.get("words", 0)
+        self.location_ids = location_ids
+        self._co_occurrence: Dict[Tuple[str, ...], np.ndarray] = {}
+
+    def location_counts(self, top: Optional[int] = None) -> Dict[str, int]:
+        """Location frequencies, most common first (ties keep first-appearance order)."""
+        counts = np.bincount(self.location_ids, minlength=len(self.location_names))
+        order = np.argsort(-counts, kind="stable")
+        if top is not None:
+            order = order[:top]
+        return {self.location_names[i]: int(counts[i]) for i in order}
+
+    def setting_counts(self) -> Dict[str, int]:
+        """Interior/exterior/other counts in first-appearance order."""
+        return self._first_seen_counts(self.setting, SETTING_LABELS)
+
+    def time_period_counts(self) -> Dict[str, int]:
+        """Day/night counts in first-appearance order, unknown periods excluded."""
+        counts = self._first_seen_counts(self.time_period, TIME_PERIOD_LABELS)
+        counts.pop(None, None)
+        return counts
+
+    def pace_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.pace, minlength=len(PACE_LABELS))
+        return {label: int(counts[i]) for i, label in enumerate(PACE_LABELS)}
+
+    def pace_scores(self) -> np.ndarray:
+        return PACE_SCORES[self.pace]
+
+    def duration_counts(self) -> Dict[str, int]:
+        """Estimated duration buckets (content length // 100) in first-appearance order."""
+        buckets = self.lengths // 100
+        if buckets.size == 0:
+            return {}
+        values, first_index, counts = np.unique(buckets, return_index=True, return_counts=True)
+        order = np.argsort(first_index)
+        return {
+            f"{int(values[i])}-{int(values[i]) + 5} mins": int(counts[i])
+            for i in order
+        }
+
+    @staticmethod
+    def rolling_mean(values: np.ndarray, window: int = 5) -> np.ndarray:
+        """Centered moving average over a per-scene curve, same length as the input."""
+        if values.size == 0 or window <= 1:
+            return values.astype(np.float64)
+        window = min(window, values.size)
+        kernel = np.ones(window) / window
+        padded = np.pad(values.astype(np.float64), (window // 2, window - 1 - window // 2), mode="edge")
+        return np.convolve(padded, kernel, mode="valid")
+
+    def top_characters(self, limit: Optional[int] = None) -> List[str]:
+        """Characters by scene appearances, most first (ties keep first-appearance order)."""
+        ranked = sorted(self.appearances, key=lambda char: (-self.appearances[char], self.first_appearance[char]))
+        return ranked if limit is None else ranked[:limit]
+
+    def incidence_matrix(self, characters: List[str]) -> np.ndarray:
+        """Scene x character 0/1 matrix; column order follows ``characters``."""
+        columns = {char: j for j, char in enumerate(characters)}
+        matrix = np.zeros((self.scene_count, len(characters)), dtype=np.float32)
+        for i, cast in enumerate(self.casts):
+            for char in cast:
+                j = columns.get(char)
+                if j is not None:
+                    matrix[i, j] = 1.0
+        return matrix
+
+    def co_occurrence(self, characters: List[str]) -> np.ndarray:
+        """
+        Character x character count of shared scenes.
+
+        Computed as one matrix product over the incidence matrix and memoized
+        per character list, so relationships and interaction networks share it.
+        """
+        key = tuple(characters)
+        matrix = self._co_occurrence.get(key)
+        if matrix is None:
+            incidence = self.incidence_matrix(characters)
+            matrix = (incidence.T @ incidence).astype(np.int64)
+            self._co_occurrence[key] = matrix
+        return matrix
+
+    def character_pairs(self, characters: List[str]) -> List[Tuple[str, str, int]]:
+        """Pairs (i < j) that share at least one scene, in ``characters`` order."""
+        matrix = self.co_occurrence(characters)
+        rows, cols = np.nonzero(np.triu(matrix, k=1))
+        return [
+            (characters[i], characters[j], int(matrix[i, j]))
+            for i, j in zip(rows.tolist(), cols.tolist())
+        ]
+
+    @staticmethod
+    def _first_seen_counts(codes: np.ndarray, labels: Tuple) -> Dict:
+        if codes.size == 0:
+            return {}
+        counts = np.bincount(codes, minlength=len(labels))
+        uniques, first_index = np.unique(codes, return_index=True)
+        ordered = uniques[np.argsort(first_index)]
+        return {labels[code]: int(counts[code]) for code in ordered}
+
+
+def parse_version(parsed_data: Dict) -> Optional[str]:
+    """Version token of a parse result; changes every time the script is re-parsed."""
+    return parsed_data.get("parsed_at")
+
+
+class _SceneIndexCache:
+    """Small LRU of feature indexes keyed by script id and parse result version."""
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple, SceneFeatureIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, parsed_data: Dict) -> SceneFeatureIndex:
+        scenes = parsed_data.get("scenes", [])
+        version = parse_version(parsed_data)
+        script_id = parsed_data.get("script_id")
+        if version is None or script_id is None:
+            # Without both parts the key could collide across scripts, so don't cache
+            return SceneFeatureIndex(scenes)
+
+        key = (script_id, version, len(scenes))
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+                return index
+
+        index = SceneFeatureIndex(scenes)
+        with self._lock:
+            self._entries[key] = index
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return index
+
+
+_cache = _SceneIndexCache()
+
+
+def get_scene_index(parsed_data: Dict) -> SceneFeatureIndex:
+    """Return the cached feature index for a parse result, building it on first use."""
+    return _cache.get(parsed_data)
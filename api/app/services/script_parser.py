@@ -10,6 +10,10 @@ from ..models.models import Script, Scene, Resource, ScriptStatus
 from ..core.config import settings
 from ..core.database import SessionLocal
 from datetime import datetime
+from bisect import bisect_right
+
+# 台词提示行：全大写角色名后跟冒号，如 "JOHN: Hello"
+CUE_PATTERN = re.compile(r"^([A-Z][A-Z\s]+):(.*)$", re.MULTILINE)
 
 class ScriptParser:
     def __init__(self, file_path: str):
@@ -34,6 +38,12 @@ class ScriptParser:
             
             # Extract characters
             self.characters = await self._extract_characters()
+
+            # Attach each scene's full text (heading up to the next heading)
+            self._attach_scene_bodies()
+
+            # Record who speaks in each scene
+            self._build_cue_index()
             
             # Extract resources
             self.resources = await self._extract_resources()
@@ -100,27 +110,65 @@ class ScriptParser:
                 "id": f"scene_{i+1}",
                 "name": scene_text.strip(),
                 "order": i+1,
-                "content": scene_text
+                "content": scene_text,
+                "offset": match.start()
             })
 
         return scenes
 
     async def _extract_characters(self) -> List[str]:
         """Extract character names from the script content."""
-        characters = set()
         if not self.content:
-            return list(characters)
+            return []
 
-        # Look for character names (in all caps followed by dialogue)
-        character_pattern = r"^[A-Z][A-Z\s]+(?=:)"
-        character_matches = re.finditer(character_pattern, self.content, re.MULTILINE)
-        
-        for match in character_matches:
-            character_name = match.group(0).strip()
-            characters.add(character_name)
+        # Look for character names (in all caps followed by dialogue), in order of first cue
+        characters = {}
+        for match in CUE_PATTERN.finditer(self.content):
+            characters.setdefault(match.group(1).strip(), None)
 
         return list(characters)
 
+    def _attach_scene_bodies(self):
+        """Set ``body`` on every scene: the script text from its heading to the next one."""
+        if not self.content:
+            return
+        ends = [scene["offset"] for scene in self.scenes[1:]] + [len(self.content)]
+        for scene, end in zip(self.scenes, ends):
+            scene["body"] = self.content[scene["offset"]:end]
+
+    def _build_cue_index(self):
+        """Attach per-scene dialogue cues in one pass over the script.
+
+        Each scene gets ``characters`` (speakers in order of first line) and
+        ``cues``: for every speaker the number of lines, the number of words
+        and the offset of their first line relative to the scene heading.
+        """
+        if not self.content or not self.scenes:
+            return
+
+        starts = [scene["offset"] for scene in self.scenes]
+        for scene in self.scenes:
+            scene["characters"] = []
+            scene["cues"] = {}
+
+        for match in CUE_PATTERN.finditer(self.content):
+            scene_index = bisect_right(starts, match.start()) - 1
+            if scene_index < 0:
+                # Dialogue before the first scene heading
+                continue
+            scene = self.scenes[scene_index]
+            name = match.group(1).strip()
+            cue = scene["cues"].get(name)
+            if cue is None:
+                cue = scene["cues"][name] = {
+                    "lines": 0,
+                    "words": 0,
+                    "first_offset": match.start() - starts[scene_index]
+                }
+                scene["characters"].append(name)
+            cue["lines"] += 1
+            cue["words"] += len(match.group(2).split())
+
     async def _extract_resources(self) -> List[Dict]:
         """Extract resource references from the script content."""
         resources = []
@@ -1,13 +1,20 @@
 from typing import Optional, Dict, List
 from pathlib import Path
 import aiofiles
+import asyncio
 import json
+import logging
 from datetime import datetime
 
 from ..models.script import Script, ScriptStatus
 from ..core.database import SessionLocal
 from .script_parser import ScriptParser, ScriptParsingError
 from ..core.config import settings
+from .statistics_cache import statistics_cache
+from .search_service import SearchService
+from .file_store import write_json_atomic, read_json
+
+logger = logging.getLogger(__name__)
 
 class ScriptService:
     def __init__(self):
@@ -59,6 +66,7 @@ class ScriptService:
                 # Parse the script
                 parser = ScriptParser(script.file_path)
                 parse_result = await parser.parse()
+                parse_result["script_id"] = script_id
 
                 # Update script with parsed data
                 script.status = ScriptStatus.PARSED
@@ -73,6 +81,11 @@ class ScriptService:
                 
                 # Save parse results
                 await self._save_parse_results(script_id, parse_result)
+                statistics_cache.invalidate(script_id)
+                SearchService.index_script(db, script_id, parser.content or "", parse_result["scenes"])
+
+                # Precompute statistics so the first dashboard read is a lookup
+                await self._materialize_statistics(script_id, parse_result)
                 
                 db.commit()
                 return parse_result
@@ -95,6 +108,55 @@ class ScriptService:
         async with aiofiles.open(results_file, 'w') as f:
             await f.write(json.dumps(parse_result, ensure_ascii=False, indent=2))
 
+    async def _materialize_statistics(self, script_id: int, parse_result: Dict):
+        """Compute the full statistics payload once and store it next to the parse results."""
+        # Imported here because StatisticsService itself depends on ScriptService
+        from .statistics_service import StatisticsService
+
+        try:
+            version = self.get_parse_version(script_id)
+            loop = asyncio.get_running_loop()
+            sections = await loop.run_in_executor(None, StatisticsService().compute_sections, parse_result)
+            statistics_cache.put(script_id, version, parse_result, sections)
+
+            # Written to a temp file and renamed so readers never see a partial document
+            await loop.run_in_executor(
+                None,
+                write_json_atomic,
+                self._statistics_file(script_id),
+                {"parse_version": version, "sections": sections}
+            )
+        except Exception as e:
+            # Statistics can still be computed on read; don't fail the parse
+            logger.warning(f"Failed to precompute statistics for script {script_id}: {str(e)}")
+
+    def _statistics_file(self, script_id: int) -> Path:
+        return Path(settings.UPLOAD_DIR) / "statistics" / f"script_{script_id}_statistics.json"
+
+    async def get_stored_statistics(self, script_id: int, version: Optional[int]) -> Optional[Dict]:
+        """Return precomputed statistics sections if they match the given parse version."""
+        if version is None:
+            return None
+
+        loop = asyncio.get_running_loop()
+        try:
+            stored = await loop.run_in_executor(None, read_json, self._statistics_file(script_id))
+        except (ValueError, OSError) as e:
+            # Unreadable file (e.g. left by an older non-atomic write); recompute instead
+            logger.warning(f"Ignoring stored statistics for script {script_id}: {str(e)}")
+            return None
+        if not stored or stored.get("parse_version") != version:
+            return None
+        return stored.get("sections")
+
+    def get_parse_version(self, script_id: int) -> Optional[int]:
+        """Return a version token for the saved parse results (None if not parsed)."""
+        results_file = Path(settings.UPLOAD_DIR) / "parse_results" / f"script_{script_id}_parsed.json"
+        try:
+            return results_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
     async def get_script_analysis(self, script_id: int) -> Optional[Dict]:
         """Retrieve the analysis results for a script."""
         results_file = Path(settings.UPLOAD_DIR) / "parse_results" / f"script_{script_id}_parsed.json"
@@ -104,7 +166,10 @@ class ScriptService:
             
         async with aiofiles.open(results_file, 'r') as f:
             content = await f.read()
-            return json.loads(content)
+        parsed_data = json.loads(content)
+        # Results saved before script_id was recorded
+        parsed_data.setdefault("script_id", script_id)
+        return parsed_data
 
     async def delete_script(self, script_id: int):
         """Delete a script and its associated files."""
@@ -124,6 +189,11 @@ class ScriptService:
             results_file = Path(settings.UPLOAD_DIR) / "parse_results" / f"script_{script_id}_parsed.json"
             if results_file.exists():
                 results_file.unlink()
+            statistics_file = self._statistics_file(script_id)
+            if statistics_file.exists():
+                statistics_file.unlink()
+            statistics_cache.invalidate(script_id)
+            SearchService.remove_script(db, script_id)
 
             # Delete from database
             db.delete(script)
@@ -0,0 +1,281 @@
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import text, inspect, or_, case
+from sqlalchemy.orm import Session
+import logging
+
+from ..models.resource import Resource, ResourceStatus
+
+logger = logging.getLogger(__name__)
+
+# trigram分词对中英文都按三字符切分，"古董怀表"这类中文词无需额外分词器
+RESOURCE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS resource_search USING fts5("
+    "name, description, notes, content='resources', content_rowid='id', tokenize='trigram')",
+    # 外部内容表由触发器与resources同步，批量INSERT/UPDATE同样生效
+    "CREATE TRIGGER IF NOT EXISTS resources_search_ai AFTER INSERT ON resources BEGIN "
+    "INSERT INTO resource_search(rowid, name, description, notes) "
+    "VALUES (new.id, new.name, new.description, new.notes); END",
+    "CREATE TRIGGER IF NOT EXISTS resources_search_ad AFTER DELETE ON resources BEGIN "
+    "INSERT INTO resource_search(resource_search, rowid, name, description, notes) "
+    "VALUES ('delete', old.id, old.name, old.description, old.notes); END",
+    "CREATE TRIGGER IF NOT EXISTS resources_search_au AFTER UPDATE OF name, description, notes ON resources BEGIN "
+    "INSERT INTO resource_search(resource_search, rowid, name, description, notes) "
+    "VALUES ('delete', old.id, old.name, old.description, old.notes); "
+    "INSERT INTO resource_search(rowid, name, description, notes) "
+    "VALUES (new.id, new.name, new.description, new.notes); END",
+]
+
+SCRIPT_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS script_search USING fts5("
+    "script_id UNINDEXED, scene_id UNINDEXED, heading, body, tokenize='trigram')",
+]
+
+# trigram索引只能匹配至少3个字符的词，更短的词改用LIKE过滤
+MIN_MATCH_LENGTH = 3
+
+# bm25列权重：名称 > 描述 > 备注；场景标题 > 正文
+RESOURCE_RANK = "bm25(resource_search, 10.0, 2.0, 1.0)"
+SCRIPT_RANK = "bm25(script_search, 0.0, 0.0, 5.0, 1.0)"
+
+
+def ensure_search_tables(connection):
+    """
+    创建全文检索表和同步触发器（仅SQLite），已存在时跳过
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    tables = inspect(connection).get_table_names()
+    statements = list(SCRIPT_SEARCH_DDL)
+    if "resources" in tables:
+        statements += RESOURCE_SEARCH_DDL
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+    if "resources" in tables and "resource_search" not in tables:
+        # 首次创建时从现有数据建立索引
+        connection.exec_driver_sql("INSERT INTO resource_search(resource_search) VALUES ('rebuild')")
+
+
+def _split_query(query: str) -> Tuple[Optional[str], List[str]]:
+    """
+    拆分检索词：长词组成FTS MATCH表达式（各词都须出现），短词单独返回
+    """
+    terms = list(dict.fromkeys(query.split()))
+    long_terms = [term for term in terms if len(term) >= MIN_MATCH_LENGTH]
+    short_terms = [term for term in terms if len(term) < MIN_MATCH_LENGTH]
+    match = " AND ".join('"' + term.replace('"', '""') + '"' for term in long_terms)
+    return match or None, short_terms
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class SearchService:
+    @staticmethod
+    def search_resources(
+        db: Session,
+        query: str,
+        script_id: Optional[int] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        按名称、描述、备注检索资源，按相关度排序
+        """
+        if db.get_bind().dialect.name != "sqlite":
+            return SearchService._search_resources_like(db, query, script_id, limit, offset)
+
+        match, short_terms = _split_query(query)
+        if match is None and not short_terms:
+            return {"total": 0, "items": []}
+
+        conditions = []
+        params: Dict[str, Any] = {"limit": limit, "offset": offset}
+        if match:
+            conditions.append("resource_search MATCH :match")
+            params["match"] = match
+        if script_id:
+            conditions.append("r.script_id = :script_id")
+            params["script_id"] = script_id
+        for i, term in enumerate(short_terms):
+            conditions.append(
+                f"(r.name LIKE :term_{i} ESCAPE '\\' OR r.description LIKE :term_{i} ESCAPE '\\' "
+                f"OR r.notes LIKE :term_{i} ESCAPE '\\')"
+            )
+            params[f"term_{i}"] = _like_pattern(term)
+        where = " AND ".join(conditions)
+
+        if match:
+            source = "resource_search JOIN resources r ON r.id = resource_search.rowid"
+            columns = (
+                f"snippet(resource_search, -1, '[', ']', '…', 12) AS snippet, {RESOURCE_RANK} AS score"
+            )
+        else:
+            # 只有短词时无法使用全文索引，直接过滤resources
+            source = "resources r"
+            columns = "r.name AS snippet, 0.0 AS score"
+
+        total = db.execute(text(f"SELECT COUNT(*) FROM {source} WHERE {where}"), params).scalar()
+        rows = db.execute(text(
+            f"SELECT r.id, r.script_id, r.name, r.type, r.status, {columns} "
+            f"FROM {source} WHERE {where} ORDER BY score, r.id LIMIT :limit OFFSET :offset"
+        ), params).all()
+
+        return {
+            "total": total,
+            "items": [
+                {
+                    "id": row.id,
+                    "script_id": row.script_id,
+                    "name": row.name,
+                    "type": row.type,
+                    "status": ResourceStatus[row.status].value if row.status else None,
+                    "snippet": row.snippet,
+                    "score": 0.0 - row.score  # bm25越小越相关，取反后越大越相关
+                }
+                for row in rows
+            ]
+        }
+
+    @staticmethod
+    def _search_resources_like(
+        db: Session,
+        query: str,
+        script_id: Optional[int],
+        limit: int,
+        offset: int
+    ) -> Dict[str, Any]:
+        """
+        非SQLite数据库的退化实现：各词都须出现在名称、描述或备注中，名称命中的排在前面
+        """
+        terms = list(dict.fromkeys(query.split()))
+        if not terms:
+            return {"total": 0, "items": []}
+
+        base = db.query(Resource)
+        if script_id:
+            base = base.filter(Resource.script_id == script_id)
+        for term in terms:
+            pattern = _like_pattern(term)
+            base = base.filter(or_(
+                Resource.name.ilike(pattern, escape="\\"),
+                Resource.description.ilike(pattern, escape="\\"),
+                Resource.notes.ilike(pattern, escape="\\")
+            ))
+
+        name_hits = sum(
+            case((Resource.name.ilike(_like_pattern(term), escape="\\"), 1), else_=0)
+            for term in terms
+        )
+        total = base.count()
+        rows = base.order_by(name_hits.desc(), Resource.id).limit(limit).offset(offset).all()
+        return {
+            "total": total,
+            "items": [
+                {
+                    "id": r.id,
+                    "script_id": r.script_id,
+                    "name": r.name,
+                    "type": r.type,
+                    "status": r.status.value if r.status else None,
+                    "snippet": r.name,
+                    "score": None
+                }
+                for r in rows
+            ]
+        }
+
+    @staticmethod
+    def search_scripts(
+        db: Session,
+        query: str,
+        script_id: Optional[int] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        检索剧本正文，按场景返回命中片段
+        """
+        if db.get_bind().dialect.name != "sqlite":
+            return {"total": 0, "items": []}
+
+        match, short_terms = _split_query(query)
+        if match is None and not short_terms:
+            return {"total": 0, "items": []}
+
+        conditions = []
+        params: Dict[str, Any] = {"limit": limit, "offset": offset}
+        if match:
+            conditions.append("script_search MATCH :match")
+            params["match"] = match
+        if script_id:
+            conditions.append("script_id = :script_id")
+            params["script_id"] = script_id
+        for i, term in enumerate(short_terms):
+            conditions.append(f"(heading LIKE :term_{i} ESCAPE '\\' OR body LIKE :term_{i} ESCAPE '\\')")
+            params[f"term_{i}"] = _like_pattern(term)
+        where = " AND ".join(conditions)
+
+        if match:
+            columns = f"snippet(script_search, 3, '[', ']', '…', 16) AS snippet, {SCRIPT_RANK} AS score"
+        else:
+            columns = "substr(body, 1, 80) AS snippet, 0.0 AS score"
+
+        total = db.execute(text(f"SELECT COUNT(*) FROM script_search WHERE {where}"), params).scalar()
+        rows = db.execute(text(
+            f"SELECT script_id, scene_id, heading, {columns} "
+            f"FROM script_search WHERE {where} ORDER BY score, rowid LIMIT :limit OFFSET :offset"
+        ), params).all()
+
+        return {
+            "total": total,
+            "items": [
+                {
+                    "script_id": int(row.script_id),
+                    "scene_id": row.scene_id,
+                    "heading": row.heading,
+                    "snippet": row.snippet,
+                    "score": 0.0 - row.score
+                }
+                for row in rows
+            ]
+        }
+
+    @staticmethod
+    def index_script(db: Session, script_id: int, content: str, scenes: List[Dict]):
+        """
+        按场景切分剧本正文写入检索表，重复解析时先清除旧内容
+        """
+        if db.get_bind().dialect.name != "sqlite":
+            return
+        SearchService.remove_script(db, script_id)
+
+        chunks = []
+        starts = [scene.get("offset") for scene in scenes]
+        if scenes and all(start is not None for start in starts):
+            for i, scene in enumerate(scenes):
+                end = starts[i + 1] if i + 1 < len(scenes) else len(content)
+                chunks.append({
+                    "script_id": script_id,
+                    "scene_id": scene.get("id"),
+                    "heading": scene.get("name", ""),
+                    "body": content[starts[i]:end]
+                })
+            # 第一个场景之前的内容（标题页等）
+            if starts[0] > 0:
+                chunks.insert(0, {"script_id": script_id, "scene_id": None, "heading": "", "body": content[:starts[0]]})
+        elif content:
+            chunks.append({"script_id": script_id, "scene_id": None, "heading": "", "body": content})
+
+        if chunks:
+            db.execute(text(
+                "INSERT INTO script_search(script_id, scene_id, heading, body) "
+                "VALUES (:script_id, :scene_id, :heading, :body)"
+            ), chunks)
+
+    @staticmethod
+    def remove_script(db: Session, script_id: int):
+        if db.get_bind().dialect.name != "sqlite":
+            return
+        db.execute(text("DELETE FROM script_search WHERE script_id = :script_id"), {"script_id": script_id})
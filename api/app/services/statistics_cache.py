@@ -0,0 +1,60 @@
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+import threading
+
+
+class StatisticsCacheEntry:
+    """Statistics for one script at one parse-result version, filled section by section."""
+
+    def __init__(self, version: Any, parsed_data: Optional[Dict], sections: Optional[Dict[str, Dict]] = None):
+        self.version = version
+        self.parsed_data = parsed_data
+        self.sections: Dict[str, Dict] = dict(sections or {})
+
+
+class StatisticsCache:
+    """
+    In-process LRU of statistics keyed by script id and parse-result version.
+
+    Entries are dropped explicitly when a script is re-parsed; the version
+    check also catches parses done by another process.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[int, StatisticsCacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, script_id: int, version: Any) -> Optional[StatisticsCacheEntry]:
+        with self._lock:
+            entry = self._entries.get(script_id)
+            if entry is None:
+                return None
+            if entry.version != version:
+                del self._entries[script_id]
+                return None
+            self._entries.move_to_end(script_id)
+            return entry
+
+    def put(
+        self,
+        script_id: int,
+        version: Any,
+        parsed_data: Optional[Dict],
+        sections: Optional[Dict[str, Dict]] = None
+    ) -> StatisticsCacheEntry:
+        entry = StatisticsCacheEntry(version, parsed_data, sections)
+        with self._lock:
+            self._entries[script_id] = entry
+            self._entries.move_to_end(script_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, script_id: int):
+        with self._lock:
+            self._entries.pop(script_id, None)
+
+
+# 全局缓存实例，ScriptService解析完成后会调用invalidate
+statistics_cache = StatisticsCache()
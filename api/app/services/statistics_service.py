@@ -1,45 +1,88 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from collections import Counter, defaultdict
 from datetime import datetime
+from itertools import combinations
 
 from ..models.script import Script, ScriptStatus
 from ..core.database import SessionLocal
 from .script_service import ScriptService
+from .scene_features import SceneFeatureIndex, get_scene_index
+from .statistics_cache import statistics_cache, StatisticsCacheEntry
+from .mention_scanner import MentionScanner
 
 class StatisticsService:
+    # Rows shown in the dense heatmap grid; the sparse cells cover every resource
+    HEATMAP_MAX_RESOURCES = 50
+
     def __init__(self):
         self.script_service = ScriptService()
 
+    SECTIONS = ("scene_statistics", "character_statistics", "resource_statistics", "timeline_statistics")
+
     async def get_script_statistics(self, script_id: int) -> Dict:
         """Get comprehensive statistics for a script."""
+        entry = await self._get_cache_entry(script_id)
+        result = {section: self._compute_section(entry, section) for section in self.SECTIONS}
+        result["generated_at"] = datetime.utcnow().isoformat()
+        return result
+
+    async def get_section_statistics(self, script_id: int, section: str) -> Dict:
+        """Get a single statistics section, computing only that section on a cache miss."""
+        if section not in self.SECTIONS:
+            raise ValueError(f"Unknown statistics section: {section}")
+        entry = await self._get_cache_entry(script_id)
+        return self._compute_section(entry, section)
+
+    async def _get_cache_entry(self, script_id: int) -> StatisticsCacheEntry:
+        """Return the cache entry for the current parse-result version, loading it if needed."""
+        version = self.script_service.get_parse_version(script_id)
+        entry = statistics_cache.get(script_id, version) if version is not None else None
+        if entry is not None:
+            return entry
+
+        # Statistics materialized at parse time
+        stored = await self.script_service.get_stored_statistics(script_id, version)
+        if stored and all(section in stored for section in self.SECTIONS):
+            return statistics_cache.put(script_id, version, None, stored)
+
         # Get parsed data
         parsed_data = await self.script_service.get_script_analysis(script_id)
         if not parsed_data:
             raise ValueError("Script analysis not found")
-
-        return {
-            "scene_statistics": self._analyze_scenes(parsed_data),
-            "character_statistics": self._analyze_characters(parsed_data),
-            "resource_statistics": self._analyze_resources(parsed_data),
-            "timeline_statistics": self._analyze_timeline(parsed_data),
-            "generated_at": datetime.utcnow().isoformat()
-        }
+        return statistics_cache.put(script_id, version, parsed_data)
+
+    def compute_sections(self, parsed_data: Dict) -> Dict[str, Dict]:
+        """Compute every statistics section for a parse result."""
+        entry = StatisticsCacheEntry(None, parsed_data)
+        return {section: self._compute_section(entry, section) for section in self.SECTIONS}
+
+    def _compute_section(self, entry: StatisticsCacheEntry, section: str) -> Dict:
+        """Compute a section lazily and memoize it on the cache entry."""
+        if section not in entry.sections:
+            analyzers = {
+                "scene_statistics": self._analyze_scenes,
+                "character_statistics": self._analyze_characters,
+                "resource_statistics": self._analyze_resources,
+                "timeline_statistics": self._analyze_timeline
+            }
+            entry.sections[section] = analyzers[section](entry.parsed_data)
+        return entry.sections[section]
 
     def _analyze_scenes(self, parsed_data: Dict) -> Dict:
         """Analyze scene-related statistics."""
-        scenes = parsed_data.get("scenes", [])
+        index = get_scene_index(parsed_data)
         
         # 场景时长分布
-        scene_durations = self._calculate_scene_durations(scenes)
+        scene_durations = self._calculate_scene_durations(index)
         
         # 场景类型分布
-        scene_types = self._categorize_scenes(scenes)
+        scene_types = self._categorize_scenes(index)
         
         # 场景地点统计
-        location_stats = self._analyze_locations(scenes)
+        location_stats = self._analyze_locations(index)
         
         # 场景强度分布
-        intensity_distribution = self._analyze_scene_intensity(scenes)
+        intensity_distribution = self._analyze_scene_intensity(index)
 
         return {
             "duration_distribution": {
@@ -63,6 +106,7 @@ class StatisticsService:
             "intensity_distribution": {
                 "labels": list(intensity_distribution.keys()),
                 "data": list(intensity_distribution.values()),
+                "smoothed": index.rolling_mean(index.intensity).tolist(),
                 "type": "line",
                 "title": "场景强度变化"
             }
@@ -72,18 +116,19 @@ class StatisticsService:
         """Analyze character-related statistics."""
         characters = parsed_data.get("characters", [])
         scenes = parsed_data.get("scenes", [])
+        index = get_scene_index(parsed_data)
         
         # 角色出场频率
-        appearance_stats = self._calculate_character_appearances(characters, scenes)
+        appearance_stats = self._calculate_character_appearances(characters, index)
         
         # 角色对话量统计
-        dialogue_stats = self._calculate_dialogue_counts(characters, scenes)
+        dialogue_stats = self._calculate_dialogue_counts(characters, index)
         
         # 角色互动网络
-        interaction_network = self._analyze_character_interactions(characters, scenes)
+        interaction_network = self._analyze_character_interactions(characters, index)
         
         # 角色情感曲线
-        emotion_curves = self._analyze_character_emotions(characters, scenes)
+        emotion_curves = self._analyze_character_emotions(characters, scenes, index)
 
         return {
             "appearance_frequency": {
@@ -120,14 +165,17 @@ class StatisticsService:
         # 资源类型分布
         resource_types = self._categorize_resources(resources)
         
+        # 资源（按名称合并）在各场景中的提及次数：场景 x 资源矩阵
+        resource_groups, scene_usage = self._scan_resource_mentions(resources, scenes)
+        
         # 资源使用热度
-        usage_heatmap = self._calculate_resource_usage(resources, scenes)
+        usage_heatmap = self._calculate_resource_usage(resource_groups, scenes, scene_usage)
         
         # 资源复杂度分布
         complexity_distribution = self._analyze_resource_complexity(resources)
         
         # 资源关联分析
-        resource_correlations = self._analyze_resource_correlations(resources, scenes)
+        resource_correlations = self._analyze_resource_correlations(resource_groups, scene_usage)
 
         return {
             "type_distribution": {
@@ -137,7 +185,10 @@ class StatisticsService:
                 "title": "资源类型分布"
             },
             "usage_heatmap": {
-                "data": usage_heatmap,
+                "xLabels": usage_heatmap["xLabels"],
+                "yLabels": usage_heatmap["yLabels"],
+                "data": usage_heatmap["data"],
+                "cells": usage_heatmap["cells"],
                 "type": "heatmap",
                 "title": "资源使用热度图"
             },
@@ -158,18 +209,19 @@ class StatisticsService:
     def _analyze_timeline(self, parsed_data: Dict) -> Dict:
         """Analyze timeline-related statistics."""
         scenes = parsed_data.get("scenes", [])
+        index = get_scene_index(parsed_data)
         
         # 时间线分布
-        timeline_distribution = self._analyze_time_distribution(scenes)
+        timeline_distribution = self._analyze_time_distribution(index)
         
         # 情节发展曲线
-        plot_development = self._analyze_plot_development(scenes)
+        plot_development = self._analyze_plot_development(index)
         
         # 场景转换频率
         transition_frequency = self._analyze_scene_transitions(scenes)
         
         # 节奏变化
-        pacing_changes = self._analyze_pacing_changes(scenes)
+        pacing_changes = self._analyze_pacing_changes(index)
 
         return {
             "timeline_distribution": {
@@ -181,6 +233,7 @@ class StatisticsService:
             "plot_development": {
                 "labels": list(range(len(scenes))),
                 "data": plot_development,
+                "smoothed": index.rolling_mean(index.intensity).tolist(),
                 "type": "line",
                 "title": "情节发展曲线"
             },
@@ -193,75 +246,62 @@ class StatisticsService:
             "pacing_changes": {
                 "labels": list(range(len(scenes))),
                 "data": pacing_changes,
+                "smoothed": index.rolling_mean(index.pace_scores()).tolist(),
                 "type": "line",
                 "title": "节奏变化曲线"
             }
         }
 
     # Helper methods for scene analysis
-    def _calculate_scene_durations(self, scenes: List[Dict]) -> Dict[str, int]:
+    def _calculate_scene_durations(self, index: SceneFeatureIndex) -> Dict[str, int]:
         """Calculate the distribution of scene durations."""
-        durations = Counter()
-        for scene in scenes:
-            # Estimate duration based on content length or other factors
-            duration = len(scene.get("content", "")) // 100  # Simple estimation
-            duration_category = f"{duration}-{duration+5} mins"
-            durations[duration_category] += 1
-        return dict(durations)
-
-    def _categorize_scenes(self, scenes: List[Dict]) -> Dict[str, int]:
+        # Estimate duration based on content length (simple estimation)
+        return index.duration_counts()
+
+    def _categorize_scenes(self, index: SceneFeatureIndex) -> Dict[str, int]:
         """Categorize scenes by type."""
-        types = Counter()
-        for scene in scenes:
-            scene_type = self._determine_scene_type(scene)
-            types[scene_type] += 1
-        return dict(types)
+        return index.setting_counts()
 
-    def _analyze_locations(self, scenes: List[Dict]) -> Dict[str, int]:
+    def _analyze_locations(self, index: SceneFeatureIndex) -> Dict[str, int]:
         """Analyze the frequency of different locations."""
-        locations = Counter()
-        for scene in scenes:
-            location = scene.get("name", "").split()[0]
-            locations[location] += 1
-        return dict(locations.most_common(10))
+        return index.location_counts(top=10)
 
-    def _analyze_scene_intensity(self, scenes: List[Dict]) -> Dict[int, float]:
+    def _analyze_scene_intensity(self, index: SceneFeatureIndex) -> Dict[int, float]:
         """Analyze the intensity distribution of scenes."""
-        intensity_scores = {}
-        for i, scene in enumerate(scenes):
-            intensity_scores[i] = self._calculate_intensity_score(scene)
-        return intensity_scores
+        return dict(enumerate(index.intensity.tolist()))
 
     # Helper methods for character analysis
-    def _calculate_character_appearances(self, characters: List[str], scenes: List[Dict]) -> Dict[str, int]:
+    def _calculate_character_appearances(self, characters: List[str], index: SceneFeatureIndex) -> Dict[str, int]:
         """Calculate how many times each character appears."""
-        appearances = Counter()
-        for scene in scenes:
-            scene_chars = self._extract_scene_characters(scene)
-            for char in scene_chars:
-                if char in characters:
-                    appearances[char] += 1
+        appearances = Counter({
+            char: index.appearances[char] for char in characters if char in index.appearances
+        })
         return dict(appearances.most_common(10))
 
-    def _calculate_dialogue_counts(self, characters: List[str], scenes: List[Dict]) -> Dict[str, int]:
-        """Calculate the amount of dialogue for each character."""
-        dialogue_counts = Counter()
-        for scene in scenes:
-            # Count dialogue lines or words for each character
-            pass
-        return dict(dialogue_counts)
+    def _calculate_dialogue_counts(self, characters: List[str], index: SceneFeatureIndex) -> Dict[str, int]:
+        """Calculate the amount of dialogue (cue lines) for each character."""
+        dialogue_counts = Counter({
+            char: index.dialogue_lines[char] for char in characters if char in index.dialogue_lines
+        })
+        return dict(dialogue_counts.most_common())
 
-    def _analyze_character_interactions(self, characters: List[str], scenes: List[Dict]) -> Dict:
+    def _analyze_character_interactions(self, characters: List[str], index: SceneFeatureIndex) -> Dict:
         """Analyze the interaction network between characters."""
         return {
             "nodes": [{"id": char, "name": char} for char in characters],
-            "edges": []  # Add interaction edges
+            "edges": [
+                {"source": char1, "target": char2, "weight": shared_scenes}
+                for char1, char2, shared_scenes in index.character_pairs(characters)
+            ]
         }
 
-    def _analyze_character_emotions(self, characters: List[str], scenes: List[Dict]) -> List[Dict]:
+    def _analyze_character_emotions(self, characters: List[str], scenes: List[Dict],
+                                    index: SceneFeatureIndex) -> List[Dict]:
         """Analyze emotional arcs for main characters."""
         emotion_data = []
-        for char in characters[:5]:  # Limit to top 5 characters
+        known = set(characters)
+        main_characters = [char for char in index.top_characters() if char in known]
+        for char in main_characters[:5]:  # Limit to top 5 characters
             emotion_data.append({
                 "label": char,
                 "data": self._calculate_emotion_curve(char, scenes)
@@ -273,9 +313,53 @@ class StatisticsService:
         """Categorize resources by type."""
         return Counter(resource.get("type", "other") for resource in resources)
 
-    def _calculate_resource_usage(self, resources: List[Dict], scenes: List[Dict]) -> List[List[float]]:
-        """Calculate resource usage heatmap data."""
-        return [[0 for _ in scenes] for _ in resources]  # Placeholder
+    def _scan_resource_mentions(self, resources: List[Dict], scenes: List[Dict]) -> Tuple[List[Dict], List[Dict[int, int]]]:
+        """Count resource mentions per scene with one Aho-Corasick pass over each scene body.
+
+        The parser emits one resource per bracket tag, so resources are grouped
+        by (case-insensitive) name first. Returns the groups (id and name of the
+        first tag) and, per scene, a sparse {group index: mention count} map;
+        a scene usually mentions a handful of props, so nothing scales with
+        scenes x resources.
+        """
+        groups: List[Dict] = []
+        group_ids: Dict[str, int] = {}
+        for resource in resources:
+            name = resource.get("name", "").strip()
+            key = name.lower()
+            if key and key not in group_ids:
+                group_ids[key] = len(groups)
+                groups.append({"id": resource["id"], "name": name})
+
+        if not groups:
+            return groups, [{} for _ in scenes]
+
+        scanner = MentionScanner([group["name"] for group in groups])
+        # Older parse results have no body; fall back to the heading
+        usage = [dict(scanner.count(scene.get("body") or scene.get("content", ""))) for scene in scenes]
+        return groups, usage
+
+    def _calculate_resource_usage(self, groups: List[Dict], scenes: List[Dict], usage: List[Dict[int, int]]) -> Dict:
+        """Calculate resource usage heatmap data.
+
+        ``cells`` lists every non-zero (resource, scene, count); the dense grid is
+        limited to the most used resources so it stays renderable.
+        """
+        cells = []
+        totals = Counter()
+        for scene, counts in zip(scenes, usage):
+            for g, count in sorted(counts.items()):
+                cells.append([groups[g]["id"], scene["id"], count])
+                totals[g] += count
+
+        # Most used first; ties keep resource order
+        top = sorted(totals, key=lambda g: (-totals[g], g))[:self.HEATMAP_MAX_RESOURCES]
+        return {
+            "xLabels": [scene["id"] for scene in scenes],
+            "yLabels": [groups[g]["name"] for g in top],
+            "data": [[float(counts.get(g, 0)) for counts in usage] for g in top],
+            "cells": cells
+        }
 
     def _analyze_resource_complexity(self, resources: List[Dict]) -> Dict[str, int]:
         """Analyze the complexity distribution of resources."""
@@ -285,26 +369,32 @@ class StatisticsService:
             complexity_levels[complexity] += 1
         return dict(complexity_levels)
 
-    def _analyze_resource_correlations(self, resources: List[Dict], scenes: List[Dict]) -> Dict:
-        """Analyze correlations between resources."""
+    def _analyze_resource_correlations(self, groups: List[Dict], usage: List[Dict[int, int]]) -> Dict:
+        """Analyze correlations between resources (number of scenes where both are used).
+
+        Only pairs that actually share a scene are counted, straight from each
+        scene's sparse mention map, so cost follows the co-occurrences rather
+        than resources squared.
+        """
+        co_usage = Counter()
+        for counts in usage:
+            co_usage.update(combinations(sorted(counts), 2))
         return {
-            "nodes": [{"id": res["id"], "name": res["name"]} for res in resources],
-            "edges": []  # Add correlation edges
+            "nodes": [{"id": group["id"], "name": group["name"]} for group in groups],
+            "edges": [
+                {"source": groups[a]["id"], "target": groups[b]["id"], "weight": weight}
+                for (a, b), weight in sorted(co_usage.items())
+            ]
         }
 
     # Helper methods for timeline analysis
-    def _analyze_time_distribution(self, scenes: List[Dict]) -> Dict[str, int]:
+    def _analyze_time_distribution(self, index: SceneFeatureIndex) -> Dict[str, int]:
         """Analyze the distribution of scenes across different times."""
-        time_periods = Counter()
-        for scene in scenes:
-            period = self._extract_time_period(scene)
-            if period:
-                time_periods[period] += 1
-        return dict(time_periods)
-
-    def _analyze_plot_development(self, scenes: List[Dict]) -> List[float]:
+        return index.time_period_counts()
+
+    def _analyze_plot_development(self, index: SceneFeatureIndex) -> List[float]:
         """Calculate plot development curve."""
-        return [self._calculate_plot_intensity(scene) for scene in scenes]
+        return index.intensity.tolist()
 
     def _analyze_scene_transitions(self, scenes: List[Dict]) -> Dict[str, int]:
         """Analyze the frequency of different types of scene transitions."""
@@ -314,31 +404,11 @@ class StatisticsService:
             transitions[transition_type] += 1
         return dict(transitions)
 
-    def _analyze_pacing_changes(self, scenes: List[Dict]) -> List[float]:
+    def _analyze_pacing_changes(self, index: SceneFeatureIndex) -> List[float]:
         """Calculate pacing changes throughout the script."""
-        return [self._calculate_pacing_score(scene) for scene in scenes]
+        return index.pace_scores().tolist()
 
     # Utility methods
-    def _determine_scene_type(self, scene: Dict) -> str:
-        """Determine the type of a scene."""
-        name = scene.get("name", "").lower()
-        if "int." in name:
-            return "Interior"
-        elif "ext." in name:
-            return "Exterior"
-        else:
-            return "Other"
-
-    def _calculate_intensity_score(self, scene: Dict) -> float:
-        """Calculate an intensity score for a scene."""
-        # Implement intensity calculation logic
-        return 0.5
-
-    def _extract_scene_characters(self, scene: Dict) -> List[str]:
-        """Extract character names from a scene."""
-        # Implement character extraction logic
-        return []
-
     def _calculate_emotion_curve(self, character: str, scenes: List[Dict]) -> List[float]:
         """Calculate emotional intensity curve for a character."""
         return [0.5 for _ in scenes]  # Placeholder
@@ -347,18 +417,6 @@ class StatisticsService:
         """Calculate complexity level for a resource."""
         return "medium"
 
-    def _extract_time_period(self, scene: Dict) -> Optional[str]:
-        """Extract time period from a scene."""
-        return None
-
-    def _calculate_plot_intensity(self, scene: Dict) -> float:
-        """Calculate plot intensity for a scene."""
-        return 0.5
-
     def _determine_transition_type(self, scene1: Dict, scene2: Dict) -> str:
         """Determine the type of transition between two scenes."""
-        return "cut"
-
-    def _calculate_pacing_score(self, scene: Dict) -> float:
-        """Calculate a pacing score for a scene."""
-        return 0.5 
\ No newline at end of file
+        return "cut" 
\ No newline at end of file
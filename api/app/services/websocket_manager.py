@@ -84,6 +84,7 @@ class NotificationType:
     SCRIPT_ANALYSIS = "script_analysis"
     PROJECT_UPDATE = "project_update"
     RESOURCE_UPDATE = "resource_update"
+    EXPORT_JOB = "export_job"
     ERROR = "error"
 
 async def notify_script_upload(script_id: int, status: str, message: str):
@@ -124,6 +125,26 @@ async def notify_project_update(project_id: int, update_type: str, message: str)
         "message": message
     })
 
+async def notify_resource_update(update_type: str, script_ids: list, resource_ids: list, changes: Dict[str, Any]):
+    """通知资源更新，批量操作只发送一条消息"""
+    await manager.broadcast_to_channel("resources", {
+        "type": NotificationType.RESOURCE_UPDATE,
+        "update_type": update_type,
+        "script_ids": script_ids,
+        "resource_ids": resource_ids,
+        "changes": changes
+    })
+
+async def notify_export_job(job_id: str, status: str, progress: float, message: str):
+    """通知后台导出任务进度"""
+    await manager.broadcast_to_channel("exports", {
+        "type": NotificationType.EXPORT_JOB,
+        "job_id": job_id,
+        "status": status,
+        "progress": progress,
+        "message": message
+    })
+
 async def notify_error(error_type: str, message: str, details: Dict[str, Any] = None):
     """通知错误信息"""
     await manager.broadcast_to_channel("errors", {
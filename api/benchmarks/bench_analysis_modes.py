@@ -0,0 +1,43 @@
+"""
+对比三种AI分析模式的token用量和耗时
+
+用法（在api目录下，需要可用的Azure OpenAI配置）：
+    python -m benchmarks.bench_analysis_modes uploads/parse_results/script_1_parsed.json --runs 3
+"""
+import argparse
+import json
+import time
+
+from app.services.ai_analysis import AIAnalysisService, ANALYSIS_MODES
+
+
+def run_mode(parsed_script: dict, mode: str) -> dict:
+    service = AIAnalysisService()
+    started = time.perf_counter()
+    service.generate_complete_analysis(parsed_script, mode=mode)
+    elapsed = time.perf_counter() - started
+    return {"wall_time": elapsed, **service.usage}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("parse_result", help="ScriptParser输出的JSON文件")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", default=list(ANALYSIS_MODES), choices=ANALYSIS_MODES)
+    args = parser.parse_args()
+
+    with open(args.parse_result, "r", encoding="utf-8") as f:
+        parsed_script = json.load(f)
+
+    print(f"{'mode':<12}{'calls':>8}{'prompt_tok':>12}{'compl_tok':>12}{'wall_s':>10}")
+    for mode in args.modes:
+        samples = [run_mode(parsed_script, mode) for _ in range(args.runs)]
+        avg = {key: sum(s[key] for s in samples) / len(samples) for key in samples[0]}
+        print(
+            f"{mode:<12}{avg['calls']:>8.1f}{avg['prompt_tokens']:>12.0f}"
+            f"{avg['completion_tokens']:>12.0f}{avg['wall_time']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
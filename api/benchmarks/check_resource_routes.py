@@ -0,0 +1,90 @@
+"""
+检查资源路由的静态路径能被正确匹配
+
+/export、/statistics、/cost-analysis/*等静态路径如果注册在/{resource_id}之后，
+会被当作资源ID解析并返回422。本检查在内存SQLite上挂载资源路由，
+逐个请求这些路径，任何一个不是200即失败。
+
+用法（在api目录下）：
+    python -m benchmarks.check_resource_routes
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Resource关联到Script，Script又关联ScriptAnalysis，需一并注册到映射
+import app.models.script  # noqa: F401
+import app.models.analysis  # noqa: F401
+from app.database import get_db
+from app.models.resource import Resource, ResourceDataVersion, ResourceSummary
+from app.routers import resources
+from app.services.export_cache import export_cache
+from app.services.resource_service import ResourceService
+
+TABLES = [Resource.__table__, ResourceDataVersion.__table__, ResourceSummary.__table__]
+
+# (路径, 查询参数)：都应返回200
+STATIC_ROUTES = [
+    ("/resources/export", {"format": "csv"}),
+    ("/resources/export", {"format": "arrow"}),
+    ("/resources/export", {"format": "parquet"}),
+    ("/resources/statistics", {}),
+    ("/resources/statistics", {"script_id": 1}),
+    ("/resources/statistics/export", {"format": "csv"}),
+    ("/resources/statistics/export", {"format": "xlsx"}),
+    ("/resources/cost-analysis/distribution", {}),
+    ("/resources/cost-analysis/export", {"format": "csv"}),
+    ("/resources/cost-analysis/export", {"format": "xlsx"}),
+]
+
+
+def main():
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    Resource.metadata.create_all(engine, tables=TABLES)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        ResourceService.create_resources_from_analysis(
+            db, 1, {"resources_by_type": {"prop": ["pocket watch", "lamp"], "costume": ["coat"]}}
+        )
+        db.commit()
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(resources.router)
+    app.dependency_overrides[get_db] = override_get_db
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # 导出文件写到临时目录，不污染uploads
+        export_cache.directory = Path(cache_dir)
+        client = TestClient(app)
+        for path, params in STATIC_ROUTES:
+            response = client.get(path, params=params)
+            ok = response.status_code == 200
+            failures += not ok
+            query = "&".join(f"{key}={value}" for key, value in params.items())
+            print(f"[{' OK ' if ok else 'FAIL'}] {response.status_code} {path}{'?' + query if query else ''}")
+            if not ok:
+                print(f"         {response.text[:200]}")
+
+    if failures:
+        sys.exit(f"{failures} static resource routes did not return 200")
+    print(f"All {len(STATIC_ROUTES)} static resource routes return 200")
+
+
+if __name__ == "__main__":
+    main()